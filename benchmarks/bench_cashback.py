@@ -0,0 +1,115 @@
+"""
+Расчет кешбэка по набору из 100+ правил: скомпилированные таблицы поиска
+против последовательного применения маски каждого правила.
+
+Запуск:
+    python -m benchmarks.bench_cashback --rows 1000000 --rules 150
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.cashback import CashbackRules
+
+
+def make_transactions(rows: int, categories: int) -> pd.DataFrame:
+    """
+    Создает DataFrame со случайными тратами за 2023 год по 20 картам.
+
+    Args:
+        rows: Число строк
+        categories: Число разных категорий
+
+    Returns:
+        DataFrame с транзакциями
+    """
+    rng = np.random.default_rng(0)
+    names = np.array([f"Категория {i}" for i in range(categories)])
+    return pd.DataFrame({
+        'date': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 365 * 24 * 3600, rows), unit='s'),
+        'card_last_digits': np.array([f"*{1000 + i}" for i in range(20)])[rng.integers(0, 20, rows)],
+        'status': np.where(rng.random(rows) < 0.01, 'FAILED', 'OK'),
+        'amount': -rng.uniform(10, 5000, rows).round(2),
+        'category': names[rng.integers(0, categories, rows)],
+        'mcc': rng.integers(4000, 8000, rows),
+    })
+
+
+def make_rules(count: int, categories: int) -> CashbackRules:
+    """
+    Создает набор правил: по категориям, по списку MCC и по диапазонам MCC,
+    часть - с минимальной суммой и месячным лимитом.
+
+    Args:
+        count: Число правил
+        categories: Число категорий в данных
+
+    Returns:
+        CashbackRules
+    """
+    rng = np.random.default_rng(1)
+    rules = []
+    for i in range(count):
+        rule = {'name': f"Правило {i}", 'rate': float(rng.choice([0.02, 0.03, 0.05, 0.1]))}
+        kind = i % 3
+        if kind == 0:
+            rule['categories'] = [f"Категория {j}" for j in rng.choice(categories, 3, replace=False)]
+        elif kind == 1:
+            rule['mcc'] = [int(mcc) for mcc in rng.integers(4000, 8000, 10)]
+        else:
+            low = int(rng.integers(4000, 7990))
+            rule['mcc_ranges'] = [[low, low + 5]]
+        if i % 4 == 0:
+            rule['min_amount'] = 100
+            rule['monthly_cap'] = 3000
+        rules.append(rule)
+    return CashbackRules(rules, exclude_categories=['Категория 0'], exclude_statuses=['FAILED'], monthly_cap=500_000)
+
+
+def evaluate_naive(rules: CashbackRules, df: pd.DataFrame) -> np.ndarray:
+    """
+    Ставки без лимитов: маска каждого правила по всем строкам по очереди
+    (для сравнения с таблицами поиска).
+    """
+    spent = -df['amount'].to_numpy()
+    rate = np.full(len(df), rules.default_rate)
+    assigned = np.zeros(len(df), dtype=bool)
+    mcc = df['mcc'].to_numpy()
+    for rule in rules.rules:
+        mask = df['category'].isin(rule['categories']).to_numpy() | np.isin(mcc, rule['mcc'])
+        for low, high in rule['mcc_ranges']:
+            mask |= (mcc >= low) & (mcc <= high)
+        mask &= ~assigned & (spent >= rule['min_amount'])
+        rate[mask] = rule['rate']
+        assigned |= mask
+    return spent * rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Бенчмарк правил кешбэка')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Число транзакций')
+    parser.add_argument('--rules', type=int, default=150, help='Число правил')
+    parser.add_argument('--categories', type=int, default=200, help='Число категорий')
+    args = parser.parse_args()
+
+    df = make_transactions(args.rows, args.categories)
+    start = time.perf_counter()
+    rules = make_rules(args.rules, args.categories)
+    compile_time = time.perf_counter() - start
+    print(f"Транзакций: {args.rows}, правил: {args.rules}")
+    print(f"{'Компиляция правил':<40} {compile_time:8.3f} с")
+
+    start = time.perf_counter()
+    result = rules.evaluate(df)
+    print(f"{'evaluate (с лимитами)':<40} {time.perf_counter() - start:8.3f} с")
+
+    start = time.perf_counter()
+    evaluate_naive(rules, df)
+    print(f"{'Маска на каждое правило (без лимитов)':<40} {time.perf_counter() - start:8.3f} с")
+    print(f"Кешбэк: {result['cashback'].sum():,.2f}, операций по правилам: {result['rule'].notna().sum()}")
+
+
+if __name__ == '__main__':
+    main()
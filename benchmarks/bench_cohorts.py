@@ -0,0 +1,105 @@
+"""
+Сравнение трат пользователя с когортой: ранги по таблицам процентилей
+(один np.searchsorted) против пересчета по всем пользователям когорты,
+а также сборка матрицы когорт из файлов пользователей в пуле процессов.
+
+Запуск:
+    python -m benchmarks.bench_cohorts --users 100000 --files 200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.cohorts import CohortMatrix, PercentileTables, build_cohort_matrix
+
+CATEGORIES = 40
+MONTHS = 12
+
+
+def make_matrix(users: int) -> CohortMatrix:
+    """
+    Создает матрицу с логнормальными тратами пользователей по категориям и месяцам
+    (примерно половина ячеек пустые) и четырьмя когортами.
+
+    Args:
+        users: Число пользователей
+
+    Returns:
+        CohortMatrix
+    """
+    rng = np.random.default_rng(0)
+    values = np.exp(rng.normal(7, 1.5, (users, CATEGORIES, MONTHS))).round(2)
+    values[rng.random(values.shape) < 0.5] = 0.0
+    return CohortMatrix([f"user{i}" for i in range(users)], [f"Категория {i}" for i in range(CATEGORIES)],
+                        [f"2024-{i + 1:02d}" for i in range(MONTHS)], values,
+                        np.array(['A', 'B', 'C', 'D'])[rng.integers(0, 4, users)])
+
+
+def rank_naive(matrix: CohortMatrix, user: int) -> np.ndarray:
+    """Пересчет: доля пользователей когорты с тратами не больше, по каждой категории."""
+    averages = matrix.average()
+    members = averages[matrix.cohorts == matrix.cohorts[user]]
+    return (members <= averages[user]).mean(axis=0) * 100
+
+
+def write_exports(directory: str, files: int, rows: int) -> None:
+    """Создает выгрузки пользователей в формате банка (по файлу на пользователя)."""
+    rng = np.random.default_rng(1)
+    for i in range(files):
+        dates = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365 * 24 * 3600, rows), unit='s')
+        pd.DataFrame({
+            'Дата операции': dates.strftime('%d.%m.%Y %H:%M:%S'),
+            'Номер карты': '*7197',
+            'Статус': 'OK',
+            'Сумма операции': [f"{-value:.2f}".replace('.', ',') for value in np.exp(rng.normal(6, 1, rows))],
+            'Категория': np.array([f"Категория {c}" for c in range(CATEGORIES)])[rng.integers(0, CATEGORIES, rows)],
+            'Описание': 'Покупка',
+        }).to_csv(os.path.join(directory, f"user{i}.csv"), index=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Бенчмарк сравнения с когортой')
+    parser.add_argument('--users', type=int, default=100_000, help='Число пользователей в матрице')
+    parser.add_argument('--queries', type=int, default=200, help='Число сравниваемых пользователей')
+    parser.add_argument('--files', type=int, default=200, help='Число файлов пользователей для сборки')
+    parser.add_argument('--rows', type=int, default=2000, help='Число операций в файле пользователя')
+    args = parser.parse_args()
+
+    matrix = make_matrix(args.users)
+    start = time.perf_counter()
+    tables = PercentileTables(matrix)
+    print(f"Таблицы процентилей ({args.users} пользователей): {time.perf_counter() - start:.2f} с")
+
+    users = np.random.default_rng(2).integers(0, args.users, args.queries)
+    start = time.perf_counter()
+    for user in users:
+        rank_naive(matrix, user)
+    naive = (time.perf_counter() - start) / args.queries
+    start = time.perf_counter()
+    for user in users:
+        tables.rank(tables.averages[user], str(matrix.cohorts[user]))
+    fast = (time.perf_counter() - start) / args.queries
+    print(f"Ранг пользователя: пересчет {naive * 1000:.2f} мс, таблицы {fast * 1000:.3f} мс")
+    error = max(np.abs(tables.rank(tables.averages[u], str(matrix.cohorts[u])) - rank_naive(matrix, u)).max()
+                for u in users)
+    print(f"Максимальное расхождение с точным процентилем: {error:.1f} п.п.")
+
+    start = time.perf_counter()
+    tables.rank_all()
+    print(f"Ранги всех пользователей: {time.perf_counter() - start:.2f} с")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_exports(tmp, args.files, args.rows)
+        for workers in (1, None):
+            start = time.perf_counter()
+            build_cohort_matrix(tmp, max_workers=workers)
+            print(f"Сборка из {args.files} файлов (процессов: {workers or os.cpu_count()}): "
+                  f"{time.perf_counter() - start:.2f} с")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Сравнение скорости чтения CSV выгрузок: прежний разбор (угадывание формата даты,
+сумма через astype(str)) против явных форматов и парсера pyarrow.
+
+Запуск:
+    python -m benchmarks.bench_csv --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable
+
+import pandas as pd
+
+from src.utils import (CSV_READ_OPTIONS, PYARROW_CSV_AVAILABLE, COLUMN_MAPPING, normalize_transactions,
+                       read_csv_fast)
+
+SAMPLE_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'operations.csv')
+
+
+def make_csv(path: str, rows: int) -> None:
+    """
+    Создает CSV файл нужного размера, повторяя строки из data/operations.csv.
+
+    Args:
+        path: Путь к создаваемому файлу
+        rows: Число строк с операциями
+
+    Returns:
+        None
+    """
+    sample = pd.read_csv(SAMPLE_FILE, dtype=str, keep_default_na=False)
+    repeats = -(-rows // len(sample))
+    pd.concat([sample] * repeats, ignore_index=True).iloc[:rows].to_csv(path, index=False)
+
+
+def read_legacy(path: str) -> pd.DataFrame:
+    """Прежний путь: dayfirst без формата, сумма операции через astype(str)."""
+    df = pd.read_csv(path, decimal=',', thousands=' ', parse_dates=['Дата операции'], dayfirst=True)
+    df = df.rename(columns=COLUMN_MAPPING)
+    if not pd.api.types.is_numeric_dtype(df['amount']):
+        df['amount'] = pd.to_numeric(df['amount'].astype(str).str.replace(',', '.'), errors='coerce')
+    return df
+
+
+def read_pandas_explicit(path: str) -> pd.DataFrame:
+    """pd.read_csv с явным форматом даты и типизацией всех денежных столбцов."""
+    return normalize_transactions(pd.read_csv(path, **CSV_READ_OPTIONS))
+
+
+def read_fast(path: str) -> pd.DataFrame:
+    """read_csv_fast: парсер pyarrow, даты и суммы типизируются при чтении."""
+    return normalize_transactions(read_csv_fast(path))
+
+
+def run(name: str, reader: Callable[[str], pd.DataFrame], path: str, repeat: int) -> pd.DataFrame:
+    """Выводит лучшее время из нескольких запусков и возвращает результат."""
+    best = float('inf')
+    df = pd.DataFrame()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = reader(path)
+        best = min(best, time.perf_counter() - start)
+    typed = sum(pd.api.types.is_numeric_dtype(df[col]) or pd.api.types.is_datetime64_any_dtype(df[col])
+                for col in df.columns)
+    print(f"{name:<32} {best:8.2f} с  ({len(df)} строк, типизировано столбцов: {typed})")
+    return df
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Бенчмарк чтения CSV выгрузок')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Число строк в файле')
+    parser.add_argument('--repeat', type=int, default=1, help='Число повторов каждого замера')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'operations.csv')
+        make_csv(path, args.rows)
+        print(f"Файл: {args.rows} строк, {os.path.getsize(path) / 1024 / 1024:.1f} МБ")
+
+        legacy = run('pd.read_csv (dayfirst)', read_legacy, path, args.repeat)
+        explicit = run('pd.read_csv (явные форматы)', read_pandas_explicit, path, args.repeat)
+        if PYARROW_CSV_AVAILABLE:
+            fast = run('read_csv_fast (pyarrow)', read_fast, path, args.repeat)
+            same = (fast['date'].equals(legacy['date']) and fast['amount'].equals(legacy['amount'])
+                    and fast['date'].equals(explicit['date']))
+            print(f"Даты и суммы совпадают с прежним разбором: {same}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Сравнение вызова сервисов со списком словарей и с DataFrame.
+
+Запуск:
+    python -m benchmarks.bench_services --rows 1000000
+"""
+import argparse
+import time
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from src.services import analyze_cashback_categories, investment_bank, simple_search
+
+
+def make_transactions(rows: int) -> pd.DataFrame:
+    """
+    Создает DataFrame со случайными транзакциями за 2023 год.
+
+    Args:
+        rows: Число строк
+
+    Returns:
+        DataFrame с транзакциями
+    """
+    rng = np.random.default_rng(0)
+    categories = np.array(['Супермаркеты', 'Рестораны', 'Транспорт', 'Аптеки', 'Переводы'])
+    descriptions = np.array(['Пятерочка', 'Магнит', 'Яндекс Такси', 'Кофейня', 'Аптека 36.6'])
+    return pd.DataFrame({
+        'date': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 365 * 24 * 3600, rows), unit='s'),
+        'amount': -rng.uniform(10, 5000, rows).round(2),
+        'category': categories[rng.integers(0, len(categories), rows)],
+        'description': descriptions[rng.integers(0, len(descriptions), rows)],
+    })
+
+
+def timed_call(func: Callable[[], Any]) -> float:
+    """Возвращает время выполнения функции в секундах."""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Бенчмарк сервисов: список словарей против DataFrame')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Число транзакций')
+    args = parser.parse_args()
+
+    df = make_transactions(args.rows)
+    print(f"Транзакций: {args.rows}")
+
+    conversion = timed_call(lambda: df.to_dict('records'))
+    records = df.to_dict('records')
+    print(f"{'to_dict(records)':<32} {conversion:8.2f} с")
+
+    cases = [
+        ('analyze_cashback_categories', lambda data: analyze_cashback_categories(data, 2023, 6)),
+        ('investment_bank', lambda data: investment_bank('2023-06', data, 100)),
+        ('simple_search', lambda data: simple_search('такси', data)),
+    ]
+    for name, call in cases:
+        from_records = timed_call(lambda: call(records))
+        from_frame = timed_call(lambda: call(df))
+        print(f"{name:<32} список: {from_records + conversion:7.2f} с (с конвертацией), "
+              f"DataFrame: {from_frame:7.2f} с")
+
+
+if __name__ == '__main__':
+    main()
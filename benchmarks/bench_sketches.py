@@ -0,0 +1,93 @@
+"""
+Приближенная аналитика по скетчам месяцев против точного расчета
+по всем операциям: процентили по категориям, число продавцов и карт,
+крупнейшие продавцы.
+
+Запуск:
+    python -m benchmarks.bench_sketches --rows 2000000 --years 5
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.sketches import build_monthly_sketches, load_sketches, save_monthly_sketches
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def make_transactions(rows: int, years: int) -> pd.DataFrame:
+    """
+    Создает DataFrame с логнормальными тратами по 300 картам и продавцами
+    с распределением Ципфа (несколько продавцов дают большую часть трат).
+
+    Args:
+        rows: Число строк
+        years: Длина истории в годах
+
+    Returns:
+        DataFrame с транзакциями
+    """
+    rng = np.random.default_rng(0)
+    merchants = np.array([f"Продавец {i}" for i in range(50_000)], dtype=object)
+    return pd.DataFrame({
+        'date': pd.Timestamp('2019-01-01') + pd.to_timedelta(
+            np.sort(rng.integers(0, years * 365 * 24 * 3600, rows)), unit='s'),
+        'card_last_digits': np.array([f"*{1000 + i}" for i in range(300)])[rng.integers(0, 300, rows)],
+        'amount': -np.exp(rng.normal(6, 1.2, rows)).round(2),
+        'category': np.array([f"Категория {i}" for i in range(40)])[rng.integers(0, 40, rows)],
+        'description': merchants[rng.zipf(1.3, rows) % len(merchants)],
+    })
+
+
+def exact_summary(df: pd.DataFrame) -> dict:
+    """Точная сводка по всем операциям (для сравнения)."""
+    spent = -df['amount']
+    return {
+        'percentiles': spent.groupby(df['category']).quantile(list(QUANTILES)).unstack(),
+        'distinct_merchants': df['description'].nunique(),
+        'distinct_cards': df['card_last_digits'].nunique(),
+        'top_merchants': spent.groupby(df['description']).sum().nlargest(10),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Бенчмарк приближенной аналитики по скетчам')
+    parser.add_argument('--rows', type=int, default=2_000_000, help='Число транзакций')
+    parser.add_argument('--years', type=int, default=5, help='Длина истории в годах')
+    parser.add_argument('--chunksize', type=int, default=200_000, help='Строк в одной части потока')
+    args = parser.parse_args()
+
+    df = make_transactions(args.rows, args.years)
+    print(f"Транзакций: {args.rows}, лет: {args.years}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        chunks = (df.iloc[i:i + args.chunksize] for i in range(0, len(df), args.chunksize))
+        save_monthly_sketches(build_monthly_sketches(chunks), directory)
+        print(f"{'Построение и сохранение скетчей':<40} {time.perf_counter() - start:8.3f} с")
+
+        start = time.perf_counter()
+        summary = load_sketches(directory).summary(QUANTILES)
+        print(f"{'Сводка по скетчам (все месяцы)':<40} {time.perf_counter() - start:8.3f} с")
+
+    start = time.perf_counter()
+    exact = exact_summary(df)
+    print(f"{'Точная сводка по операциям':<40} {time.perf_counter() - start:8.3f} с")
+
+    spent = -df['amount']
+    ranks = []
+    for category, value in summary['percentiles']['p90'].items():
+        values = np.sort(spent[df['category'] == category].to_numpy())
+        ranks.append(np.searchsorted(values, value) / len(values))
+    print(f"Ошибка ранга p90: до {max(abs(rank - 0.9) for rank in ranks):.4f}")
+    print(f"Продавцов: {summary['distinct_merchants']} (точно {exact['distinct_merchants']}), "
+          f"карт: {summary['distinct_cards']} (точно {exact['distinct_cards']})")
+    same = len(set(summary['top_merchants']['merchant']) & set(exact['top_merchants'].index))
+    print(f"Совпадений в топ-10 продавцов: {same}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Сравнение скорости чтения XLSX выгрузок.
+
+Запуск:
+    python -m benchmarks.bench_xlsx --rows 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable
+
+import pandas as pd
+from openpyxl import Workbook
+
+from src.utils import COLUMN_MAPPING, CALAMINE_AVAILABLE, read_xlsx_streaming
+
+SAMPLE_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'operations.csv')
+
+
+def make_workbook(path: str, rows: int) -> None:
+    """
+    Создает XLSX файл нужного размера, повторяя строки из data/operations.csv.
+
+    Args:
+        path: Путь к создаваемому файлу
+        rows: Число строк с операциями
+
+    Returns:
+        None
+    """
+    sample = pd.read_csv(SAMPLE_FILE, dtype=str, keep_default_na=False)
+    for column in ['Сумма операции', 'Сумма платежа', 'Бонусы (включая кэшбэк)',
+                   'Округление на инвесткопилку', 'Сумма операции с округлением']:
+        sample[column] = pd.to_numeric(sample[column].str.replace(',', '.'), errors='coerce')
+    sample['Дата операции'] = pd.to_datetime(sample['Дата операции'], format='%d.%m.%Y %H:%M:%S')
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(list(sample.columns))
+    records = list(sample.itertuples(index=False, name=None))
+    for i in range(rows):
+        sheet.append(records[i % len(records)])
+    workbook.save(path)
+
+
+def read_with_pandas(path: str) -> pd.DataFrame:
+    """Текущий путь: pd.read_excel через openpyxl и переименование столбцов."""
+    df = pd.read_excel(path, engine='openpyxl')
+    return df.rename(columns=COLUMN_MAPPING)
+
+
+def read_with_calamine(path: str) -> pd.DataFrame:
+    """pd.read_excel через python-calamine."""
+    df = pd.read_excel(path, engine='calamine')
+    return df.rename(columns=COLUMN_MAPPING)
+
+
+def run(name: str, reader: Callable[[str], pd.DataFrame], path: str, repeat: int) -> None:
+    """Выводит лучшее время из нескольких запусков."""
+    best = float('inf')
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(reader(path))
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<28} {best:8.2f} с  ({rows} строк)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Бенчмарк чтения XLSX выгрузок')
+    parser.add_argument('--rows', type=int, default=100_000, help='Число строк в файле')
+    parser.add_argument('--repeat', type=int, default=1, help='Число повторов каждого замера')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'operations.xlsx')
+        make_workbook(path, args.rows)
+        print(f"Файл: {args.rows} строк, {os.path.getsize(path) / 1024 / 1024:.1f} МБ")
+
+        run('pd.read_excel (openpyxl)', read_with_pandas, path, args.repeat)
+        run('read_xlsx_streaming', read_xlsx_streaming, path, args.repeat)
+        if CALAMINE_AVAILABLE:
+            run('pd.read_excel (calamine)', read_with_calamine, path, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
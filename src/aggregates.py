@@ -0,0 +1,240 @@
+import copy
+import functools
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.cashback import CashbackRules, get_cashback_rules
+from src.topk import TOP_COLUMNS, ranking_scores
+from src.utils import dataset_fingerprint, mask_card_number
+
+logger = logging.getLogger(__name__)
+
+# Сколько предрасчитанных наборов данных держать в памяти
+MAX_AGGREGATORS = 8
+
+
+class MonthToDateAggregator:
+    """
+    Предрасчитанные агрегаты «с начала месяца» для домашней страницы.
+
+    Для каждого месяца хранит по дням накопленные траты, кешбэк и первую позицию
+    каждой карты, а также текущий топ транзакций. Данные для любой даты получаются
+    поиском дня и небольшой выборкой вместо повторной фильтрации всех строк.
+
+    Границы совпадают с generate_home_data: операции с начала месяца (00:00)
+    до полуночи даты анализа включительно. Ссылка на DataFrame не хранится:
+    из строк остаются только те, что хотя бы в один день входят в топ.
+    """
+
+    def __init__(self, df: pd.DataFrame, top_n: int = 5, ranking: str = 'spend',
+                 rules: Optional[CashbackRules] = None) -> None:
+        """
+        Args:
+            df: DataFrame с транзакциями
+            top_n: Размер топа транзакций
+            ranking: Способ ранжирования топа (см. src.topk.ranking_scores)
+            rules: Правила кешбэка (по умолчанию - get_cashback_rules())
+        """
+        self.top_n = top_n
+        self.ranking = ranking
+        self.rules = rules or get_cashback_rules()
+        self._months: Dict[pd.Period, Dict[str, Any]] = {}
+        # Строки, входящие в топ хотя бы в один день: позиция -> столбцы TOP_COLUMNS
+        self._rows: Dict[int, Dict[str, Any]] = {}
+
+        if df.empty or 'date' not in df.columns or 'amount' not in df.columns:
+            return
+
+        dates = pd.to_datetime(df['date'])
+        valid = dates.notna().to_numpy()
+        dates = dates[valid]
+        frame = pd.DataFrame({
+            'month': dates.dt.to_period('M').to_numpy(),
+            # Операция попадает в выборку даты d, если ее время <= d 00:00,
+            # т.е. если день, округленный вверх, не позже d
+            'bucket': dates.dt.ceil('D').to_numpy(),
+            'position': np.arange(len(df))[valid],
+            'amount': pd.to_numeric(df['amount'], errors='coerce').to_numpy(dtype='float64')[valid],
+            'cashback': self.rules.evaluate(df)['cashback'].to_numpy()[valid],
+            'card': df['card_last_digits'].to_numpy()[valid] if 'card_last_digits' in df.columns else None,
+        })
+
+        for month, part in frame.groupby('month', sort=False):
+            self._months[month] = self._build_month(part)
+
+        positions = np.unique(np.concatenate(
+            [top for month in self._months.values() for top in month['top']] or [np.empty(0, dtype='int64')]
+        )).astype('int64')
+        columns = [col for col in TOP_COLUMNS if col in df.columns]
+        self._rows = dict(zip(positions.tolist(), df.iloc[positions][columns].to_dict('records')))
+        logger.info(f"Предрасчитаны агрегаты для {len(self._months)} месяцев")
+
+    def _build_month(self, part: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Строит префиксные суммы по картам и текущий топ для одного месяца.
+
+        Args:
+            part: Операции месяца (bucket, position, amount, card)
+
+        Returns:
+            Словарь с днями, картами, матрицами трат/кешбэка/позиций и топом по дням
+        """
+        days = np.sort(part['bucket'].unique())
+
+        cards_part = part[part['card'].notna()]
+        if cards_part.empty:
+            cards: List[Any] = []
+            spend = np.zeros((len(days), 0))
+            cashback = np.zeros((len(days), 0))
+            first = np.full((len(days), 0), np.nan)
+        else:
+            spent = cards_part.assign(spent=-cards_part['amount'].where(cards_part['amount'] < 0, 0))
+            grouped = spent.groupby(['bucket', 'card'])
+            spend_frame = grouped['spent'].sum().unstack(fill_value=0).reindex(days, fill_value=0).cumsum()
+            cashback_frame = (
+                grouped['cashback'].sum().unstack(fill_value=0)
+                .reindex(index=days, columns=spend_frame.columns, fill_value=0).cumsum()
+            )
+            first_frame = (
+                grouped['position'].min().unstack()
+                .reindex(index=days, columns=spend_frame.columns)
+                .cummin().ffill()
+            )
+            cards = list(spend_frame.columns)
+            spend = spend_frame.to_numpy(dtype='float64')
+            cashback = cashback_frame.to_numpy(dtype='float64')
+            first = first_frame.to_numpy(dtype='float64')
+
+        # Топ: по убыванию оценки, при равенстве - по порядку строк (как в TopK)
+        scored = part.assign(score=ranking_scores(part['amount'], self.ranking))
+        ranked = scored[scored['score'].notna()].sort_values(
+            ['bucket', 'score', 'position'], ascending=[True, False, True]
+        )
+        daily_top = {
+            day: (group['score'].to_numpy(), group['position'].to_numpy())
+            for day, group in ranked.groupby('bucket').head(self.top_n).groupby('bucket')
+        }
+        top_scores = np.empty(0)
+        top_positions = np.empty(0, dtype='int64')
+        tops = []
+        for day in days:
+            if day in daily_top:
+                scores = np.concatenate([top_scores, daily_top[day][0]])
+                positions = np.concatenate([top_positions, daily_top[day][1]])
+                order = np.lexsort((positions, -scores))[:self.top_n]
+                top_scores, top_positions = scores[order], positions[order]
+            tops.append(top_positions)
+
+        return {'days': days, 'cards': cards, 'spend': spend, 'cashback': cashback, 'first': first, 'top': tops}
+
+    def home_block(self, date_str: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Возвращает блоки карт и топа транзакций для даты.
+
+        Args:
+            date_str: Дата анализа в формате 'YYYY-MM-DD'
+
+        Returns:
+            Словарь с ключами 'cards' и 'top_transactions'
+        """
+        date = pd.Timestamp(datetime.strptime(date_str, '%Y-%m-%d'))
+        month = self._months.get(date.to_period('M'))
+        if month is None:
+            return {'cards': [], 'top_transactions': []}
+
+        idx = np.searchsorted(month['days'], date.to_datetime64(), side='right') - 1
+        if idx < 0:
+            return {'cards': [], 'top_transactions': []}
+
+        first = month['first'][idx]
+        present = np.flatnonzero(~np.isnan(first))
+        cards = []
+        for i in present[np.argsort(first[present], kind='stable')]:
+            total_spent = float(month['spend'][idx, i])
+            cards.append({
+                'last_digits': mask_card_number(str(month['cards'][i])),
+                'total_spent': round(total_spent, 2),
+                'cashback': round(float(month['cashback'][idx, i]), 2)
+            })
+
+        top = [dict(self._rows[position]) for position in month['top'][idx].tolist()]
+        return {'cards': cards, 'top_transactions': top}
+
+
+_aggregators: 'OrderedDict[str, MonthToDateAggregator]' = OrderedDict()
+
+
+def aggregator_key(df: pd.DataFrame, key: Optional[str] = None) -> str:
+    """
+    Составляет ключ агрегатора: содержимое данных (или ключ вызывающего кода)
+    и действующие правила кешбэка.
+
+    Args:
+        df: DataFrame с транзакциями
+        key: Ключ данных от вызывающего кода (например, отпечаток файла);
+            по умолчанию содержимое DataFrame хешируется
+
+    Returns:
+        Строка ключа
+    """
+    return f"{key or dataset_fingerprint(df)}:{get_cashback_rules().fingerprint}"
+
+
+def get_aggregator(df: pd.DataFrame, fingerprint: Optional[str] = None) -> MonthToDateAggregator:
+    """
+    Возвращает агрегатор для набора данных и действующих правил кешбэка,
+    строя его при первом обращении.
+
+    Args:
+        df: DataFrame с транзакциями
+        fingerprint: Ключ агрегатора (aggregator_key, если уже вычислен)
+
+    Returns:
+        MonthToDateAggregator
+    """
+    rules = get_cashback_rules()
+    fingerprint = fingerprint or aggregator_key(df)
+    aggregator = _aggregators.get(fingerprint)
+    if aggregator is None:
+        aggregator = MonthToDateAggregator(df, rules=rules)
+        _aggregators[fingerprint] = aggregator
+        if len(_aggregators) > MAX_AGGREGATORS:
+            _aggregators.popitem(last=False)
+    else:
+        _aggregators.move_to_end(fingerprint)
+    return aggregator
+
+
+@functools.lru_cache(maxsize=4096)
+def _cached_home_block(fingerprint: str, date_str: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Кеширует блоки домашней страницы по (отпечаток данных и правил, дата)."""
+    return _aggregators[fingerprint].home_block(date_str)
+
+
+def month_to_date_block(df: pd.DataFrame, date_str: str, key: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Возвращает карты и топ транзакций с начала месяца до даты
+    с LRU-кешем по (ключ данных и правил кешбэка, дата).
+
+    Args:
+        df: DataFrame с транзакциями
+        date_str: Дата анализа в формате 'YYYY-MM-DD'
+        key: Ключ данных (aggregator_key) - чтобы не хешировать DataFrame для каждой даты
+
+    Returns:
+        Словарь с ключами 'cards' и 'top_transactions'
+    """
+    fingerprint = key or aggregator_key(df)
+    get_aggregator(df, fingerprint)
+    return copy.deepcopy(_cached_home_block(fingerprint, date_str))
+
+
+def clear_aggregates_cache() -> None:
+    """Очищает предрасчитанные агрегаты и кеш блоков."""
+    _aggregators.clear()
+    _cached_home_block.cache_clear()
@@ -0,0 +1,255 @@
+import logging
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.profiling import timed
+
+logger = logging.getLogger(__name__)
+
+# Столбцы операций, хранящиеся в скользящем окне базовых линий
+HISTORY_COLUMNS = ['date', 'card', 'category', 'mcc', 'hour', 'spent']
+
+# Столбцы результата оценки
+SCORE_COLUMNS = ['amount_score', 'unusual_amount', 'unusual_mcc', 'unusual_hour', 'anomaly']
+
+# Коэффициент, приводящий MAD к стандартному отклонению нормального распределения
+MAD_SCALE = 0.6745
+
+# Нижняя граница MAD: доля медианы и абсолютный минимум в рублях,
+# чтобы постоянные суммы (подписки) не давали бесконечных оценок
+MIN_MAD_SHARE = 0.05
+MIN_MAD = 1.0
+
+
+def _robust_stats(frame: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    """
+    Считает медиану, MAD и число трат по группам.
+
+    Args:
+        frame: Операции окна (столбцы keys и spent)
+        keys: Столбцы группировки
+
+    Returns:
+        DataFrame с индексом по keys и столбцами median, mad, count
+    """
+    grouped = frame.groupby(keys)['spent']
+    median = grouped.transform('median')
+    stats = pd.DataFrame({'median': grouped.median(), 'count': grouped.size()})
+    stats['mad'] = (frame['spent'] - median).abs().groupby([frame[key] for key in keys]).median()
+    return stats
+
+
+def _shares(frame: pd.DataFrame, column: str) -> pd.Series:
+    """Доля операций карты с каждым значением столбца (MCC, час)."""
+    counts = frame.groupby(['card', column]).size()
+    return counts / counts.groupby(level='card').transform('sum')
+
+
+def _replace(stats: pd.DataFrame, fresh: pd.DataFrame, level: str, touched: Iterable) -> pd.DataFrame:
+    """Заменяет статистику затронутых ключей на пересчитанную."""
+    if stats.empty:
+        return fresh
+    keep = ~stats.index.get_level_values(level).isin(list(touched))
+    return pd.concat([stats[keep], fresh])
+
+
+class AnomalyScorer:
+    """
+    Оценка необычности трат по картам на устойчивых базовых линиях.
+
+    Для каждой пары (карта, категория) и для каждой категории по всем картам
+    хранит медиану и MAD трат за скользящее окно, а для карт - доли MCC и часов
+    операций. Новые операции добавляются инкрементально (update): пересчитываются
+    только затронутые карты и категории, а не вся история. Оценка (score) -
+    векторное сопоставление операций с сохраненными базовыми линиями.
+    """
+
+    def __init__(self, window_days: int = 90, threshold: float = 3.5, min_history: int = 5,
+                 rare_share: float = 0.02) -> None:
+        """
+        Args:
+            window_days: Длина скользящего окна базовых линий в днях
+            threshold: Порог устойчивой z-оценки суммы для флага необычной траты
+            min_history: Минимум трат в базовой линии для оценки
+            rare_share: Доля операций карты, ниже которой MCC или час считаются необычными
+        """
+        self.window_days = window_days
+        self.threshold = threshold
+        self.min_history = min_history
+        self.rare_share = rare_share
+        self._history = pd.DataFrame(columns=HISTORY_COLUMNS)
+        self._amounts = pd.DataFrame(columns=['median', 'count', 'mad'])
+        self._categories = pd.DataFrame(columns=['median', 'count', 'mad'])
+        self._mcc = pd.Series(dtype='float64')
+        self._hours = pd.Series(dtype='float64')
+        self._card_counts = pd.Series(dtype='int64')
+
+    def __len__(self) -> int:
+        return len(self._history)
+
+    @staticmethod
+    def _prepare(chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Отбирает успешные траты и приводит их к столбцам HISTORY_COLUMNS.
+
+        Args:
+            chunk: DataFrame с транзакциями
+
+        Returns:
+            DataFrame с индексом исходных строк
+        """
+        spending = pd.to_numeric(chunk['amount'], errors='coerce') < 0
+        if 'status' in chunk.columns:
+            spending &= chunk['status'].ne('FAILED')
+        ops = chunk[spending & chunk['date'].notna()]
+
+        def column(name: str) -> pd.Series:
+            if name in ops.columns:
+                return ops[name]
+            return pd.Series(np.nan, index=ops.index)
+
+        dates = pd.to_datetime(ops['date'])
+        return pd.DataFrame({
+            'date': dates,
+            'card': column('card_last_digits').fillna('').astype(str),
+            'category': column('category').fillna('').astype(str),
+            'mcc': pd.to_numeric(column('mcc'), errors='coerce').fillna(-1).astype('int64'),
+            'hour': dates.dt.hour,
+            'spent': -pd.to_numeric(ops['amount'], errors='coerce'),
+        }, index=ops.index)
+
+    def update(self, chunk: pd.DataFrame) -> 'AnomalyScorer':
+        """
+        Добавляет операции в базовые линии и сдвигает окно.
+        Пересчитываются только карты и категории, у которых добавились
+        или вышли из окна операции.
+
+        Args:
+            chunk: DataFrame с новыми транзакциями
+
+        Returns:
+            Этот же объект (для цепочек вызовов)
+        """
+        if chunk.empty:
+            return self
+        ops = self._prepare(chunk)
+        if ops.empty:
+            return self
+
+        history = ops[HISTORY_COLUMNS] if self._history.empty else pd.concat(
+            [self._history, ops[HISTORY_COLUMNS]], ignore_index=True)
+        in_window = (history['date'] > history['date'].max() - pd.Timedelta(days=self.window_days)).to_numpy()
+        expired = history[~in_window]
+        self._history = history[in_window].reset_index(drop=True)
+
+        touched_cards = set(ops['card']) | set(expired['card'])
+        touched_categories = set(ops['category']) | set(expired['category'])
+        by_card = self._history[self._history['card'].isin(touched_cards)]
+        by_category = self._history[self._history['category'].isin(touched_categories)]
+
+        self._amounts = _replace(self._amounts, _robust_stats(by_card, ['card', 'category']), 'card', touched_cards)
+        self._categories = _replace(self._categories, _robust_stats(by_category, ['category']), 'category',
+                                    touched_categories)
+        self._mcc = _replace(self._mcc, _shares(by_card, 'mcc'), 'card', touched_cards)
+        self._hours = _replace(self._hours, _shares(by_card, 'hour'), 'card', touched_cards)
+        self._card_counts = _replace(self._card_counts, by_card.groupby('card').size(), 'card', touched_cards)
+
+        logger.debug(f"Базовые линии обновлены: +{len(ops)} трат, карт затронуто {len(touched_cards)}")
+        return self
+
+    def score(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Оценивает операции относительно текущих базовых линий (без их изменения).
+
+        Сумма сравнивается с базовой линией пары (карта, категория), а если по паре
+        мало истории - с базовой линией категории. Флаг unusual_amount ставится
+        только для трат заметно больше обычных.
+
+        Args:
+            chunk: DataFrame с транзакциями
+
+        Returns:
+            DataFrame с индексом chunk и столбцами SCORE_COLUMNS
+            (для доходов и неуспешных операций оценка NaN, флаги False)
+        """
+        result = pd.DataFrame({
+            'amount_score': np.nan,
+            'unusual_amount': False,
+            'unusual_mcc': False,
+            'unusual_hour': False,
+            'anomaly': False,
+        }, index=chunk.index)
+        if chunk.empty:
+            return result
+        ops = self._prepare(chunk)
+        if ops.empty:
+            return result
+
+        pairs = pd.MultiIndex.from_arrays([ops['card'], ops['category']])
+        pair_stats = self._amounts.reindex(pairs)
+        category_stats = self._categories.reindex(ops['category'])
+        pair_count = pair_stats['count'].to_numpy(dtype='float64')
+        use_pair = pair_count >= self.min_history
+
+        def pick(column: str) -> np.ndarray:
+            return np.where(use_pair, pair_stats[column].to_numpy(dtype='float64'),
+                            category_stats[column].to_numpy(dtype='float64'))
+
+        median, mad, count = pick('median'), pick('mad'), pick('count')
+        mad = np.maximum(mad, np.maximum(median * MIN_MAD_SHARE, MIN_MAD))
+        amount_score = MAD_SCALE * (ops['spent'].to_numpy() - median) / mad
+        enough = count >= self.min_history
+
+        known_card = self._card_counts.reindex(ops['card']).fillna(0).to_numpy() >= self.min_history
+        mcc_share = self._mcc.reindex(pd.MultiIndex.from_arrays([ops['card'], ops['mcc']])).fillna(0).to_numpy()
+        hour_share = self._hours.reindex(pd.MultiIndex.from_arrays([ops['card'], ops['hour']])).fillna(0).to_numpy()
+
+        unusual_amount = enough & (amount_score > self.threshold)
+        unusual_mcc = known_card & (ops['mcc'].to_numpy() >= 0) & (mcc_share < self.rare_share)
+        unusual_hour = known_card & (hour_share < self.rare_share)
+
+        result.loc[ops.index, 'amount_score'] = np.where(enough, amount_score, np.nan)
+        result.loc[ops.index, 'unusual_amount'] = unusual_amount
+        result.loc[ops.index, 'unusual_mcc'] = unusual_mcc
+        result.loc[ops.index, 'unusual_hour'] = unusual_hour
+        result.loc[ops.index, 'anomaly'] = unusual_amount | unusual_mcc | unusual_hour
+        return result
+
+
+@timed()
+def detect_anomalies(
+        transactions: pd.DataFrame,
+        date_str: str,
+        window_days: int = 90,
+        threshold: float = 3.5,
+        scorer: Optional[AnomalyScorer] = None
+) -> pd.DataFrame:
+    """
+    Находит необычные операции за день: базовые линии строятся по операциям
+    окна до этого дня, затем операции дня оцениваются векторно.
+
+    Args:
+        transactions: DataFrame с транзакциями
+        date_str: День анализа в формате 'YYYY-MM-DD'
+        window_days: Длина окна базовых линий в днях
+        threshold: Порог устойчивой z-оценки суммы
+        scorer: Готовый AnomalyScorer с базовыми линиями до этого дня
+            (если передан, история заново не обрабатывается)
+
+    Returns:
+        Операции дня с флагами, хотя бы один из которых выставлен
+    """
+    day = pd.Timestamp(datetime.strptime(date_str, '%Y-%m-%d'))
+    dates = pd.to_datetime(transactions['date'])
+    if scorer is None:
+        scorer = AnomalyScorer(window_days=window_days, threshold=threshold)
+        scorer.update(transactions[(dates >= day - pd.Timedelta(days=window_days)) & (dates < day)])
+
+    operations = transactions[(dates >= day) & (dates < day + pd.Timedelta(days=1))]
+    scored = operations.join(scorer.score(operations))
+    flagged = scored[scored['anomaly']]
+    logger.info(f"Необычных операций за {date_str}: {len(flagged)} из {len(operations)}")
+    return flagged
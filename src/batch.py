@@ -0,0 +1,273 @@
+import argparse
+import functools
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Set
+
+import pandas as pd
+
+from src.main import generate_home_history
+from src.utils import load_transactions, setup_logging
+from src.views import get_market_snapshot
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Снимок котировок, общий для всех заданий воркера
+_worker_market: Optional[Dict[str, List[Dict[str, Any]]]] = None
+
+
+def read_manifest(path: str) -> List[Dict[str, Any]]:
+    """
+    Читает манифест пакетной обработки.
+    Поддерживаются CSV (столбцы file, dates, output; даты через ';')
+    и JSON Lines (объекты с полями file, dates, output и необязательным id).
+
+    Args:
+        path: Путь к манифесту (.csv, .ndjson, .jsonl)
+
+    Returns:
+        Список заданий с полями id, file, dates, output
+    """
+    if path.endswith('.csv'):
+        records = pd.read_csv(path, dtype=str, keep_default_na=False).to_dict('records')
+    elif path.endswith(('.ndjson', '.jsonl')):
+        with open(path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    else:
+        raise ValueError("Манифест должен быть .csv, .ndjson или .jsonl")
+
+    entries = []
+    for record in records:
+        dates = record['dates']
+        if isinstance(dates, str):
+            dates = [d.strip() for d in dates.replace(',', ';').split(';') if d.strip()]
+        entries.append({
+            'id': record.get('id') or f"{record['file']}|{record['output']}",
+            'file': record['file'],
+            'dates': list(dates),
+            'output': record['output'],
+        })
+    return entries
+
+
+def read_journal(path: str) -> Set[str]:
+    """
+    Возвращает идентификаторы заданий, успешно выполненных в прошлых запусках.
+
+    Args:
+        path: Путь к журналу (NDJSON)
+
+    Returns:
+        Множество id выполненных заданий
+    """
+    if not os.path.exists(path):
+        return set()
+    done = set()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Последняя строка могла оборваться при аварийной остановке
+                continue
+            if record.get('status') == 'ok':
+                done.add(record['id'])
+    return done
+
+
+@functools.lru_cache(maxsize=4)
+def _load_dataset(file_path: str, mtime: float) -> pd.DataFrame:
+    """Загружает выгрузку один раз на группу заданий (ключ включает время изменения файла)."""
+    return load_transactions(file_path)
+
+
+def _init_worker(market: Dict[str, List[Dict[str, Any]]]) -> None:
+    """Сохраняет общий снимок котировок в воркере."""
+    global _worker_market
+    _worker_market = market
+
+
+def write_payloads(output: str, file_path: str, payloads: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Записывает данные домашней страницы в NDJSON или Parquet.
+    Запись идет во временный файл с последующим переименованием,
+    поэтому прерванный запуск не оставляет частично записанных результатов.
+
+    Args:
+        output: Путь к файлу результата (.ndjson, .jsonl или .parquet)
+        file_path: Исходная выгрузка
+        payloads: Словарь дата -> данные домашней страницы
+
+    Returns:
+        None
+    """
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{output}.tmp"
+
+    rows = [
+        {'file': file_path, 'date': date, 'payload': payload}
+        for date, payload in payloads.items()
+    ]
+    if output.endswith('.parquet'):
+        frame = pd.DataFrame({
+            'file': [row['file'] for row in rows],
+            'date': [row['date'] for row in rows],
+            'payload': [json.dumps(row['payload'], ensure_ascii=False, default=str) for row in rows],
+        })
+        frame.to_parquet(tmp_path, index=False)
+    else:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False, default=str) + '\n')
+    os.replace(tmp_path, output)
+
+
+def process_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Выполняет одно задание манифеста (в воркере).
+
+    Args:
+        entry: Задание с полями id, file, dates, output
+
+    Returns:
+        Запись журнала: id, status, payloads или error, seconds
+    """
+    start = time.perf_counter()
+    try:
+        df = _load_dataset(entry['file'], os.path.getmtime(entry['file']))
+        payloads = generate_home_history(df, entry['dates'], market=_worker_market)
+        write_payloads(entry['output'], entry['file'], payloads)
+        return {
+            'id': entry['id'],
+            'status': 'ok',
+            'payloads': len(payloads),
+            'seconds': round(time.perf_counter() - start, 4)
+        }
+    except Exception as e:
+        logger.error(f"Ошибка в задании {entry['id']}: {str(e)}")
+        return {
+            'id': entry['id'],
+            'status': 'error',
+            'error': f"{type(e).__name__}: {e}",
+            'seconds': round(time.perf_counter() - start, 4)
+        }
+
+
+def process_group(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Выполняет подряд задания манифеста по одной выгрузке (в воркере),
+    поэтому выгрузка загружается один раз на группу.
+
+    Args:
+        entries: Задания с одинаковым полем file
+
+    Returns:
+        Записи журнала по каждому заданию
+    """
+    return [process_entry(entry) for entry in entries]
+
+
+def run_batch(
+        manifest_path: str,
+        journal_path: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        market: Optional[Dict[str, List[Dict[str, Any]]]] = None
+) -> Dict[str, Any]:
+    """
+    Генерирует данные домашней страницы для всех заданий манифеста в пуле процессов.
+    Котировки запрашиваются один раз на весь пакет. Выполненные задания
+    записываются в журнал, и повторный запуск пропускает их.
+
+    Args:
+        manifest_path: Путь к манифесту
+        journal_path: Путь к журналу (по умолчанию - рядом с манифестом)
+        max_workers: Число процессов (1 - обработка в текущем процессе)
+        market: Готовый снимок котировок (по умолчанию запрашивается один раз)
+
+    Returns:
+        Сводка: total, skipped, succeeded, failed, payloads, seconds,
+        entries_per_second, payloads_per_second, failures
+    """
+    journal_path = journal_path or f"{manifest_path}.journal.ndjson"
+    entries = read_manifest(manifest_path)
+    done = read_journal(journal_path)
+    pending = [entry for entry in entries if entry['id'] not in done]
+    # Задания по одному файлу уходят в воркер одной группой и используют одну загрузку выгрузки
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in pending:
+        groups.setdefault(entry['file'], []).append(entry)
+    logger.info(f"Пакет: {len(entries)} заданий, к выполнению {len(pending)}, пропущено {len(entries) - len(pending)}")
+
+    if market is None:
+        market = get_market_snapshot()
+
+    summary: Dict[str, Any] = {
+        'total': len(entries),
+        'skipped': len(entries) - len(pending),
+        'succeeded': 0,
+        'failed': 0,
+        'payloads': 0,
+        'failures': [],
+    }
+    start = time.perf_counter()
+
+    def record(result: Dict[str, Any], journal: Any) -> None:
+        journal.write(json.dumps(result, ensure_ascii=False) + '\n')
+        journal.flush()
+        if result['status'] == 'ok':
+            summary['succeeded'] += 1
+            summary['payloads'] += result['payloads']
+        else:
+            summary['failed'] += 1
+            summary['failures'].append({'id': result['id'], 'error': result['error']})
+
+    with open(journal_path, 'a', encoding='utf-8') as journal:
+        if max_workers == 1:
+            _init_worker(market)
+            for group in groups.values():
+                for result in process_group(group):
+                    record(result, journal)
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                     initargs=(market,)) as executor:
+                futures = [executor.submit(process_group, group) for group in groups.values()]
+                for future in as_completed(futures):
+                    for result in future.result():
+                        record(result, journal)
+
+    elapsed = time.perf_counter() - start
+    summary['seconds'] = round(elapsed, 3)
+    summary['entries_per_second'] = round(len(pending) / elapsed, 2) if elapsed > 0 else 0.0
+    summary['payloads_per_second'] = round(summary['payloads'] / elapsed, 2) if elapsed > 0 else 0.0
+    logger.info(
+        f"Пакет завершен за {summary['seconds']} с: успешно {summary['succeeded']}, "
+        f"ошибок {summary['failed']}, {summary['payloads_per_second']} страниц/с"
+    )
+    return summary
+
+
+def batch_main() -> None:
+    """
+    Точка входа пакетного режима.
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description='Пакетная генерация данных домашней страницы')
+    parser.add_argument('manifest', help='Манифест: CSV (file, dates, output) или NDJSON')
+    parser.add_argument('--journal', default=None, help='Журнал выполненных заданий для продолжения')
+    parser.add_argument('--workers', type=int, default=None, help='Число процессов')
+    args = parser.parse_args()
+
+    summary = run_batch(args.manifest, args.journal, args.workers)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    batch_main()
@@ -0,0 +1,185 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from src.profiling import timed
+
+logger = logging.getLogger(__name__)
+
+# Пользователь по умолчанию для данных без столбца user
+DEFAULT_USER = 'default'
+
+# Ключи накопленных сумм
+BUDGET_KEYS = ['user', 'month', 'category']
+
+# Столбцы результата оценки бюджетов
+BUDGET_COLUMNS = [
+    'user', 'month', 'category', 'limit', 'spent', 'percent_used',
+    'daily_rate', 'forecast', 'projected_overspend', 'status'
+]
+
+Budgets = Union[pd.DataFrame, List[Dict[str, Any]]]
+
+
+def _category_key(categories: pd.Series) -> pd.Series:
+    """Ключ сопоставления категорий: без пробелов по краям и без учета регистра."""
+    return categories.astype(str).str.strip().str.casefold()
+
+
+class BudgetTracker:
+    """
+    Накопленные траты по (пользователь, месяц, категория) для оценки бюджетов.
+
+    Новые операции добавляются инкрементально (update): суммируются только они,
+    история заново не просматривается. Суммы хранятся в копейках, как в частичных
+    агрегатах отчётов, поэтому результат не зависит от порядка и размера частей.
+    Оценка всех бюджетов всех пользователей (evaluate) - один векторный проход
+    по таблице бюджетов.
+    """
+
+    def __init__(self) -> None:
+        index = pd.MultiIndex.from_arrays([[], [], []], names=BUDGET_KEYS)
+        self._totals = pd.DataFrame({'sum': pd.Series(dtype='int64'), 'count': pd.Series(dtype='int64')},
+                                    index=index)
+        self._last_date = pd.Series(dtype='datetime64[ns]')
+
+    def __len__(self) -> int:
+        return len(self._totals)
+
+    def update(self, chunk: pd.DataFrame, user: str = DEFAULT_USER) -> 'BudgetTracker':
+        """
+        Добавляет траты в накопленные суммы.
+
+        Args:
+            chunk: DataFrame с новыми транзакциями (со столбцом user - для многих пользователей)
+            user: Пользователь для данных без столбца user
+
+        Returns:
+            Этот же объект (для цепочек вызовов)
+        """
+        if chunk.empty:
+            return self
+        dates = pd.to_datetime(chunk['date'])
+        users = chunk['user'].astype(str) if 'user' in chunk.columns else pd.Series(user, index=chunk.index)
+
+        last = dates.groupby(users).max()
+        self._last_date = last if self._last_date.empty else pd.concat(
+            [self._last_date, last]).groupby(level=0).max()
+
+        spending = (chunk['amount'] < 0) & dates.notna()
+        if not spending.any():
+            return self
+        kopecks = (chunk.loc[spending, 'amount'] * -100).round().astype('int64')
+        categories = chunk['category'] if 'category' in chunk.columns else pd.Series(np.nan, index=chunk.index)
+        part = kopecks.groupby([
+            users[spending].rename('user'),
+            dates[spending].dt.strftime('%Y-%m').rename('month'),
+            categories[spending].fillna('').astype(str).rename('category'),
+        ]).agg(['sum', 'count'])
+
+        self._totals = part if self._totals.empty else self._totals.add(part, fill_value=0).astype('int64')
+        logger.debug(f"Бюджеты: добавлено {int(spending.sum())} трат, ключей {len(self._totals)}")
+        return self
+
+    def totals(self) -> pd.DataFrame:
+        """
+        Возвращает накопленные траты.
+
+        Returns:
+            DataFrame: user, month, category, spent (в рублях), count
+        """
+        result = self._totals.reset_index()
+        result['spent'] = result.pop('sum') / 100
+        return result[['user', 'month', 'category', 'spent', 'count']]
+
+    def evaluate(self, budgets: Budgets, as_of: Optional[Union[str, datetime]] = None,
+                 user: str = DEFAULT_USER) -> pd.DataFrame:
+        """
+        Оценивает бюджеты: процент использования и линейный прогноз трат
+        на конец месяца по среднему дневному темпу.
+
+        Args:
+            budgets: Бюджеты со столбцами category, limit и необязательными user и month
+                ('YYYY-MM'; по умолчанию - месяц даты оценки)
+            as_of: Дата оценки (по умолчанию - дата последней операции пользователя)
+            user: Пользователь для бюджетов без столбца user
+
+        Returns:
+            DataFrame со столбцами BUDGET_COLUMNS; status - 'ok', 'at_risk'
+            (прогноз превышает лимит) или 'over' (лимит уже превышен).
+            Категории бюджетов и трат сравниваются без учета регистра и пробелов по краям.
+        """
+        frame = pd.DataFrame(budgets)
+        if frame.empty:
+            return pd.DataFrame(columns=BUDGET_COLUMNS)
+        users = frame['user'].astype(str) if 'user' in frame.columns else pd.Series(user, index=frame.index)
+
+        if as_of is not None:
+            dates = pd.Series(pd.Timestamp(as_of), index=frame.index)
+        else:
+            dates = pd.Series(self._last_date.reindex(users).to_numpy(), index=frame.index)
+            dates = dates.fillna(pd.Timestamp(datetime.now()))
+        dates = dates.dt.normalize()
+        months = dates.dt.strftime('%Y-%m')
+        if 'month' in frame.columns:
+            months = frame['month'].where(frame['month'].notna(), months).astype(str)
+
+        totals = self._totals['sum']
+        totals = totals.groupby([
+            totals.index.get_level_values('user'),
+            totals.index.get_level_values('month'),
+            _category_key(totals.index.get_level_values('category').to_series()).to_numpy(),
+        ]).sum()
+        keys = pd.MultiIndex.from_arrays([users, months, _category_key(frame['category'])], names=BUDGET_KEYS)
+        spent = totals.reindex(keys).fillna(0).to_numpy() / 100
+        limit = frame['limit'].to_numpy(dtype='float64')
+
+        month_start = pd.PeriodIndex(months, freq='M').start_time
+        days_in_month = month_start.days_in_month.to_numpy()
+        elapsed = np.clip((dates.to_numpy() - month_start.to_numpy()) // np.timedelta64(1, 'D') + 1,
+                          1, days_in_month)
+        daily_rate = spent / elapsed
+        forecast = daily_rate * days_in_month
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percent_used = np.where(limit > 0, spent / limit * 100, np.nan)
+        status = np.select([spent > limit, forecast > limit], ['over', 'at_risk'], 'ok')
+
+        result = pd.DataFrame({
+            'user': users.to_numpy(),
+            'month': months.to_numpy(),
+            'category': frame['category'].to_numpy(),
+            'limit': limit,
+            'spent': spent.round(2),
+            'percent_used': percent_used.round(1),
+            'daily_rate': daily_rate.round(2),
+            'forecast': forecast.round(2),
+            'projected_overspend': np.maximum(forecast - limit, 0).round(2),
+            'status': status,
+        }, index=frame.index)
+        return result[BUDGET_COLUMNS]
+
+
+@timed()
+def evaluate_budgets(
+        transactions: pd.DataFrame,
+        budgets: Budgets,
+        as_of: Optional[Union[str, datetime]] = None
+) -> pd.DataFrame:
+    """
+    Оценивает бюджеты по категориям сразу для всех пользователей.
+
+    Args:
+        transactions: DataFrame с транзакциями (со столбцом user - для многих пользователей)
+        budgets: Бюджеты: category, limit и необязательные user, month
+        as_of: Дата оценки (по умолчанию - дата последней операции пользователя)
+
+    Returns:
+        DataFrame со столбцами BUDGET_COLUMNS
+    """
+    result = BudgetTracker().update(transactions).evaluate(budgets, as_of)
+    logger.info(f"Оценено бюджетов: {len(result)}, превышено: {int((result['status'] == 'over').sum())}")
+    return result
@@ -0,0 +1,481 @@
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+import threading
+import weakref
+from collections import OrderedDict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from src.dataset import TransactionDataset
+from src.utils import dataset_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Переменные окружения: каталог дискового уровня кеша и отключение кеша ('0')
+CACHE_DIR_ENV = 'MONEYTALKS_CACHE_DIR'
+CACHE_ENABLED_ENV = 'MONEYTALKS_CACHE'
+
+# Лимиты размера уровней кеша
+MEMORY_LIMIT_BYTES = 64 * 1024 * 1024
+DISK_LIMIT_BYTES = 512 * 1024 * 1024
+
+# Аргументы, которые не влияют на результат и не входят в ключ
+IGNORED_ARGUMENTS = ('transactions', 'rollups', 'skip_save', 'filename')
+
+# Аргументы, для которых None означает текущий момент: такие вызовы не кешируются
+NOW_ARGUMENTS = ('date',)
+
+_MISSING = object()
+
+# Версии данных в памяти, заданные вызывающим кодом: id -> (слабая ссылка, версия)
+_data_versions: Dict[int, Tuple[Any, str]] = {}
+
+# Отпечатки содержимого файлов: (путь, размер, время изменения) -> SHA-1
+_file_fingerprints: 'OrderedDict[Tuple[str, int, int], str]' = OrderedDict()
+MAX_FILE_FINGERPRINTS = 256
+
+
+def file_fingerprint(path: Any) -> Optional[str]:
+    """
+    Вычисляет отпечаток содержимого файла. Для неизменившегося файла
+    (тот же размер и время изменения) отпечаток считается один раз.
+
+    Args:
+        path: Путь к файлу
+
+    Returns:
+        Шестнадцатеричная строка SHA-1 или None, если файла нет
+    """
+    path = os.path.abspath(str(path))
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    cached = _file_fingerprints.get(key)
+    if cached is not None:
+        return cached
+
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(functools.partial(f.read, 1024 * 1024), b''):
+            digest.update(block)
+    _file_fingerprints[key] = digest.hexdigest()
+    if len(_file_fingerprints) > MAX_FILE_FINGERPRINTS:
+        _file_fingerprints.popitem(last=False)
+    return _file_fingerprints[key]
+
+
+def set_data_version(data: Any, version: str) -> None:
+    """
+    Задает версию данных в памяти (DataFrame или TransactionDataset без файла),
+    чтобы результаты по ним кешировались. Содержимое не хешируется: после
+    изменения данных на месте вызывающий код задает новую версию.
+
+    Args:
+        data: Данные
+        version: Версия (например, номер загрузки или время изменения источника)
+
+    Returns:
+        None
+    """
+    key = id(data)
+    _data_versions[key] = (weakref.ref(data, lambda _, k=key: _data_versions.pop(k, None)), str(version))
+
+
+def data_fingerprint(data: Any) -> Optional[str]:
+    """
+    Вычисляет отпечаток входных данных без хеширования строк: для файла и набора
+    данных Arrow из файла - по содержимому файла (считается один раз на версию
+    файла), для данных в памяти - по версии из set_data_version.
+
+    Args:
+        data: Входные данные
+
+    Returns:
+        Строка отпечатка или None, если отпечаток не вычисляется (данные
+        в памяти без версии, список словарей) - тогда результат не кешируется
+    """
+    try:
+        if isinstance(data, (str, Path)):
+            return file_fingerprint(data)
+        if isinstance(data, TransactionDataset) and data.path is not None:
+            source = file_fingerprint(data.path)
+            return source and f"{source}:{data.offset}:{len(data)}:{','.join(data.columns)}"
+        versioned = _data_versions.get(id(data))
+        if versioned is not None and versioned[0]() is data:
+            return f"{type(data).__name__}:{versioned[1]}"
+    except Exception as e:
+        logger.debug(f"Отпечаток данных не вычислен: {e}")
+    return None
+
+
+def _normalize(name: str, value: Any) -> Any:
+    """Приводит аргумент к стабильному представлению для ключа кеша."""
+    fingerprint = getattr(value, 'fingerprint', None)
+    if isinstance(fingerprint, str):
+        return fingerprint
+    if name == 'date' or name.endswith('_date'):
+        if isinstance(value, (str, date, datetime, pd.Timestamp)):
+            try:
+                return pd.Timestamp(value).isoformat()
+            except ValueError:
+                pass
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_normalize(name, item) for item in value]
+        return sorted(items, key=repr) if isinstance(value, (set, frozenset)) else items
+    if isinstance(value, dict):
+        return {str(key): _normalize(str(key), item) for key, item in sorted(value.items(), key=repr)}
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return repr(value)
+
+
+def make_key(name: str, fingerprint: str, arguments: Dict[str, Any]) -> str:
+    """
+    Составляет ключ кеша из имени функции, отпечатка данных и аргументов.
+
+    Args:
+        name: Имя функции
+        fingerprint: Отпечаток входных данных
+        arguments: Аргументы вызова (без данных и служебных аргументов)
+
+    Returns:
+        Шестнадцатеричная строка SHA-1
+    """
+    normalized = {
+        key: _normalize(key, value) for key, value in arguments.items() if key not in IGNORED_ARGUMENTS
+    }
+    payload = json.dumps([name, fingerprint, normalized], sort_keys=True, ensure_ascii=False, default=repr)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def result_digest(result: Any) -> str:
+    """
+    Вычисляет отпечаток результата (для проверки, изменился ли выходной файл).
+
+    Args:
+        result: DataFrame или другой результат
+
+    Returns:
+        Шестнадцатеричная строка SHA-1
+    """
+    if isinstance(result, pd.DataFrame):
+        return dataset_fingerprint(result)
+    return hashlib.sha1(str(result).encode('utf-8')).hexdigest()
+
+
+def _copy(value: Any) -> Any:
+    """Копирует результат, чтобы вызывающий код не изменил закешированное значение."""
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    return copy.deepcopy(value)
+
+
+def _size(value: Any) -> int:
+    """Оценивает размер результата в байтах."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class ResultCache:
+    """
+    Кеш результатов отчетов и сервисов: LRU в памяти и, если задан каталог,
+    дисковый уровень (pickle), оба с вытеснением по суммарному размеру.
+    Ведет счетчики попаданий и промахов (stats) и помнит отпечатки
+    записанных выходных файлов, чтобы не перезаписывать неизменившиеся.
+    """
+
+    def __init__(self, max_bytes: int = MEMORY_LIMIT_BYTES, directory: Optional[str] = None,
+                 max_disk_bytes: int = DISK_LIMIT_BYTES) -> None:
+        """
+        Args:
+            max_bytes: Лимит размера кеша в памяти
+            directory: Каталог дискового уровня (None - только память)
+            max_disk_bytes: Лимит размера дискового уровня
+        """
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: 'OrderedDict[str, Tuple[Any, int]]' = OrderedDict()
+        self._bytes = 0
+        self._outputs: Dict[str, Tuple[str, int, int]] = {}
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key: str) -> Any:
+        """
+        Ищет результат сначала в памяти, затем на диске.
+
+        Args:
+            key: Ключ (make_key)
+
+        Returns:
+            Копия результата или объект-маркер промаха (см. contains)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                self._counters['memory_hits'] += 1
+                return _copy(entry[0])
+
+        if self.directory:
+            path = self._disk_path(key)
+            try:
+                with open(path, 'rb') as f:
+                    value = pickle.load(f)
+                os.utime(path)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                value = _MISSING
+            if value is not _MISSING:
+                self._remember(key, value)
+                with self._lock:
+                    self._counters['hits'] += 1
+                    self._counters['disk_hits'] += 1
+                return _copy(value)
+
+        with self._lock:
+            self._counters['misses'] += 1
+        return _MISSING
+
+    @staticmethod
+    def contains(value: Any) -> bool:
+        """Проверяет, что get нашел результат."""
+        return value is not _MISSING
+
+    def _remember(self, key: str, value: Any) -> None:
+        size = _size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self._counters['evictions'] += 1
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Сохраняет копию результата в памяти и на диске.
+
+        Args:
+            key: Ключ (make_key)
+            value: Результат
+
+        Returns:
+            None
+        """
+        value = _copy(value)
+        self._remember(key, value)
+        if self.directory:
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Удаляет давно не использованные файлы, пока дисковый уровень больше лимита."""
+        files = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.pkl')]
+        total = sum(entry.stat().st_size for entry in files)
+        for entry in sorted(files, key=lambda item: item.stat().st_mtime_ns):
+            if total <= self.max_disk_bytes:
+                break
+            total -= entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                continue
+            with self._lock:
+                self._counters['evictions'] += 1
+
+    def output_unchanged(self, filename: str, digest: str) -> bool:
+        """
+        Проверяет, что файл уже содержит результат с этим отпечатком
+        и не менялся после записи.
+
+        Args:
+            filename: Путь к выходному файлу
+            digest: Отпечаток результата (result_digest)
+
+        Returns:
+            True, если перезаписывать файл не нужно
+        """
+        path = os.path.abspath(filename)
+        written = self._outputs.get(path)
+        if written is None:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return written == (digest, stat.st_size, stat.st_mtime_ns)
+
+    def remember_output(self, filename: str, digest: str) -> None:
+        """
+        Запоминает отпечаток результата, записанного в файл.
+
+        Args:
+            filename: Путь к выходному файлу
+            digest: Отпечаток результата (result_digest)
+
+        Returns:
+            None
+        """
+        path = os.path.abspath(filename)
+        stat = os.stat(path)
+        self._outputs[path] = (digest, stat.st_size, stat.st_mtime_ns)
+
+    def clear(self) -> None:
+        """Очищает кеш в памяти и на диске, сбрасывает счетчики."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._outputs.clear()
+            self._counters = dict.fromkeys(self._counters, 0)
+        if self.directory:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.pkl'):
+                    os.remove(entry.path)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счетчики кеша.
+
+        Returns:
+            Словарь: hits, memory_hits, disk_hits, misses, evictions,
+            entries, bytes, hit_rate
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        calls = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / calls, 4) if calls else 0.0
+        return stats
+
+
+_cache: Optional[ResultCache] = None
+_cache_configured = False
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """
+    Возвращает общий кеш результатов. При первом обращении он создается
+    по переменным окружения: MONEYTALKS_CACHE=0 отключает кеш,
+    MONEYTALKS_CACHE_DIR включает дисковый уровень.
+
+    Returns:
+        ResultCache или None, если кеш отключен
+    """
+    global _cache, _cache_configured
+    if not _cache_configured:
+        if os.getenv(CACHE_ENABLED_ENV, '1') != '0':
+            _cache = ResultCache(directory=os.getenv(CACHE_DIR_ENV) or None)
+        _cache_configured = True
+    return _cache
+
+
+def set_result_cache(cache: Optional[ResultCache]) -> None:
+    """
+    Заменяет общий кеш результатов (None - отключить кеширование).
+
+    Args:
+        cache: Новый кеш
+
+    Returns:
+        None
+    """
+    global _cache, _cache_configured
+    _cache = cache
+    _cache_configured = True
+
+
+def call_key(func: Callable, data_arg: str, args: Tuple[Any, ...],
+             kwargs: Dict[str, Any]) -> Optional[str]:
+    """
+    Составляет ключ кеша для вызова функции или None, если вызов не кешируется
+    (отпечаток данных не вычисляется или результат зависит от текущего момента).
+
+    Args:
+        func: Исходная функция
+        data_arg: Имя аргумента с входными данными
+        args: Позиционные аргументы вызова
+        kwargs: Именованные аргументы вызова
+
+    Returns:
+        Ключ или None
+    """
+    try:
+        bound = inspect.signature(func).bind(*args, **kwargs)
+    except TypeError:
+        return None
+    bound.apply_defaults()
+    arguments = dict(bound.arguments)
+    for name, parameter in inspect.signature(func).parameters.items():
+        if parameter.kind == inspect.Parameter.VAR_KEYWORD:
+            arguments.update(arguments.pop(name, {}))
+
+    if any(name in arguments and arguments[name] is None for name in NOW_ARGUMENTS):
+        return None
+    fingerprint = data_fingerprint(arguments.pop(data_arg, None))
+    if fingerprint is None:
+        return None
+    return make_key(f"{func.__module__}.{func.__qualname__}", fingerprint, arguments)
+
+
+def memoized(data_arg: str) -> Callable:
+    """
+    Декоратор: кеширует результат функции по отпечатку входных данных
+    и нормализованным аргументам в общем кеше результатов.
+
+    Args:
+        data_arg: Имя аргумента с транзакциями
+
+    Returns:
+        Декорированную функцию
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            cache = get_result_cache()
+            key = call_key(func, data_arg, args, kwargs) if cache is not None else None
+            if key is None:
+                return func(*args, **kwargs)
+
+            cached = cache.get(key)
+            if cache.contains(cached):
+                logger.debug(f"Результат {func.__name__} взят из кеша")
+                return cached
+            result = func(*args, **kwargs)
+            cache.put(key, result)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,287 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    yaml = None
+    YAML_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Переменная окружения с путем к файлу правил кешбэка
+RULES_ENV = 'CASHBACK_RULES'
+
+# Ставка по умолчанию (как в calculate_cashback)
+DEFAULT_RATE = 0.01
+
+
+class CashbackRules:
+    """
+    Набор правил кешбэка, скомпилированный в таблицы поиска.
+
+    Правило задает ставку для списка категорий, MCC или диапазонов MCC,
+    минимальную сумму операции и месячный лимит кешбэка по карте.
+    Операция получает ставку первого подходящего правила (по порядку в наборе),
+    остальные траты - ставку по умолчанию. Исключенные категории, MCC и статусы
+    кешбэк не получают.
+
+    Правила сопоставляются не с каждой строкой, а с уникальными категориями и MCC,
+    поэтому расчет по всему DataFrame - один векторный проход независимо
+    от числа правил. Лимиты применяются через накопленные суммы по группам
+    (карта, месяц, правило) в порядке дат.
+    """
+
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None, default_rate: float = DEFAULT_RATE,
+                 min_amount: float = 0.0, monthly_cap: Optional[float] = None,
+                 exclude_categories: Iterable[str] = (), exclude_mcc: Iterable[int] = (),
+                 exclude_statuses: Iterable[str] = ()) -> None:
+        """
+        Args:
+            rules: Список правил: name, rate, categories, mcc, mcc_ranges, min_amount, monthly_cap
+            default_rate: Ставка для трат, не попавших ни в одно правило
+            min_amount: Минимальная сумма траты для любого кешбэка
+            monthly_cap: Общий месячный лимит кешбэка по карте
+            exclude_categories: Категории без кешбэка
+            exclude_mcc: MCC без кешбэка
+            exclude_statuses: Статусы операций без кешбэка (например, 'FAILED')
+        """
+        self.config = {
+            'default_rate': default_rate,
+            'min_amount': min_amount,
+            'monthly_cap': monthly_cap,
+            'exclude_categories': list(exclude_categories),
+            'exclude_mcc': [int(mcc) for mcc in exclude_mcc],
+            'exclude_statuses': list(exclude_statuses),
+            'rules': [self._validate(rule, i) for i, rule in enumerate(rules or [])],
+        }
+        self.rules = self.config['rules']
+        self.default_rate = default_rate
+        self.min_amount = min_amount
+        self.monthly_cap = monthly_cap
+        self.fingerprint = hashlib.sha1(
+            json.dumps(self.config, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+
+        # Таблицы поиска: значение -> индекс первого подходящего правила
+        self._category_rule: Dict[str, int] = {}
+        self._mcc_rule: Dict[int, int] = {}
+        for i, rule in enumerate(self.rules):
+            for category in rule['categories']:
+                self._category_rule.setdefault(category, i)
+            for mcc in rule['mcc']:
+                self._mcc_rule.setdefault(mcc, i)
+        self._mcc_ranges = [(low, high, i) for i, rule in enumerate(self.rules) for low, high in rule['mcc_ranges']]
+
+        # Индекс len(rules) - «нет правила», ставка по умолчанию
+        self._names = np.array([rule['name'] for rule in self.rules] + [None], dtype=object)
+        self._rates = np.array([rule['rate'] for rule in self.rules] + [default_rate], dtype='float64')
+        self._min_amounts = np.array([rule['min_amount'] for rule in self.rules] + [0.0], dtype='float64')
+        self._caps = np.array(
+            [np.inf if rule['monthly_cap'] is None else rule['monthly_cap'] for rule in self.rules] + [np.inf],
+            dtype='float64'
+        )
+
+    @staticmethod
+    def _validate(rule: Dict[str, Any], index: int) -> Dict[str, Any]:
+        """
+        Проверяет правило и дополняет его значениями по умолчанию.
+
+        Args:
+            rule: Правило из конфигурации
+            index: Номер правила (для сообщений об ошибках)
+
+        Returns:
+            Нормализованное правило
+        """
+        name = rule.get('name') or f"rule_{index + 1}"
+        rate = float(rule.get('rate', 0))
+        if not 0 <= rate <= 1:
+            raise ValueError(f"Правило '{name}': ставка должна быть от 0 до 1, получено {rate}")
+        normalized = {
+            'name': name,
+            'rate': rate,
+            'categories': list(rule.get('categories', [])),
+            'mcc': [int(mcc) for mcc in rule.get('mcc', [])],
+            'mcc_ranges': [[int(low), int(high)] for low, high in rule.get('mcc_ranges', [])],
+            'min_amount': float(rule.get('min_amount', 0)),
+            'monthly_cap': None if rule.get('monthly_cap') is None else float(rule['monthly_cap']),
+        }
+        if not (normalized['categories'] or normalized['mcc'] or normalized['mcc_ranges']):
+            raise ValueError(f"Правило '{name}': укажите categories, mcc или mcc_ranges")
+        return normalized
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> 'CashbackRules':
+        """
+        Создает набор правил из словаря конфигурации (содержимого JSON/YAML).
+
+        Args:
+            config: Словарь с ключами rules, default_rate, min_amount, monthly_cap,
+                exclude_categories, exclude_mcc, exclude_statuses
+
+        Returns:
+            CashbackRules
+        """
+        return cls(
+            rules=config.get('rules', []),
+            default_rate=float(config.get('default_rate', DEFAULT_RATE)),
+            min_amount=float(config.get('min_amount', 0)),
+            monthly_cap=None if config.get('monthly_cap') is None else float(config['monthly_cap']),
+            exclude_categories=config.get('exclude_categories', []),
+            exclude_mcc=config.get('exclude_mcc', []),
+            exclude_statuses=config.get('exclude_statuses', []),
+        )
+
+    def _category_lookup(self, categories: pd.Series) -> Any:
+        """Возвращает индекс правила и признак исключения для каждой строки по категории."""
+        codes, uniques = pd.factorize(categories)
+        excluded = set(self.config['exclude_categories'])
+        no_rule = len(self.rules)
+        rule = np.array([self._category_rule.get(value, no_rule) for value in uniques] + [no_rule])
+        blocked = np.array([value in excluded for value in uniques] + [False])
+        return rule[codes], blocked[codes]
+
+    def _mcc_lookup(self, mcc: np.ndarray) -> Any:
+        """Возвращает индекс правила и признак исключения для каждой строки по MCC."""
+        codes, uniques = pd.factorize(mcc)
+        no_rule = len(self.rules)
+        rule = np.array([self._mcc_rule.get(value, no_rule) for value in uniques.tolist()] + [no_rule])
+        for low, high, i in self._mcc_ranges:
+            in_range = np.flatnonzero((uniques >= low) & (uniques <= high))
+            rule[in_range] = np.minimum(rule[in_range], i)
+        blocked = np.append(np.isin(uniques, self.config['exclude_mcc']), False)
+        return rule[codes], blocked[codes]
+
+    @staticmethod
+    def _apply_cap(cashback: np.ndarray, caps: np.ndarray, groups: List[np.ndarray], order: np.ndarray) -> np.ndarray:
+        """
+        Ограничивает кешбэк лимитом по группам: каждой операции достается
+        не больше остатка лимита после предыдущих операций группы.
+
+        Args:
+            cashback: Кешбэк без лимита
+            caps: Лимит для каждой строки (inf - без лимита)
+            groups: Ключи групп для каждой строки
+            order: Порядок строк по дате
+
+        Returns:
+            Кешбэк с учетом лимитов
+        """
+        ordered = pd.Series(cashback[order])
+        running = ordered.groupby([key[order] for key in groups], sort=False).cumsum().to_numpy()
+        spent_before = running - cashback[order]
+        capped = np.empty_like(cashback)
+        capped[order] = np.clip(caps[order] - spent_before, 0, cashback[order])
+        return capped
+
+    def evaluate(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Рассчитывает кешбэк для каждой операции.
+
+        Args:
+            df: DataFrame с транзакциями (date, amount; category, mcc,
+                card_last_digits и status - если есть)
+
+        Returns:
+            DataFrame с индексом df и столбцами rule (имя правила или None),
+            rate и cashback
+        """
+        result = pd.DataFrame({'rule': None, 'rate': 0.0, 'cashback': 0.0}, index=df.index)
+        if df.empty:
+            return result
+
+        amount = pd.to_numeric(df['amount'], errors='coerce').to_numpy(dtype='float64')
+        spent = np.where(amount < 0, -amount, 0.0)
+        eligible = (amount < 0) & (spent >= self.min_amount)
+        if self.config['exclude_statuses'] and 'status' in df.columns:
+            eligible &= ~df['status'].isin(self.config['exclude_statuses']).to_numpy()
+
+        no_rule = len(self.rules)
+        rule = np.full(len(df), no_rule)
+        if 'category' in df.columns:
+            category_rule, blocked = self._category_lookup(df['category'])
+            rule = np.minimum(rule, category_rule)
+            eligible &= ~blocked
+        if 'mcc' in df.columns:
+            mcc = pd.to_numeric(df['mcc'], errors='coerce').fillna(-1).to_numpy(dtype='int64')
+            mcc_rule, blocked = self._mcc_lookup(mcc)
+            rule = np.minimum(rule, mcc_rule)
+            eligible &= ~blocked
+
+        # Трата меньше минимальной суммы правила получает ставку по умолчанию
+        rule = np.where(spent < self._min_amounts[rule], no_rule, rule)
+        rate = np.where(eligible, self._rates[rule], 0.0)
+        cashback = spent * rate
+
+        capped_rules = np.isfinite(self._caps[rule]) & eligible
+        if capped_rules.any() or self.monthly_cap is not None:
+            dates = pd.to_datetime(df['date'])
+            order = np.argsort(dates.to_numpy(), kind='stable')
+            month = (dates.dt.year * 12 + dates.dt.month).fillna(0).to_numpy(dtype='int64')
+            cards = (pd.factorize(df['card_last_digits'])[0] if 'card_last_digits' in df.columns
+                     else np.zeros(len(df), dtype='int64'))
+            if capped_rules.any():
+                cashback = self._apply_cap(cashback, self._caps[rule], [cards, month, rule], order)
+            if self.monthly_cap is not None:
+                cashback = self._apply_cap(cashback, np.full(len(df), self.monthly_cap), [cards, month], order)
+
+        result['rule'] = np.where(eligible, self._names[rule], None)
+        result['rate'] = rate
+        result['cashback'] = cashback
+        return result
+
+
+def load_cashback_rules(path: str) -> CashbackRules:
+    """
+    Загружает набор правил кешбэка из файла JSON или YAML.
+
+    Args:
+        path: Путь к файлу (.json, .yaml, .yml)
+
+    Returns:
+        CashbackRules
+    """
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.json'):
+            config = json.load(f)
+        elif path.endswith(('.yaml', '.yml')):
+            if not YAML_AVAILABLE:
+                raise ImportError("Для правил в формате YAML установите PyYAML")
+            config = yaml.safe_load(f)
+        else:
+            raise ValueError("Файл правил должен быть .json, .yaml или .yml")
+    rules = CashbackRules.from_dict(config or {})
+    logger.info(f"Загружено правил кешбэка: {len(rules.rules)} из {path}")
+    return rules
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_rules(path: str, mtime: float) -> CashbackRules:
+    """Кеширует правила по пути и времени изменения файла."""
+    return load_cashback_rules(path)
+
+
+DEFAULT_RULES = CashbackRules()
+
+
+def get_cashback_rules() -> CashbackRules:
+    """
+    Возвращает действующий набор правил: из файла, указанного в переменной
+    окружения CASHBACK_RULES, или 1% на все траты по умолчанию.
+
+    Returns:
+        CashbackRules
+    """
+    path = os.getenv(RULES_ENV)
+    if not path:
+        return DEFAULT_RULES
+    return _cached_rules(path, os.path.getmtime(path))
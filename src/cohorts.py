@@ -0,0 +1,345 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.profiling import timed
+from src.utils import find_transaction_files, load_transactions
+
+logger = logging.getLogger(__name__)
+
+# Когорта пользователей без явной разметки
+DEFAULT_COHORT = 'all'
+
+# Категория трат без категории в выгрузке
+UNCATEGORIZED = 'Без категории'
+
+# Сетка процентилей таблиц когорт
+PERCENTILES = np.linspace(0, 100, 101)
+
+
+def monthly_category_totals(transactions: pd.DataFrame, user_column: str = 'user') -> pd.Series:
+    """
+    Суммирует траты по (пользователь, категория, месяц).
+
+    Args:
+        transactions: DataFrame с транзакциями (со столбцом user_column или одного пользователя)
+        user_column: Столбец с пользователем
+
+    Returns:
+        Series: (user, category, month 'YYYY-MM') -> траты в рублях
+    """
+    spending = (transactions['amount'] < 0) & transactions['date'].notna()
+    if 'status' in transactions.columns:
+        spending &= transactions['status'].ne('FAILED')
+    ops = transactions[spending]
+    users = ops[user_column] if user_column in ops.columns else pd.Series(DEFAULT_COHORT, index=ops.index)
+    categories = ops['category'] if 'category' in ops.columns else pd.Series(np.nan, index=ops.index)
+    frame = pd.DataFrame({
+        'user': users.astype(str).to_numpy(),
+        'category': categories.fillna(UNCATEGORIZED).astype(str).to_numpy(),
+        'month': ops['date'].to_numpy(dtype='datetime64[M]').astype(str),
+        'spent': -ops['amount'].to_numpy(dtype='float64'),
+    })
+    return frame.groupby(['user', 'category', 'month'], sort=False)['spent'].sum()
+
+
+def user_totals_from_file(path: str) -> pd.Series:
+    """
+    Загружает выгрузку одного пользователя (в воркере) и сворачивает её
+    до трат по категориям и месяцам. Пользователь - имя файла без расширения.
+
+    Args:
+        path: Путь к выгрузке
+
+    Returns:
+        Series: (user, category, month) -> траты в рублях
+    """
+    df = load_transactions(path)
+    df['user'] = os.path.splitext(os.path.basename(path))[0]
+    return monthly_category_totals(df)
+
+
+def _safe_user_totals(path: str) -> Tuple[str, Optional[pd.Series], Optional[str]]:
+    """Как user_totals_from_file, но ошибка выгрузки возвращается, а не прерывает пул."""
+    try:
+        return path, user_totals_from_file(path), None
+    except Exception as e:
+        logger.error(f"Ошибка загрузки выгрузки {path}: {str(e)}")
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+class CohortMatrix:
+    """
+    Траты многих пользователей в компактной матрице пользователи × категории × месяцы
+    (float64, рубли; нет трат - 0) с меткой когорты каждого пользователя.
+    В skipped - пользователи, выгрузки которых не удалось загрузить (пользователь -> ошибка).
+    """
+
+    def __init__(self, users: Sequence[str], categories: Sequence[str], months: Sequence[str],
+                 values: np.ndarray, cohorts: Optional[Sequence[str]] = None) -> None:
+        """
+        Args:
+            users: Пользователи (строки матрицы)
+            categories: Категории
+            months: Месяцы 'YYYY-MM' по возрастанию
+            values: Массив формы (users, categories, months)
+            cohorts: Когорта каждого пользователя (по умолчанию DEFAULT_COHORT)
+        """
+        self.users = np.asarray(users, dtype=str)
+        self.categories = list(categories)
+        self.months = list(months)
+        self.values = np.asarray(values, dtype='float64')
+        self.cohorts = (np.full(len(self.users), DEFAULT_COHORT) if cohorts is None
+                        else np.asarray(cohorts, dtype=str))
+        self._user_index = {user: i for i, user in enumerate(self.users)}
+        self.skipped: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.users)
+
+    @classmethod
+    def from_totals(cls, totals: Iterable[pd.Series],
+                    cohorts: Optional[Dict[str, str]] = None) -> 'CohortMatrix':
+        """
+        Собирает матрицу из сумм по (пользователь, категория, месяц).
+
+        Args:
+            totals: Результаты monthly_category_totals (например, по файлу на пользователя)
+            cohorts: Когорта по пользователю (остальные - DEFAULT_COHORT)
+
+        Returns:
+            CohortMatrix
+        """
+        combined = pd.concat(list(totals))
+        combined = combined.groupby(level=['user', 'category', 'month'], sort=False).sum()
+        user_codes, users = pd.factorize(combined.index.get_level_values('user'))
+        category_codes, categories = pd.factorize(combined.index.get_level_values('category'), sort=True)
+        month_codes, months = pd.factorize(combined.index.get_level_values('month'), sort=True)
+
+        values = np.zeros((len(users), len(categories), len(months)), dtype='float64')
+        values[user_codes, category_codes, month_codes] = combined.to_numpy()
+        labels = [(cohorts or {}).get(user, DEFAULT_COHORT) for user in users]
+        return cls(users, categories, months, values, labels)
+
+    @classmethod
+    def from_transactions(cls, transactions: pd.DataFrame, user_column: str = 'user',
+                          cohorts: Optional[Dict[str, str]] = None) -> 'CohortMatrix':
+        """
+        Строит матрицу по транзакциям многих пользователей в одном DataFrame.
+
+        Args:
+            transactions: DataFrame с транзакциями и столбцом пользователя
+            user_column: Столбец с пользователем
+            cohorts: Когорта по пользователю
+
+        Returns:
+            CohortMatrix
+        """
+        return cls.from_totals([monthly_category_totals(transactions, user_column)], cohorts)
+
+    def average(self, months: Optional[Sequence[str]] = None) -> np.ndarray:
+        """
+        Средние траты в месяц по категориям за выбранные месяцы.
+
+        Args:
+            months: Месяцы 'YYYY-MM' (по умолчанию - все)
+
+        Returns:
+            Массив формы (users, categories)
+        """
+        if months is None:
+            return self.values.mean(axis=2) if self.months else np.zeros(self.values.shape[:2])
+        index = [self.months.index(month) for month in months if month in self.months]
+        if not index:
+            return np.zeros(self.values.shape[:2])
+        return self.values[:, :, index].sum(axis=2) / len(months)
+
+    def user_index(self, user: str) -> int:
+        """Номер строки пользователя."""
+        if user not in self._user_index:
+            raise KeyError(f"Пользователь не найден: {user}")
+        return self._user_index[user]
+
+    def save(self, path: str) -> None:
+        """
+        Сохраняет матрицу в файл .npz (без pickle).
+
+        Args:
+            path: Путь к файлу
+
+        Returns:
+            None
+        """
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, users=self.users, categories=np.asarray(self.categories, dtype=str),
+                 months=np.asarray(self.months, dtype=str), values=self.values, cohorts=self.cohorts)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'CohortMatrix':
+        """
+        Загружает матрицу из файла .npz.
+
+        Args:
+            path: Путь к файлу
+
+        Returns:
+            CohortMatrix
+        """
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['users'], data['categories'].tolist(), data['months'].tolist(),
+                       data['values'], data['cohorts'])
+
+
+class PercentileTables:
+    """
+    Таблицы процентилей средних месячных трат по категориям для каждой когорты.
+
+    Таблица когорты - массив процентили × категории, поэтому её размер не зависит
+    от числа пользователей. Столбцы всех категорий сдвинуты на непересекающиеся
+    диапазоны и уложены в один отсортированный массив, так что ранги любого числа
+    пользователей по всем категориям считаются одним вызовом np.searchsorted.
+    """
+
+    def __init__(self, matrix: CohortMatrix, months: Optional[Sequence[str]] = None,
+                 percentiles: np.ndarray = PERCENTILES) -> None:
+        """
+        Args:
+            matrix: Матрица трат пользователей
+            months: Месяцы окна сравнения (по умолчанию - все месяцы матрицы)
+            percentiles: Сетка процентилей по возрастанию (0..100)
+        """
+        self.matrix = matrix
+        self.months = list(months) if months is not None else list(matrix.months)
+        self.categories = list(matrix.categories)
+        self.percentiles = np.asarray(percentiles, dtype='float64')
+        self.averages = matrix.average(self.months)
+        self.tables: Dict[str, np.ndarray] = {}
+        self.sizes: Dict[str, int] = {}
+        for cohort in np.unique(matrix.cohorts):
+            members = self.averages[matrix.cohorts == cohort]
+            self.tables[str(cohort)] = np.percentile(members, self.percentiles, axis=0)
+            self.sizes[str(cohort)] = len(members)
+
+        # Сдвиг столбцов: каждая категория занимает свой диапазон значений
+        spread = max((float(np.ptp(table)) for table in self.tables.values()), default=0.0)
+        self._offsets = np.arange(len(self.categories), dtype='float64') * (spread + 1.0)
+        self._flat = {cohort: (table + self._offsets).T.ravel() for cohort, table in self.tables.items()}
+        self._low = {cohort: table[0] for cohort, table in self.tables.items()}
+
+    def rank(self, values: np.ndarray, cohort: str = DEFAULT_COHORT) -> np.ndarray:
+        """
+        Процентили трат в когорте: наибольший процентиль таблицы, не превышающий траты.
+
+        Args:
+            values: Средние месячные траты формы (categories,) или (n, categories)
+            cohort: Когорта
+
+        Returns:
+            Массив процентилей (0..100) той же формы
+        """
+        if cohort not in self.tables:
+            raise KeyError(f"Когорта не найдена: {cohort}")
+        values = np.asarray(values, dtype='float64')
+        table = self.tables[cohort]
+        points = len(self.percentiles)
+        clipped = np.clip(values, self._low[cohort], table[-1])
+        positions = np.searchsorted(self._flat[cohort], clipped + self._offsets, side='right')
+        positions = positions - np.arange(len(self.categories)) * points
+        result = self.percentiles[np.clip(positions - 1, 0, points - 1)]
+        result = np.where(values <= table[0], 0.0, result)
+        return np.where(values > table[-1], 100.0, result)
+
+    def rank_all(self) -> pd.DataFrame:
+        """
+        Процентили всех пользователей матрицы в своих когортах.
+
+        Returns:
+            DataFrame: пользователи × категории
+        """
+        result = np.empty_like(self.averages)
+        for cohort in self.tables:
+            members = self.matrix.cohorts == cohort
+            result[members] = self.rank(self.averages[members], cohort)
+        return pd.DataFrame(result, index=self.matrix.users, columns=self.categories)
+
+    def compare_user(self, user: str) -> pd.DataFrame:
+        """
+        Сравнивает траты пользователя с его когортой по всем категориям.
+
+        Args:
+            user: Пользователь из матрицы
+
+        Returns:
+            DataFrame: category, spent, percentile, cohort_median, cohort_p90
+            (суммы - средние в месяц), по убыванию процентиля
+        """
+        index = self.matrix.user_index(user)
+        cohort = str(self.matrix.cohorts[index])
+        table = self.tables[cohort]
+        result = pd.DataFrame({
+            'category': self.categories,
+            'spent': self.averages[index].round(2),
+            'percentile': self.rank(self.averages[index], cohort),
+            'cohort_median': np.array([np.interp(50, self.percentiles, table[:, i])
+                                       for i in range(len(self.categories))]).round(2),
+            'cohort_p90': np.array([np.interp(90, self.percentiles, table[:, i])
+                                    for i in range(len(self.categories))]).round(2),
+        })
+        return result.sort_values('percentile', ascending=False, kind='stable').reset_index(drop=True)
+
+
+@timed()
+def build_cohort_matrix(
+        paths: Iterable[str],
+        cohorts: Optional[Dict[str, str]] = None,
+        max_workers: Optional[int] = None
+) -> CohortMatrix:
+    """
+    Строит матрицу трат по выгрузкам многих пользователей (файл на пользователя).
+    Файлы разбираются и сворачиваются до сумм по категориям и месяцам параллельно
+    в пуле процессов; в основной процесс возвращаются только суммы. Выгрузка
+    с ошибкой пропускается и попадает в matrix.skipped.
+
+    Args:
+        paths: Пути к выгрузкам, директория или glob-шаблон
+        cohorts: Когорта по пользователю (имени файла без расширения)
+        max_workers: Число процессов (1 - в текущем процессе)
+
+    Returns:
+        CohortMatrix
+
+    Raises:
+        FileNotFoundError: Если выгрузок не найдено
+        ValueError: Если не удалось загрузить ни одной выгрузки
+    """
+    if isinstance(paths, str):
+        files: List[str] = find_transaction_files(paths)
+    else:
+        files = list(paths)
+    if not files:
+        raise FileNotFoundError("Не найдено выгрузок пользователей")
+
+    if len(files) == 1 or max_workers == 1:
+        results = [_safe_user_totals(path) for path in files]
+    else:
+        workers = min(len(files), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_safe_user_totals, files, chunksize=max(1, len(files) // (workers * 4))))
+
+    totals = [result for _, result, error in results if error is None]
+    skipped = {os.path.splitext(os.path.basename(path))[0]: error for path, _, error in results if error is not None}
+    if not totals:
+        raise ValueError(f"Не удалось загрузить ни одной выгрузки пользователей: {len(skipped)} с ошибками")
+
+    matrix = CohortMatrix.from_totals(totals, cohorts)
+    matrix.skipped = skipped
+    if skipped:
+        logger.warning(f"Пропущено выгрузок с ошибками: {len(skipped)} ({', '.join(sorted(skipped))})")
+    logger.info(f"Матрица когорт: пользователей {len(matrix)}, категорий {len(matrix.categories)}, "
+                f"месяцев {len(matrix.months)}")
+    return matrix
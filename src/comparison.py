@@ -0,0 +1,113 @@
+import logging
+from typing import Iterable, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from src.cache import memoized
+from src.profiling import timed
+from src.services import Transactions, to_transactions_frame
+
+logger = logging.getLogger(__name__)
+
+# Ключи сравнения по умолчанию
+COMPARISON_KEYS = ['category', 'card_last_digits']
+
+# Сравнения: имя -> сдвиг базового месяца назад
+COMPARISONS = {
+    'mom': 1,
+    'yoy': 12,
+}
+
+# Столбцы результата после ключей
+COMPARISON_COLUMNS = ['comparison', 'period', 'base_period', 'current', 'previous', 'delta',
+                      'pct_change', 'contribution']
+
+
+@memoized('transactions')
+@timed()
+def compare_periods(
+        transactions: Transactions,
+        month: Optional[str] = None,
+        by: Union[str, Sequence[str]] = tuple(COMPARISON_KEYS),
+        comparisons: Iterable[str] = tuple(COMPARISONS)
+) -> pd.DataFrame:
+    """
+    Сравнивает траты месяца с прошлым месяцем (mom) и тем же месяцем год назад (yoy)
+    сразу для всех ключей (по умолчанию - пар категория × карта).
+
+    Траты нужных месяцев сворачиваются одной группировкой в таблицу
+    ключ × месяц, после чего разницы, процент изменения и вклад ключа
+    в общее изменение считаются по столбцам этой таблицы векторно.
+
+    Args:
+        transactions: Транзакции (список словарей, DataFrame или TransactionDataset)
+        month: Месяц в формате 'YYYY-MM' (по умолчанию - последний месяц с тратами)
+        by: Столбец или столбцы ключа сравнения
+        comparisons: Сравнения из COMPARISONS
+
+    Returns:
+        DataFrame в длинном формате: ключи by и COMPARISON_COLUMNS. Суммы в рублях,
+        pct_change - изменение к базовому месяцу в %, contribution - доля ключа
+        в общем изменении в %. Строки отсортированы по сравнению и модулю изменения
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    comparisons = list(comparisons)
+    unknown = [name for name in comparisons if name not in COMPARISONS]
+    if unknown:
+        raise ValueError(f"Неизвестные сравнения: {', '.join(unknown)}. Доступны: {', '.join(COMPARISONS)}")
+    empty = pd.DataFrame(columns=by + COMPARISON_COLUMNS)
+
+    df = to_transactions_frame(transactions)
+    if df.empty:
+        return empty
+    spending = (df['amount'] < 0) & df['date'].notna()
+    if 'status' in df.columns:
+        spending &= df['status'].ne('FAILED')
+    spending = spending.to_numpy()
+    if not spending.any():
+        return empty
+
+    months = df['date'].to_numpy(dtype='datetime64[M]')
+    target = np.datetime64(month, 'M') if month is not None else months[spending].max()
+    bases = {name: target - COMPARISONS[name] for name in comparisons}
+    wanted = np.array([target] + list(bases.values()), dtype='datetime64[M]')
+    # Строки берутся один раз, сразу за все сравниваемые месяцы
+    selected = spending & np.isin(months, wanted)
+
+    frame = pd.DataFrame({column: df[column].to_numpy()[selected] if column in df.columns else None
+                          for column in by})
+    frame['month'] = months[selected]
+    frame['spent'] = -df['amount'].to_numpy(dtype='float64')[selected]
+
+    # Таблица ключ × месяц (только сравниваемые месяцы)
+    pivot = (
+        frame.groupby(by + ['month'], dropna=False, sort=False)['spent'].sum()
+        .unstack('month', fill_value=0.0)
+        .reindex(columns=pd.DatetimeIndex(np.unique(wanted)), fill_value=0.0)
+    )
+    current = pivot[pd.Timestamp(target)]
+
+    parts = []
+    for name, base in bases.items():
+        previous = pivot[pd.Timestamp(base)]
+        changed = (current != 0) | (previous != 0)
+        delta = current - previous
+        total = delta[changed].sum()
+        part = pd.DataFrame({
+            'comparison': name,
+            'period': str(target),
+            'base_period': str(base),
+            'current': current,
+            'previous': previous,
+            'delta': delta,
+            'pct_change': (delta / previous.where(previous != 0)) * 100,
+            'contribution': delta / total * 100 if total != 0 else np.nan,
+        })[changed.to_numpy()]
+        parts.append(part.iloc[np.argsort(-part['delta'].abs().to_numpy(), kind='stable')])
+
+    result = pd.concat(parts).reset_index() if parts else empty
+    for column in ('current', 'previous', 'delta', 'pct_change', 'contribution'):
+        result[column] = result[column].astype('float64').round(2)
+    logger.info(f"Сравнение периодов {target}: ключей {len(pivot)}, строк {len(result)}")
+    return result[by + COMPARISON_COLUMNS]
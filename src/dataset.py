@@ -0,0 +1,205 @@
+import logging
+import os
+from datetime import datetime
+from typing import Any, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa = None
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Расширения файлов набора данных Arrow IPC
+DATASET_EXTENSIONS = ('.arrow', '.feather')
+
+
+def _require_pyarrow() -> None:
+    """Проверяет, что pyarrow установлен."""
+    if not PYARROW_AVAILABLE:
+        raise ImportError("Для работы с набором данных Arrow установите pyarrow")
+
+
+def _to_arrow_table(df: pd.DataFrame) -> Any:
+    """
+    Преобразует DataFrame в таблицу Arrow.
+    Столбцы со смешанными типами (например, MCC из чисел и строк) сохраняются строками.
+
+    Args:
+        df: DataFrame с транзакциями
+
+    Returns:
+        pyarrow.Table
+    """
+    arrays = {}
+    for column in df.columns:
+        try:
+            arrays[str(column)] = pa.array(df[column], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            values = df[column].where(df[column].isna(), df[column].astype(str))
+            arrays[str(column)] = pa.array(values, type=pa.string(), from_pandas=True)
+    return pa.table(arrays)
+
+
+def write_dataset(df: pd.DataFrame, path: str) -> None:
+    """
+    Сохраняет нормализованные транзакции в файл Arrow IPC без сжатия,
+    отсортированными по дате, чтобы файл можно было отображать в память
+    и выбирать диапазоны дат без копирования.
+
+    Args:
+        df: DataFrame с транзакциями (внутренние имена столбцов)
+        path: Путь к файлу (.arrow или .feather)
+
+    Returns:
+        None
+    """
+    _require_pyarrow()
+    if 'date' in df.columns:
+        df = df.sort_values('date', kind='stable', na_position='last')
+    table = _to_arrow_table(df.reset_index(drop=True))
+
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    logger.info(f"Набор данных сохранён: {os.path.abspath(path)}. Размер: {table.num_rows} строк")
+
+
+class TransactionDataset:
+    """
+    Набор транзакций в файле Arrow IPC, отображенном в память.
+
+    Несколько процессов, открывших один файл, используют одну физическую копию
+    данных через страничный кеш ОС. Выбор диапазона дат и столбцов не копирует данные.
+    """
+
+    def __init__(self, table: Any, path: Optional[str] = None, offset: int = 0) -> None:
+        """
+        Args:
+            table: pyarrow.Table с транзакциями, отсортированными по дате
+            path: Путь к файлу, из которого открыт набор
+            offset: Смещение первой строки относительно начала файла
+        """
+        self.table = table
+        self.path = path
+        self.offset = offset
+
+    def __reduce__(self) -> Any:
+        # Между процессами передается только путь и границы выборки:
+        # получатель заново отображает файл в память вместо копирования данных
+        if self.path is None:
+            return TransactionDataset, (self.table, None, 0)
+        return _reopen_dataset, (self.path, self.offset, self.table.num_rows, self.columns)
+
+    @classmethod
+    def open(cls, path: str) -> 'TransactionDataset':
+        """
+        Открывает файл набора данных через memory map.
+
+        Args:
+            path: Путь к файлу .arrow или .feather
+
+        Returns:
+            TransactionDataset
+        """
+        _require_pyarrow()
+        source = pa.memory_map(path, 'r')
+        table = pa.ipc.open_file(source).read_all()
+        logger.debug(f"Открыт набор данных {path}: {table.num_rows} строк")
+        return cls(table, path)
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    @property
+    def columns(self) -> List[str]:
+        """Имена столбцов набора."""
+        return self.table.column_names
+
+    def slice_dates(self, start_date: Optional[Union[str, datetime]] = None,
+                    end_date: Optional[Union[str, datetime]] = None) -> 'TransactionDataset':
+        """
+        Выбирает операции в диапазоне дат (границы включительно) бинарным поиском
+        по отсортированному столбцу date, без копирования данных.
+
+        Args:
+            start_date: Начало диапазона
+            end_date: Конец диапазона
+
+        Returns:
+            TransactionDataset с выбранными строками
+        """
+        dates = self.table.column('date').to_numpy()
+        start = 0 if start_date is None else int(np.searchsorted(
+            dates, np.datetime64(pd.Timestamp(start_date)), side='left'))
+        stop = len(dates) if end_date is None else int(np.searchsorted(
+            dates, np.datetime64(pd.Timestamp(end_date)), side='right'))
+        return TransactionDataset(self.table.slice(start, max(stop - start, 0)), self.path, self.offset + start)
+
+    def select(self, columns: List[str]) -> 'TransactionDataset':
+        """
+        Оставляет только указанные столбцы (без копирования).
+
+        Args:
+            columns: Имена столбцов
+
+        Returns:
+            TransactionDataset с выбранными столбцами
+        """
+        return TransactionDataset(self.table.select(columns), self.path, self.offset)
+
+    def month_slices(self) -> List['TransactionDataset']:
+        """
+        Делит набор на части по месяцам (для распределённого расчёта отчётов).
+
+        Returns:
+            Список выборок, по одной на месяц
+        """
+        dates = pd.DatetimeIndex(self.table.column('date').to_numpy())
+        if len(dates) == 0:
+            return []
+        months = dates.to_period('M').asi8
+        bounds = np.flatnonzero(np.diff(months)) + 1
+        starts = np.concatenate([[0], bounds])
+        stops = np.concatenate([bounds, [len(dates)]])
+        return [
+            TransactionDataset(self.table.slice(start, stop - start), self.path, self.offset + int(start))
+            for start, stop in zip(starts, stops)
+        ]
+
+    def to_pandas(self) -> pd.DataFrame:
+        """
+        Преобразует набор в DataFrame. Числовые столбцы без пропусков
+        по возможности не копируются.
+
+        Returns:
+            DataFrame с транзакциями
+        """
+        return self.table.to_pandas(split_blocks=True)
+
+
+def _reopen_dataset(path: str, offset: int, length: int, columns: List[str]) -> TransactionDataset:
+    """Восстанавливает выборку набора данных в другом процессе."""
+    dataset = TransactionDataset.open(path)
+    return TransactionDataset(dataset.table.slice(offset, length).select(columns), path, offset)
+
+
+def open_dataset(path: str) -> TransactionDataset:
+    """
+    Открывает набор транзакций в формате Arrow IPC.
+
+    Args:
+        path: Путь к файлу .arrow или .feather
+
+    Returns:
+        TransactionDataset
+    """
+    return TransactionDataset.open(path)
@@ -3,15 +3,24 @@ import json
 from datetime import datetime
 import logging
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from src.utils import (
     load_transactions,
     filter_transactions_by_date,
-    calculate_cashback,
     mask_card_number,
     setup_logging
 )
 from src.views import get_stock_prices, get_currency_rates
+from src.aggregates import aggregator_key, month_to_date_block
+from src.cashback import get_cashback_rules
+from src.topk import TopK
+from src.profiling import (
+    measure,
+    timed,
+    profile_run,
+    log_profile_summary,
+    save_profile_summary
+)
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -31,14 +40,23 @@ def main_function() -> None:
         parser.add_argument('--date',
                             default=datetime.now().strftime('%Y-%m-%d'),
                             help='Дата анализа в формате YYYY-MM-DD')
+        parser.add_argument('--profile', nargs='?', const='profile.txt', default=None,
+                            help='Сохранить отчет профилировщика (cProfile/pyinstrument) в файл')
+        parser.add_argument('--metrics-json', default=None,
+                            help='Сохранить сводку замеров по этапам в JSON файл')
         args = parser.parse_args()
 
         logger.info(f"Старт анализа для даты {args.date}")
 
-        df = load_transactions(args.file)
-        result = generate_home_data(df, args.date)
+        if args.profile:
+            with profile_run(args.profile):
+                run_analysis(args.file, args.date)
+        else:
+            run_analysis(args.file, args.date)
 
-        print(json.dumps(result, indent=2, ensure_ascii=False))
+        log_profile_summary()
+        if args.metrics_json:
+            save_profile_summary(args.metrics_json)
         logger.info("Анализ успешно завершен")
 
     except Exception:
@@ -46,6 +64,25 @@ def main_function() -> None:
         raise
 
 
+def run_analysis(file_path: str, date_str: str) -> None:
+    """
+    Загружает транзакции, генерирует данные домашней страницы и печатает их в JSON.
+
+    Args:
+        file_path: Путь к файлу с транзакциями
+        date_str: Дата анализа в формате 'YYYY-MM-DD'
+
+    Returns:
+        None
+    """
+    df = load_transactions(file_path)
+    result = generate_home_data(df, date_str)
+
+    with measure('main.serialize'):
+        output = json.dumps(result, indent=2, ensure_ascii=False, default=str)
+    print(output)
+
+
 def get_greeting(date: datetime) -> str:
     """
     Возвращает приветствие в зависимости от времени суток.
@@ -66,6 +103,7 @@ def get_greeting(date: datetime) -> str:
     return "Доброй ночи"
 
 
+@timed()
 def generate_home_data(df: pd.DataFrame, date_str: str) -> Dict[str, Any]:
     """
     Генерирует основные данные для домашней страницы приложения.
@@ -85,30 +123,86 @@ def generate_home_data(df: pd.DataFrame, date_str: str) -> Dict[str, Any]:
 
         # Генерация данных по картам
         cards = []
-        if 'card_last_digits' in filtered_df.columns:
-            for card in filtered_df['card_last_digits'].unique():
-                if pd.isna(card):
-                    continue
-                card_df = filtered_df[filtered_df['card_last_digits'] == card]
-                total_spent = card_df[card_df['amount'] < 0]['amount'].sum() * -1
-                cards.append({
-                    'last_digits': mask_card_number(str(card)),
-                    'total_spent': round(total_spent, 2),
-                    'cashback': round(calculate_cashback(total_spent), 2)
-                })
-
-        # Топ-5 транзакций
-        top_trans = pd.DataFrame()
-        if not filtered_df.empty and 'amount' in filtered_df.columns:
-            top_trans = filtered_df.nlargest(5, 'amount')[['date', 'amount', 'category', 'description']]
+        with measure('home.cards') as stage:
+            if 'card_last_digits' in filtered_df.columns:
+                # Кешбэк по правилам считается сразу для всех операций месяца
+                cashback = get_cashback_rules().evaluate(filtered_df)['cashback']
+                for card in filtered_df['card_last_digits'].unique():
+                    if pd.isna(card):
+                        continue
+                    is_card = filtered_df['card_last_digits'] == card
+                    card_df = filtered_df[is_card]
+                    total_spent = card_df[card_df['amount'] < 0]['amount'].sum() * -1
+                    cards.append({
+                        'last_digits': mask_card_number(str(card)),
+                        'total_spent': round(total_spent, 2),
+                        'cashback': round(cashback[is_card].sum(), 2)
+                    })
+            stage['rows'] = len(filtered_df)
+
+        # Топ-5 трат (крупнейшие по модулю расходы)
+        with measure('home.top_transactions'):
+            top_trans = TopK(5, ranking='spend').update(filtered_df).result()
+
+        with measure('home.quotes'):
+            currency_rates = get_currency_rates()
+            stock_prices = get_stock_prices()
 
         return {
             'greeting': get_greeting(date),
             'cards': cards,
-            'top_transactions': top_trans.to_dict('records') if not top_trans.empty else [],
-            'currency_rates': get_currency_rates(),
-            'stock_prices': get_stock_prices()
+            'top_transactions': top_trans,
+            'currency_rates': currency_rates,
+            'stock_prices': stock_prices
         }
     except Exception as e:
         logger.error(f"Ошибка при генерации данных: {str(e)}")
         raise
+
+
+@timed()
+def generate_home_history(df: pd.DataFrame, dates: List[str],
+                          market: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Генерирует данные домашней страницы сразу для многих дат
+    (например, для заполнения истории или графиков).
+    Карты и топ транзакций берутся из предрасчитанных агрегатов месяца,
+    курсы валют и акций запрашиваются один раз на весь набор дат.
+
+    Args:
+        df: DataFrame с транзакциями
+        dates: Список дат в формате 'YYYY-MM-DD'
+        market: Готовый снимок котировок (get_market_snapshot), чтобы не запрашивать API
+
+    Returns:
+        Словарь: дата -> данные для отображения
+    """
+    try:
+        if market is None:
+            with measure('home.quotes'):
+                currency_rates = get_currency_rates()
+                stock_prices = get_stock_prices()
+        else:
+            currency_rates = market['currency_rates']
+            stock_prices = market['stock_prices']
+
+        # Ключ данных считается один раз на весь набор дат
+        key = aggregator_key(df)
+        result = {}
+        for date_str in dates:
+            block = month_to_date_block(df, date_str, key)
+            result[date_str] = {
+                'greeting': get_greeting(datetime.strptime(date_str, '%Y-%m-%d')),
+                'cards': block['cards'],
+                'top_transactions': block['top_transactions'],
+                'currency_rates': currency_rates,
+                'stock_prices': stock_prices
+            }
+        return result
+    except Exception as e:
+        logger.error(f"Ошибка при генерации истории: {str(e)}")
+        raise
+
+
+if __name__ == '__main__':
+    main_function()
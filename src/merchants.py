@@ -0,0 +1,367 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.profiling import timed
+
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    yaml = None
+    YAML_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Переменная окружения с путем к файлу правил продавцов
+RULES_ENV = 'MERCHANT_RULES'
+
+# Размер кеша разбора описаний (уникальных строк, а не операций)
+CACHE_SIZE = 65_536
+
+# Транслитерация кириллицы: 'Пятерочка' и 'PYATEROCHKA' дают один ключ
+_TRANSLIT = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh', 'з': 'z',
+    'и': 'i', 'й': 'j', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'h', 'ц': 'c', 'ч': 'ch', 'ш': 'sh', 'щ': 'sch',
+    'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+})
+
+# Разные схемы латинского написания одних и тех же звуков ('Rumyanyj Khleb', 'Kofe s sobojj')
+_SPELLING = [
+    (re.compile(r'shch'), 'sch'),
+    (re.compile(r'kh'), 'h'),
+    (re.compile(r'ts'), 'c'),
+    (re.compile(r'x'), 'ks'),
+    (re.compile(r'jj'), 'j'),
+    (re.compile(r'j([aeu])'), r'y\1'),
+    (re.compile(r'(?:yj|ij|iy|yy)\b'), 'y'),
+    (re.compile(r'w'), 'v'),
+]
+
+# Телефоны, номера магазинов и терминалов
+_PHONE = re.compile(r'\+?\d[\d\s()-]{6,}\d')
+_LETTERS = re.compile(r'[^\W\d_]+')
+_DIGITS = re.compile(r'\d+')
+_PUNCTUATION = ' .,;:-_"\'«»()#№'
+
+# Организационно-правовые формы и города в хвосте описания не отличают продавцов
+LEGAL_FORMS = frozenset({'ooo', 'oao', 'zao', 'pao', 'ao', 'ip', 'llc', 'ltd', 'inc', 'gmbh'})
+CITY_SUFFIXES = frozenset({'moskva', 'moscow', 'msk', 'spb', 'g', 'rus', 'ru'})
+
+# Правила продавцов по умолчанию: шаблоны сравниваются с ключом описания
+DEFAULT_MERCHANT_RULES = [
+    {'merchant': 'Пятёрочка', 'patterns': ['pyaterochka'], 'category': 'Супермаркеты'},
+    {'merchant': 'Перекрёсток', 'patterns': ['perekrestok'], 'category': 'Супермаркеты'},
+    {'merchant': 'Магнит', 'patterns': ['magnit'], 'category': 'Супермаркеты'},
+    {'merchant': 'ВкусВилл', 'patterns': ['vkusvill'], 'category': 'Супермаркеты'},
+    {'merchant': 'Дикси', 'patterns': ['diksi', 'diksy'], 'category': 'Супермаркеты'},
+    {'merchant': 'Лента', 'patterns': ['lenta'], 'category': 'Супермаркеты'},
+    {'merchant': 'Яндекс Такси', 'patterns': ['yandekstaksi'], 'category': 'Транспорт'},
+    {'merchant': "McDonald's", 'patterns': ['mcdonalds', 'makdonalds'], 'category': 'Фастфуд'},
+    {'merchant': 'Бургер Кинг', 'patterns': ['burgerking'], 'category': 'Фастфуд'},
+    {'merchant': 'KFC', 'patterns': ['kfc'], 'category': 'Фастфуд'},
+    {'merchant': 'Ozon', 'patterns': ['ozon'], 'category': 'Различные товары'},
+    {'merchant': 'Wildberries', 'patterns': ['wildberries', 'vaildberriz'], 'category': 'Различные товары'},
+    {'patterns': ['snyatie', 'bankomat'], 'category': 'Наличные'},
+    {'patterns': ['brokerskogoscheta'], 'category': 'Переводы'},
+]
+
+# Категории по MCC, если ни история продавца, ни правила категорию не дают
+MCC_CATEGORIES = {
+    4111: 'Транспорт', 4121: 'Транспорт', 4131: 'Транспорт', 4511: 'Авиабилеты', 4814: 'Связь',
+    4816: 'Связь', 5211: 'Дом и ремонт', 5311: 'Различные товары', 5331: 'Различные товары',
+    5411: 'Супермаркеты', 5499: 'Супермаркеты', 5541: 'Топливо', 5651: 'Одежда и обувь',
+    5691: 'Одежда и обувь', 5699: 'Одежда и обувь', 5712: 'Дом и ремонт', 5732: 'Различные товары',
+    5812: 'Рестораны', 5813: 'Рестораны', 5814: 'Фастфуд', 5912: 'Аптеки', 5942: 'Книги',
+    5977: 'Красота', 5992: 'Цветы', 6011: 'Наличные', 7011: 'Отели', 7230: 'Красота',
+    7512: 'Каршеринг', 7832: 'Кино', 7997: 'Развлечения', 8011: 'Медицина', 8062: 'Медицина',
+    8220: 'Образование', 9311: 'Госуслуги',
+}
+
+
+def _fold(text: str) -> str:
+    """Приводит латинское написание к одной схеме транслитерации."""
+    for pattern, replacement in _SPELLING:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def clean_description(description: str) -> Tuple[str, str]:
+    """
+    Разбирает описание операции: убирает телефоны, номера, организационно-правовую
+    форму и город в конце, строит ключ продавца (транслитерация в латиницу,
+    нижний регистр, только буквы) и читаемое название.
+    Результат кешируется по строке описания.
+
+    Args:
+        description: Описание операции
+
+    Returns:
+        Кортеж (ключ продавца, название продавца)
+    """
+    words = []
+    for token in _PHONE.sub(' ', description).split():
+        letters = ''.join(_LETTERS.findall(token.lower().replace('ё', 'е')))
+        if letters:
+            words.append((_fold(letters.translate(_TRANSLIT)), _DIGITS.sub('', token).strip(_PUNCTUATION)))
+
+    words = [(key, word) for key, word in words if key not in LEGAL_FORMS] or words
+    while len(words) > 1 and words[-1][0] in CITY_SUFFIXES:
+        words.pop()
+    key = ''.join(key for key, _ in words)
+    name = ' '.join(word for _, word in words if word)
+    return key, name or description.strip()
+
+
+def merchant_key(description: Any) -> str:
+    """
+    Возвращает ключ продавца для описания операции
+    ('Пятерочка 1234' и 'PYATEROCHKA MOSKVA' дают 'pyaterochka').
+
+    Args:
+        description: Описание операции
+
+    Returns:
+        Ключ продавца (пустая строка для пустого описания)
+    """
+    if not isinstance(description, str):
+        return ''
+    return clean_description(description)[0]
+
+
+def merchant_codes(descriptions: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    """
+    Разбирает описания один раз на уникальное значение.
+
+    Args:
+        descriptions: Столбец описаний
+
+    Returns:
+        Кортеж (номер уникального описания для каждой строки, -1 для пустых;
+        уникальные описания)
+    """
+    return pd.factorize(descriptions)
+
+
+def match_merchants(descriptions: pd.Series, query: str) -> np.ndarray:
+    """
+    Находит операции, ключ продавца которых содержит ключ строки поиска
+    ('пятерочка' находит 'PYATEROCHKA MOSKVA').
+
+    Args:
+        descriptions: Столбец описаний
+        query: Строка поиска
+
+    Returns:
+        Булев массив по строкам
+    """
+    needle = merchant_key(query)
+    if not needle:
+        return np.zeros(len(descriptions), dtype=bool)
+    codes, uniques = merchant_codes(descriptions)
+    hits = np.array([needle in merchant_key(description) for description in uniques] + [False], dtype=bool)
+    return hits[codes]
+
+
+class MerchantRules:
+    """
+    Правила нормализации продавцов: шаблоны ключей описания, название продавца
+    и категория, а также таблица категорий по MCC.
+
+    Шаблон проходит ту же нормализацию, что и описание, и совпадает, если
+    содержится в ключе описания. Применяется первое подходящее правило.
+    Сопоставление кешируется по ключу, поэтому на выгрузку приходится
+    по одному проходу правил на уникальное описание.
+    """
+
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None,
+                 mcc_categories: Optional[Dict[int, str]] = None) -> None:
+        """
+        Args:
+            rules: Список правил: merchant, patterns, category
+            mcc_categories: Категории по MCC (по умолчанию MCC_CATEGORIES)
+        """
+        self.rules = [self._validate(rule, i) for i, rule in enumerate(
+            DEFAULT_MERCHANT_RULES if rules is None else rules)]
+        self.mcc_categories = {int(mcc): category for mcc, category in (
+            MCC_CATEGORIES if mcc_categories is None else mcc_categories).items()}
+        self.fingerprint = hashlib.sha1(json.dumps(
+            {'rules': self.rules, 'mcc_categories': self.mcc_categories}, sort_keys=True, ensure_ascii=False
+        ).encode('utf-8')).hexdigest()
+        self.match = functools.lru_cache(maxsize=CACHE_SIZE)(self._match)
+
+    @staticmethod
+    def _validate(rule: Dict[str, Any], index: int) -> Dict[str, Any]:
+        """
+        Проверяет правило и приводит шаблоны к ключам.
+
+        Args:
+            rule: Правило из конфигурации
+            index: Номер правила (для сообщений об ошибках)
+
+        Returns:
+            Нормализованное правило
+        """
+        patterns = [merchant_key(str(pattern)) for pattern in rule.get('patterns', [])]
+        patterns = [pattern for pattern in patterns if pattern]
+        if not patterns:
+            raise ValueError(f"Правило продавца {index + 1}: укажите непустые patterns")
+        if not (rule.get('merchant') or rule.get('category')):
+            raise ValueError(f"Правило продавца {index + 1}: укажите merchant или category")
+        return {'merchant': rule.get('merchant'), 'patterns': patterns, 'category': rule.get('category')}
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> 'MerchantRules':
+        """
+        Создает правила из словаря конфигурации (содержимого JSON/YAML).
+
+        Args:
+            config: Словарь с ключами rules и mcc_categories
+
+        Returns:
+            MerchantRules
+        """
+        return cls(rules=config.get('rules'), mcc_categories=config.get('mcc_categories'))
+
+    def _match(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Находит первое правило для ключа продавца.
+
+        Args:
+            key: Ключ продавца
+
+        Returns:
+            Кортеж (название продавца, категория); None, если правило не задает значение
+        """
+        if key:
+            for rule in self.rules:
+                if any(pattern in key for pattern in rule['patterns']):
+                    return rule['merchant'], rule['category']
+        return None, None
+
+
+def load_merchant_rules(path: str) -> MerchantRules:
+    """
+    Загружает правила продавцов из JSON или YAML файла.
+
+    Args:
+        path: Путь к файлу правил (.json, .yaml, .yml)
+
+    Returns:
+        MerchantRules
+    """
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.json'):
+            config = json.load(f)
+        elif path.endswith(('.yaml', '.yml')):
+            if not YAML_AVAILABLE:
+                raise ImportError("Для правил в формате YAML установите PyYAML")
+            config = yaml.safe_load(f)
+        else:
+            raise ValueError("Файл правил должен быть .json, .yaml или .yml")
+    rules = MerchantRules.from_dict(config or {})
+    logger.info(f"Загружено правил продавцов: {len(rules.rules)} из {path}")
+    return rules
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_rules(path: str, mtime: float) -> MerchantRules:
+    """Кеширует правила по пути и времени изменения файла."""
+    return load_merchant_rules(path)
+
+
+DEFAULT_RULES = MerchantRules()
+
+
+def get_merchant_rules() -> MerchantRules:
+    """
+    Возвращает действующие правила продавцов: из файла, указанного в переменной
+    окружения MERCHANT_RULES, или встроенные правила по умолчанию.
+
+    Returns:
+        MerchantRules
+    """
+    path = os.getenv(RULES_ENV)
+    if not path:
+        return DEFAULT_RULES
+    return _cached_rules(path, os.path.getmtime(path))
+
+
+def _most_common(keys: pd.Series, values: pd.Series) -> pd.Series:
+    """
+    Самое частое значение для каждого ключа (пустые ключи и значения пропускаются).
+
+    Args:
+        keys: Ключи
+        values: Значения
+
+    Returns:
+        Series: ключ -> самое частое значение
+    """
+    pairs = pd.DataFrame({'key': keys, 'value': values}).dropna()
+    pairs = pairs[pairs['key'] != '']
+    if pairs.empty:
+        return pd.Series(dtype=object)
+    counts = pairs.value_counts(sort=True)
+    counts = counts[~counts.index.get_level_values('key').duplicated()]
+    return pd.Series(counts.index.get_level_values('value'), index=counts.index.get_level_values('key'))
+
+
+@timed()
+def normalize_merchants(df: pd.DataFrame, rules: Optional[MerchantRules] = None) -> pd.DataFrame:
+    """
+    Добавляет к операциям продавца и заполняет пропущенные категории.
+
+    Описания разбираются один раз на уникальное значение (factorize), результат
+    раскладывается по строкам индексами. Название продавца - из правила или самый
+    частый вариант написания среди описаний с тем же ключом. Пропущенная категория
+    берется по порядку из: самой частой категории того же продавца в выгрузке,
+    правила продавца, самой частой категории того же MCC в выгрузке, таблицы MCC.
+
+    Args:
+        df: DataFrame с транзакциями
+        rules: Правила продавцов (по умолчанию get_merchant_rules())
+
+    Returns:
+        Копия DataFrame со столбцами merchant, merchant_key и заполненной category
+    """
+    rules = rules or get_merchant_rules()
+    descriptions = df['description'] if 'description' in df.columns else pd.Series(np.nan, index=df.index)
+    codes, uniques = merchant_codes(descriptions)
+
+    cleaned = [clean_description(str(description)) for description in uniques]
+    unique_keys = [key for key, _ in cleaned]
+    matched = [rules.match(key) for key in unique_keys]
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+
+    # Название: из правила или самое частое написание среди описаний с тем же ключом
+    spellings = pd.DataFrame({'key': unique_keys, 'name': [name for _, name in cleaned], 'rows': counts})
+    spellings = spellings.sort_values('rows', ascending=False, kind='stable').drop_duplicates('key')
+    names = dict(zip(spellings['key'], spellings['name']))
+    unique_names = [rule_name or names[key] for key, (rule_name, _) in zip(unique_keys, matched)]
+
+    keys = pd.Series(np.array(unique_keys + [''], dtype=object)[codes], index=df.index)
+    merchants = pd.Series(np.array(unique_names + [None], dtype=object)[codes], index=df.index)
+    rule_categories = pd.Series(np.array([category for _, category in matched] + [None], dtype=object)[codes],
+                                index=df.index)
+
+    category = df['category'] if 'category' in df.columns else pd.Series(np.nan, index=df.index, dtype=object)
+    mcc = pd.to_numeric(df['mcc'], errors='coerce') if 'mcc' in df.columns else pd.Series(np.nan, index=df.index)
+    fill = keys.map(_most_common(keys, category))
+    fill = fill.fillna(rule_categories)
+    fill = fill.fillna(mcc.map(_most_common(mcc, category)))
+    fill = fill.fillna(mcc.map(rules.mcc_categories))
+
+    empty = category.isna()
+    if empty.any():
+        logger.info(f"Заполнено категорий: {int((empty & fill.notna()).sum())} из {int(empty.sum())} пропущенных")
+    return df.assign(merchant=merchants, merchant_key=keys, category=category.where(~empty, fill))
@@ -0,0 +1,283 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Накопленная статистика по этапам: имя этапа -> агрегаты
+_stats: Dict[str, Dict[str, float]] = {}
+_lock = threading.Lock()
+
+# Отслеживание пиковой памяти включается явно (tracemalloc замедляет работу)
+_memory_tracking = os.getenv('MONEYTALKS_TRACE_MEMORY', '') == '1'
+
+# Пики памяти открытых этапов до сброса пика вложенным этапом
+_outer_peaks: List[int] = []
+
+
+def enable_memory_tracking(enabled: bool = True) -> None:
+    """
+    Включает или выключает измерение пиковой памяти через tracemalloc.
+
+    Args:
+        enabled: Включить (True) или выключить (False) отслеживание
+
+    Returns:
+        None
+    """
+    global _memory_tracking
+    _memory_tracking = enabled
+    if not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def _record(stage: str, seconds: float, rows: Optional[int], peak_bytes: Optional[int]) -> None:
+    """Добавляет одно измерение в накопленную статистику этапа."""
+    with _lock:
+        entry = _stats.setdefault(stage, {
+            'calls': 0,
+            'total_seconds': 0.0,
+            'max_seconds': 0.0,
+            'rows': 0,
+            'peak_memory_bytes': 0,
+        })
+        entry['calls'] += 1
+        entry['total_seconds'] += seconds
+        entry['max_seconds'] = max(entry['max_seconds'], seconds)
+        if rows is not None:
+            entry['rows'] += rows
+        if peak_bytes is not None:
+            entry['peak_memory_bytes'] = max(entry['peak_memory_bytes'], peak_bytes)
+
+
+@contextmanager
+def measure(stage: str) -> Iterator[Dict[str, Any]]:
+    """
+    Контекстный менеджер для замера длительности этапа.
+    В возвращаемый словарь можно записать 'rows' - число обработанных строк.
+
+    Args:
+        stage: Имя этапа (например, 'load_transactions.read')
+
+    Returns:
+        Итератор со словарем для дополнительных метрик этапа
+    """
+    info: Dict[str, Any] = {'rows': None}
+    started_tracing = False
+    tracking = _memory_tracking
+    if tracking:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        # reset_peak сбрасывает общий пик: пик внешнего этапа на этот момент сохраняется
+        if _outer_peaks:
+            _outer_peaks[-1] = max(_outer_peaks[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        _outer_peaks.append(0)
+
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        elapsed = time.perf_counter() - start
+        peak = None
+        if tracking:
+            saved = _outer_peaks.pop() if _outer_peaks else 0
+            if tracemalloc.is_tracing():
+                peak = max(saved, tracemalloc.get_traced_memory()[1])
+                if started_tracing:
+                    tracemalloc.stop()
+        _record(stage, elapsed, info.get('rows'), peak)
+        logger.debug(f"Этап '{stage}': {elapsed * 1000:.2f} мс, строк: {info.get('rows')}")
+
+
+def timed(stage: Optional[str] = None) -> Callable:
+    """
+    Декоратор для замера длительности функции.
+    Если результат - DataFrame или список, его длина учитывается как число строк.
+
+    Args:
+        stage: Имя этапа, по умолчанию - имя функции
+
+    Returns:
+        Декорированную функцию
+    """
+
+    def decorator(func: Callable) -> Callable:
+        name = stage or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with measure(name) as info:
+                result = func(*args, **kwargs)
+                if isinstance(result, (pd.DataFrame, list)):
+                    info['rows'] = len(result)
+                return result
+
+        return wrapper
+
+    # Обработка вызова без скобок (@timed)
+    if callable(stage):
+        func = stage
+        stage = None
+        return decorator(func)
+
+    return decorator
+
+
+def get_profile_summary() -> Dict[str, Dict[str, float]]:
+    """
+    Возвращает сводку по всем замеренным этапам.
+
+    Returns:
+        Словарь: этап -> calls, total_seconds, mean_seconds, max_seconds, rows, peak_memory_bytes
+    """
+    with _lock:
+        summary = {}
+        for stage, entry in _stats.items():
+            summary[stage] = dict(entry)
+            summary[stage]['mean_seconds'] = entry['total_seconds'] / entry['calls'] if entry['calls'] else 0.0
+        return summary
+
+
+def reset_profile() -> None:
+    """Очищает накопленную статистику."""
+    with _lock:
+        _stats.clear()
+
+
+def log_profile_summary() -> None:
+    """Выводит сводку по этапам в лог."""
+    for stage, entry in sorted(get_profile_summary().items()):
+        logger.info(
+            f"Профиль '{stage}': вызовов {entry['calls']}, "
+            f"всего {entry['total_seconds'] * 1000:.2f} мс, "
+            f"макс {entry['max_seconds'] * 1000:.2f} мс, строк {entry['rows']}"
+        )
+
+
+def save_profile_summary(filename: str) -> None:
+    """
+    Сохраняет сводку по этапам в JSON файл.
+
+    Args:
+        filename: Имя файла
+
+    Returns:
+        None
+    """
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(get_profile_summary(), f, ensure_ascii=False, indent=2)
+    logger.info(f"Сводка профилирования сохранена: {os.path.abspath(filename)}")
+
+
+def render_prometheus() -> str:
+    """
+    Формирует метрики в текстовом формате Prometheus.
+
+    Returns:
+        Строка с метриками
+    """
+    metrics = [
+        ('moneytalks_stage_calls_total', 'counter', 'calls'),
+        ('moneytalks_stage_seconds_total', 'counter', 'total_seconds'),
+        ('moneytalks_stage_seconds_max', 'gauge', 'max_seconds'),
+        ('moneytalks_stage_rows_total', 'counter', 'rows'),
+        ('moneytalks_stage_peak_memory_bytes', 'gauge', 'peak_memory_bytes'),
+    ]
+    summary = get_profile_summary()
+    lines = []
+    for name, kind, key in metrics:
+        lines.append(f"# TYPE {name} {kind}")
+        for stage, entry in sorted(summary.items()):
+            lines.append(f'{name}{{stage="{stage}"}} {entry[key]}')
+    return '\n'.join(lines) + '\n'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Отдает метрики Prometheus по адресу /metrics."""
+
+    def do_GET(self) -> None:
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format % args)
+
+
+def serve_metrics(port: int = 9100, host: str = '127.0.0.1') -> HTTPServer:
+    """
+    Запускает HTTP сервер с метриками Prometheus в фоновом потоке.
+    По умолчанию сервер доступен только локально.
+
+    Args:
+        port: Порт сервера
+        host: Адрес для прослушивания ('0.0.0.0' - открыть на всех интерфейсах явно)
+
+    Returns:
+        Запущенный HTTPServer (остановка через server.shutdown())
+    """
+    server = HTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logger.info(f"Метрики Prometheus доступны на http://{host}:{server.server_port}/metrics")
+    return server
+
+
+@contextmanager
+def profile_run(output_path: str) -> Iterator[None]:
+    """
+    Профилирует блок кода через pyinstrument (если установлен) или cProfile
+    и сохраняет отчет в файл.
+
+    Args:
+        output_path: Путь к файлу отчета
+
+    Returns:
+        Итератор без значения
+    """
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        Profiler = None
+
+    if Profiler is not None:
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(profiler.output_text(unicode=True))
+            logger.info(f"Отчёт pyinstrument сохранён: {os.path.abspath(output_path)}")
+        return
+
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        with open(output_path, 'w', encoding='utf-8') as f:
+            pstats.Stats(profiler, stream=f).sort_stats('cumulative').print_stats(50)
+        logger.info(f"Отчёт cProfile сохранён: {os.path.abspath(output_path)}")
@@ -0,0 +1,591 @@
+import logging
+import shlex
+from abc import ABC, abstractmethod
+import weakref
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import TransactionDataset
+
+logger = logging.getLogger(__name__)
+
+# Строки, на которых оценивается избирательность фильтров без точной статистики
+SELECTIVITY_SAMPLE = 1024
+
+# Относительная стоимость проверки одной строки
+COST_CODES = 0.2
+COST_NUMERIC = 1.0
+COST_STRING = 4.0
+COST_TEXT = 10.0
+
+# Поля DSL -> столбцы транзакций
+QUERY_FIELDS = {
+    'card': 'card_last_digits',
+    'category': 'category',
+    'status': 'status',
+    'mcc': 'mcc',
+    'amount': 'amount',
+    'date': 'date',
+    'text': 'text',
+}
+
+# Столбцы, в которых ищется текст
+TEXT_COLUMNS = ('description', 'category')
+
+# Строки, выбранные запросом: непрерывный диапазон или массив позиций
+Rows = Union[slice, np.ndarray]
+
+
+def _take(values: np.ndarray, rows: Rows) -> np.ndarray:
+    """Выбирает значения по строкам (для диапазона - без копирования)."""
+    return values[rows]
+
+
+def _row_count(rows: Rows, total: int) -> int:
+    """Число строк в выборке."""
+    if isinstance(rows, slice):
+        return len(range(*rows.indices(total)))
+    return len(rows)
+
+
+class QueryIndex:
+    """
+    Коды значений строковых столбцов DataFrame для планировщика запросов:
+    равенство проверяется по целым кодам, а его избирательность известна точно.
+    Коды категориальных столбцов берутся из dtype при каждом запросе, остальные
+    столбцы кодируются только явно (index_transactions). Индекс не хранит ссылку
+    на DataFrame: иначе кеш индексов (_indexes) удерживал бы их в памяти.
+    """
+
+    def __init__(self) -> None:
+        self._codes: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def add_codes(self, df: pd.DataFrame, columns: Iterable[str]) -> 'QueryIndex':
+        """
+        Кодирует значения столбцов (один проход factorize на столбец).
+
+        Args:
+            df: DataFrame, для которого построен индекс
+            columns: Имена столбцов
+
+        Returns:
+            Этот же объект (для цепочек вызовов)
+        """
+        for column in columns:
+            if column in df.columns:
+                codes, uniques = pd.factorize(df[column])
+                self._codes[column] = _with_counts(codes, np.asarray(uniques, dtype=object))
+        return self
+
+    def codes(self, df: pd.DataFrame, column: str) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Возвращает коды столбца, если они есть.
+
+        Args:
+            df: DataFrame, для которого построен индекс
+            column: Имя столбца
+
+        Returns:
+            Кортеж (коды строк, уникальные значения, число строк на значение) или None
+        """
+        if column not in df.columns:
+            return None
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return _with_counts(series.cat.codes.to_numpy(), np.asarray(series.cat.categories, dtype=object))
+        cached = self._codes.get(column)
+        if cached is not None and len(cached[0]) != len(df):
+            # Число строк изменилось: коды устарели
+            del self._codes[column]
+            return None
+        return cached
+
+
+def _with_counts(codes: np.ndarray, uniques: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Добавляет к кодам число строк на каждое значение."""
+    return codes, uniques, np.bincount(codes[codes >= 0], minlength=len(uniques))
+
+
+def dates_sorted(df: pd.DataFrame) -> bool:
+    """
+    Проверяет, что даты отсортированы и без пропусков (тогда диапазон дат
+    выбирается бинарным поиском). Проверка выполняется при каждом запросе,
+    поэтому изменение DataFrame на месте не приводит к неверному плану.
+
+    Args:
+        df: DataFrame с транзакциями
+
+    Returns:
+        True, если столбец date отсортирован по возрастанию
+    """
+    return (
+        'date' in df.columns
+        and pd.api.types.is_datetime64_any_dtype(df['date'])
+        and not df['date'].hasnans
+        and df['date'].is_monotonic_increasing
+    )
+
+
+# Явно построенные индексы: id -> (слабая ссылка, индекс)
+_indexes: Dict[int, Tuple[Any, QueryIndex]] = {}
+
+
+def get_index(df: pd.DataFrame) -> QueryIndex:
+    """
+    Возвращает индекс, построенный index_transactions, или пустой индекс
+    (коды только категориальных столбцов).
+
+    Args:
+        df: DataFrame с транзакциями
+
+    Returns:
+        QueryIndex
+    """
+    cached = _indexes.get(id(df))
+    if cached is not None and cached[0]() is df:
+        return cached[1]
+    return QueryIndex()
+
+
+def index_transactions(df: pd.DataFrame,
+                       columns: Iterable[str] = ('card_last_digits', 'category', 'status')) -> QueryIndex:
+    """
+    Кодирует столбцы для серии запросов к одному DataFrame. Коды отражают
+    данные на момент вызова: после изменения столбцов на месте индекс
+    нужно построить заново (повторным вызовом).
+
+    Args:
+        df: DataFrame с транзакциями
+        columns: Столбцы для кодирования
+
+    Returns:
+        QueryIndex
+    """
+    index = QueryIndex().add_codes(df, columns)
+    key = id(df)
+    _indexes[key] = (weakref.ref(df, lambda _, k=key: _indexes.pop(k, None)), index)
+    return index
+
+
+class Predicate(ABC):
+    """Фильтр по одному полю, проверяемый векторно на выбранных строках."""
+
+    column = ''
+    cost = COST_NUMERIC
+
+    def applies(self, df: pd.DataFrame) -> bool:
+        """Проверяет, что нужный столбец есть в данных."""
+        return self.column in df.columns
+
+    @abstractmethod
+    def mask(self, df: pd.DataFrame, rows: Rows, index: QueryIndex) -> np.ndarray:
+        """
+        Проверяет строки.
+
+        Args:
+            df: DataFrame с транзакциями
+            rows: Проверяемые строки
+            index: Индекс DataFrame
+
+        Returns:
+            Булев массив по строкам rows
+        """
+
+    def selectivity(self, df: pd.DataFrame, rows: Rows, index: QueryIndex) -> float:
+        """
+        Оценивает долю строк, проходящих фильтр, по равномерной выборке строк.
+
+        Args:
+            df: DataFrame с транзакциями
+            rows: Строки, к которым будет применен фильтр
+            index: Индекс DataFrame
+
+        Returns:
+            Доля от 0 до 1
+        """
+        positions = np.arange(len(df))[rows]
+        if len(positions) == 0:
+            return 0.0
+        sample = positions[::max(len(positions) // SELECTIVITY_SAMPLE, 1)]
+        return float(self.mask(df, sample, index).mean())
+
+    def describe(self) -> str:
+        """Описание фильтра для плана запроса."""
+        return self.column
+
+
+class IsIn(Predicate):
+    """Значение столбца из списка (строки сравниваются без учета регистра)."""
+
+    cost = COST_STRING
+
+    def __init__(self, column: str, values: Sequence[Any]) -> None:
+        self.column = column
+        self.values = list(values)
+        self._lowered = {str(value).lower() for value in self.values}
+
+    def _wanted_codes(self, uniques: np.ndarray) -> np.ndarray:
+        lowered = pd.Series(uniques, dtype=object).astype(str).str.lower()
+        return np.flatnonzero(lowered.isin(self._lowered).to_numpy())
+
+    def mask(self, df: pd.DataFrame, rows: Rows, index: QueryIndex) -> np.ndarray:
+        indexed = index.codes(df, self.column)
+        if indexed is not None:
+            codes, uniques, _ = indexed
+            return np.isin(_take(codes, rows), self._wanted_codes(uniques))
+        values = pd.Series(_take(df[self.column].to_numpy(), rows), dtype=object)
+        return values.astype(str).str.lower().isin(self._lowered).to_numpy() & values.notna().to_numpy()
+
+    def selectivity(self, df: pd.DataFrame, rows: Rows, index: QueryIndex) -> float:
+        indexed = index.codes(df, self.column)
+        if indexed is not None and isinstance(rows, slice) and rows == slice(None):
+            _, uniques, counts = indexed
+            return float(counts[self._wanted_codes(uniques)].sum()) / max(len(df), 1)
+        return super().selectivity(df, rows, index)
+
+    def describe(self) -> str:
+        return f"{self.column} in {self.values}"
+
+
+class Between(Predicate):
+    """Числовое значение в диапазоне (границы включительно, кроме exclusive_high)."""
+
+    def __init__(self, column: str, low: Optional[float] = None, high: Optional[float] = None,
+                 exclusive_high: bool = False) -> None:
+        self.column = column
+        self.low = low
+        self.high = high
+        self.exclusive_high = exclusive_high
+
+    def mask(self, df: pd.DataFrame, rows: Rows, index: QueryIndex) -> np.ndarray:
+        values = _take(df[self.column].to_numpy(), rows)
+        if values.dtype.kind not in 'fiu':
+            values = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy()
+        values = values.astype('float64', copy=False)
+        result = ~np.isnan(values)
+        if self.low is not None:
+            result &= values >= self.low
+        if self.high is not None:
+            result &= (values < self.high) if self.exclusive_high else (values <= self.high)
+        return result
+
+    def describe(self) -> str:
+        high = ')' if self.exclusive_high else ']'
+        return f"{self.column} in [{self.low}, {self.high}{high}"
+
+
+class DateRange(Predicate):
+    """Дата операции в диапазоне [start, end] или [start, end) при exclusive_end."""
+
+    column = 'date'
+
+    def __init__(self, start: Optional[Union[str, datetime]] = None, end: Optional[Union[str, datetime]] = None,
+                 exclusive_end: bool = False) -> None:
+        self.start = None if start is None else pd.Timestamp(start)
+        self.end = None if end is None else pd.Timestamp(end)
+        self.exclusive_end = exclusive_end
+
+    def bounds(self, df: pd.DataFrame) -> slice:
+        """
+        Находит диапазон строк бинарным поиском (данные отсортированы по дате).
+
+        Args:
+            df: DataFrame, отсортированный по date
+
+        Returns:
+            Срез строк
+        """
+        dates = df['date'].to_numpy(dtype='datetime64[ns]')
+        lo = 0 if self.start is None else int(np.searchsorted(dates, np.datetime64(self.start), side='left'))
+        side = 'left' if self.exclusive_end else 'right'
+        hi = len(dates) if self.end is None else int(np.searchsorted(dates, np.datetime64(self.end), side=side))
+        return slice(lo, max(hi, lo))
+
+    def mask(self, df: pd.DataFrame, rows: Rows, index: QueryIndex) -> np.ndarray:
+        dates = _take(df['date'].to_numpy(dtype='datetime64[ns]'), rows)
+        result = ~np.isnat(dates)
+        if self.start is not None:
+            result &= dates >= np.datetime64(self.start)
+        if self.end is not None:
+            end = np.datetime64(self.end)
+            result &= (dates < end) if self.exclusive_end else (dates <= end)
+        return result
+
+    def describe(self) -> str:
+        high = ')' if self.exclusive_end else ']'
+        return f"date in [{self.start}, {self.end}{high}"
+
+
+class Contains(Predicate):
+    """Подстрока в описании или категории без учета регистра."""
+
+    cost = COST_TEXT
+
+    def __init__(self, text: str, columns: Sequence[str] = TEXT_COLUMNS) -> None:
+        self.text = text.lower()
+        self.columns = list(columns)
+        self.column = ', '.join(self.columns)
+
+    def applies(self, df: pd.DataFrame) -> bool:
+        return True
+
+    def mask(self, df: pd.DataFrame, rows: Rows, index: QueryIndex) -> np.ndarray:
+        result = np.zeros(_row_count(rows, len(df)), dtype=bool)
+        for column in self.columns:
+            if column not in df.columns:
+                continue
+            indexed = index.codes(df, column)
+            if indexed is not None:
+                # Подстрока ищется только среди уникальных значений
+                codes, uniques, _ = indexed
+                lowered = pd.Series(uniques, dtype=object).astype(str).str.lower()
+                wanted = np.flatnonzero(lowered.str.contains(self.text, regex=False).to_numpy(dtype=bool))
+                result |= np.isin(_take(codes, rows), wanted)
+            else:
+                values = pd.Series(_take(df[column].to_numpy(), rows), dtype=object)
+                result |= values.fillna('').astype(str).str.lower().str.contains(
+                    self.text, regex=False).to_numpy(dtype=bool)
+        return result
+
+    def describe(self) -> str:
+        return f"'{self.text}' in {self.columns}"
+
+
+class QueryView:
+    """
+    Результат запроса: исходный DataFrame и номера выбранных строк.
+    Данные не копируются, пока не запрошены столбец (column) или таблица (to_pandas).
+    """
+
+    def __init__(self, df: pd.DataFrame, rows: Rows) -> None:
+        """
+        Args:
+            df: Исходный DataFrame
+            rows: Выбранные строки (диапазон или позиции)
+        """
+        self.df = df
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return _row_count(self.rows, len(self.df))
+
+    @property
+    def positions(self) -> np.ndarray:
+        """Позиции выбранных строк в исходном DataFrame."""
+        return np.arange(len(self.df))[self.rows]
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Значения одного столбца выбранных строк.
+
+        Args:
+            name: Имя столбца
+
+        Returns:
+            numpy-массив
+        """
+        return _take(self.df[name].to_numpy(), self.rows)
+
+    def sum(self, name: str = 'amount') -> float:
+        """Сумма столбца по выбранным строкам."""
+        return float(np.nansum(self.column(name).astype('float64')))
+
+    def to_pandas(self) -> pd.DataFrame:
+        """
+        Выбранные строки как DataFrame (для непрерывного диапазона - срез без копирования).
+
+        Returns:
+            DataFrame
+        """
+        return self.df.iloc[self.rows]
+
+
+class Query:
+    """
+    Запрос к транзакциям: фильтры по карте, категории, MCC, сумме, дате,
+    статусу и тексту, объединенные через И. Строится цепочкой методов
+    или из строки (Query.parse), выполняется векторно (execute).
+
+    Планировщик сначала выбирает диапазон дат бинарным поиском, если данные
+    отсортированы по дате, затем применяет фильтры от самых избирательных
+    и дешевых к остальным: каждый следующий фильтр проверяет только строки,
+    прошедшие предыдущие.
+    """
+
+    def __init__(self) -> None:
+        self.predicates: List[Predicate] = []
+
+    def card(self, *cards: str) -> 'Query':
+        """Операции по картам (последние цифры, например '*7197')."""
+        self.predicates.append(IsIn('card_last_digits', cards))
+        return self
+
+    def category(self, *categories: str) -> 'Query':
+        """Операции в категориях."""
+        self.predicates.append(IsIn('category', categories))
+        return self
+
+    def status(self, *statuses: str) -> 'Query':
+        """Операции со статусами."""
+        self.predicates.append(IsIn('status', statuses))
+        return self
+
+    def mcc(self, low: Optional[float] = None, high: Optional[float] = None) -> 'Query':
+        """MCC в диапазоне [low, high]; mcc(5411) - один код."""
+        self.predicates.append(Between('mcc', low, low if high is None else high))
+        return self
+
+    def amount(self, low: Optional[float] = None, high: Optional[float] = None) -> 'Query':
+        """Сумма операции в диапазоне [low, high]."""
+        self.predicates.append(Between('amount', low, high))
+        return self
+
+    def spending(self) -> 'Query':
+        """Только траты (amount < 0)."""
+        self.predicates.append(Between('amount', high=0, exclusive_high=True))
+        return self
+
+    def dates(self, start: Optional[Union[str, datetime]] = None,
+              end: Optional[Union[str, datetime]] = None) -> 'Query':
+        """Операции с start по end включительно."""
+        self.predicates.append(DateRange(start, end))
+        return self
+
+    def month(self, year: int, month: int) -> 'Query':
+        """Операции за календарный месяц."""
+        start = pd.Timestamp(year=year, month=month, day=1)
+        self.predicates.append(DateRange(start, start + pd.offsets.MonthBegin(1), exclusive_end=True))
+        return self
+
+    def text(self, text: str, columns: Sequence[str] = TEXT_COLUMNS) -> 'Query':
+        """Подстрока в описании или категории без учета регистра."""
+        self.predicates.append(Contains(text, columns))
+        return self
+
+    @classmethod
+    def parse(cls, expression: str) -> 'Query':
+        """
+        Разбирает запрос вида
+        'card:*7197 category:Такси,Кафе mcc:5000..5999 amount:-1000..-100
+        date:2021-12-01..2021-12-31 status:OK text:"яндекс такси"'.
+        Диапазоны задаются через '..', любую границу можно опустить;
+        дата без времени в конце диапазона включает весь день;
+        несколько значений перечисляются через запятую.
+
+        Args:
+            expression: Строка запроса
+
+        Returns:
+            Query
+
+        Raises:
+            ValueError: Если поле неизвестно или значение не разобрано
+        """
+        query = cls()
+        for term in shlex.split(expression):
+            field, sep, value = term.partition(':')
+            field = field.lower()
+            if not sep or field not in QUERY_FIELDS:
+                raise ValueError(f"Неизвестное условие запроса: {term}")
+
+            if field in ('card', 'category', 'status'):
+                getattr(query, field)(*[item for item in value.split(',') if item])
+            elif field == 'text':
+                query.text(value)
+            else:
+                low, dots, high = value.partition('..')
+                if not dots:
+                    high = low
+                try:
+                    if field == 'date':
+                        # Дата без времени в конце диапазона означает весь этот день
+                        end = pd.Timestamp(high) if high else None
+                        whole_day = end is not None and len(high) <= 10
+                        if whole_day:
+                            end += pd.Timedelta(days=1)
+                        query.predicates.append(DateRange(low or None, end, exclusive_end=whole_day))
+                    else:
+                        bounds = (float(low) if low else None, float(high) if high else None)
+                        getattr(query, field)(*bounds)
+                except ValueError as e:
+                    raise ValueError(f"Не удалось разобрать условие {term}: {e}") from e
+        return query
+
+    def plan(self, df: pd.DataFrame) -> Tuple[Rows, List[Predicate]]:
+        """
+        Составляет план выполнения: начальный диапазон строк и порядок фильтров.
+
+        Args:
+            df: DataFrame с транзакциями
+
+        Returns:
+            Кортеж (начальные строки, фильтры в порядке применения)
+        """
+        index = get_index(df)
+        sorted_dates = dates_sorted(df)
+        rows: Rows = slice(None)
+        pending = []
+        for predicate in self.predicates:
+            if isinstance(predicate, DateRange) and sorted_dates:
+                bounds = predicate.bounds(df)
+                rows = bounds if rows == slice(None) else slice(max(rows.start, bounds.start),
+                                                                max(min(rows.stop, bounds.stop), rows.start))
+            elif not predicate.applies(df):
+                logger.warning(f"Столбец '{predicate.column}' не найден в данных, условие не выполняется")
+                return slice(0, 0), []
+            else:
+                pending.append(predicate)
+
+        def rank(predicate: Predicate) -> float:
+            # Меньше ранг - раньше проверка: дешевые фильтры, отсекающие больше строк
+            selectivity = predicate.selectivity(df, rows, index)
+            cost = COST_CODES if index.codes(df, predicate.column) is not None else predicate.cost
+            return cost / max(1.0 - selectivity, 1e-6)
+
+        return rows, sorted(pending, key=rank) if len(pending) > 1 else pending
+
+    def explain(self, df: pd.DataFrame) -> str:
+        """
+        Описывает план выполнения запроса.
+
+        Args:
+            df: DataFrame с транзакциями
+
+        Returns:
+            Строка с шагами плана
+        """
+        rows, predicates = self.plan(df)
+        steps = [f"rows {rows.start}:{rows.stop}" if rows != slice(None) else 'full scan']
+        steps += [predicate.describe() for predicate in predicates]
+        return ' -> '.join(steps)
+
+    def execute(self, transactions: Union[pd.DataFrame, TransactionDataset]) -> QueryView:
+        """
+        Выполняет запрос.
+
+        Args:
+            transactions: DataFrame или TransactionDataset (диапазон дат
+                выбирается в отображенном в память файле до преобразования в DataFrame)
+
+        Returns:
+            QueryView с выбранными строками
+        """
+        if isinstance(transactions, TransactionDataset):
+            for predicate in self.predicates:
+                if isinstance(predicate, DateRange):
+                    transactions = transactions.slice_dates(predicate.start, predicate.end)
+            transactions = transactions.to_pandas()
+
+        df = transactions
+        rows, predicates = self.plan(df)
+        index = get_index(df)
+        for predicate in predicates:
+            if _row_count(rows, len(df)) == 0:
+                break
+            positions = np.arange(len(df))[rows] if isinstance(rows, slice) else rows
+            rows = positions[predicate.mask(df, rows, index)]
+        logger.debug(f"Запрос выбрал {_row_count(rows, len(df))} из {len(df)} строк")
+        return QueryView(df, rows)
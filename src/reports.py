@@ -1,16 +1,63 @@
 import pandas as pd
+import numpy as np
 from datetime import datetime
-from typing import Optional, Union, Any, Callable
+from typing import Optional, Union, Any, Callable, Dict, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import functools
 import os
 from pathlib import Path
 from src.utils import load_transactions
+from src.cache import call_key, get_result_cache, result_digest
+from src.dataset import DATASET_EXTENSIONS, TransactionDataset, open_dataset
+from src.profiling import measure
+from src.query import Query
+from src.rollups import Rollups, load_rollups
 import logging
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
 
+def _run_report(func: Callable, file_path: Union[str, Path], *args: Any, **kwargs: Any) -> Any:
+    """
+    Загружает транзакции (или предрасчитанные таблицы) и вызывает функцию отчёта.
+
+    Args:
+        func: Исходная функция отчёта
+        file_path: Путь к файлу с транзакциями
+        *args: Позиционные аргументы отчёта
+        **kwargs: Именованные аргументы отчёта
+
+    Returns:
+        Результат отчёта
+    """
+    # 1. Загружаем данные
+    try:
+        logger.info(f"Загрузка данных из файла: {file_path}")
+        rollups = load_rollups(str(file_path)) if str(file_path).endswith(DATASET_EXTENSIONS) else None
+        if rollups is not None:
+            # Отчёт считается по предрасчитанным таблицам, из набора данных
+            # через memory map читаются только операции граничных дней
+            transactions = open_dataset(str(file_path))
+            kwargs['rollups'] = rollups
+        else:
+            transactions = load_transactions(file_path)
+        kwargs['transactions'] = transactions
+        logger.debug(f"Успешно загружено {len(transactions)} транзакций")
+    except Exception as e:
+        logger.error(f"Ошибка загрузки файла {file_path}: {str(e)}", exc_info=True)
+        raise
+
+    # 2. Вызываем исходную функцию
+    logger.debug(f"Вызов функции {func.__name__} с параметрами: {args}, {kwargs}")
+    with measure(f'report.{func.__name__}') as stage:
+        result = func(file_path, *args, **kwargs)
+        if isinstance(result, pd.DataFrame):
+            stage['rows'] = len(result)
+    return result
+
+
 # Декоратор для сохранения отчётов в файл
 def report_to_file(default_filename: Optional[str] = None) -> Callable:
     """
@@ -27,21 +74,18 @@ def report_to_file(default_filename: Optional[str] = None) -> Callable:
     def decorator(func: Callable) -> Callable:
         @functools.wraps(func)
         def wrapper(file_path: Union[str, Path], *args: Any, **kwargs: Any) -> Any:
-            # 1. Загружаем данные
-            try:
-                logger.info(f"Загрузка данных из файла: {file_path}")
-                transactions = load_transactions(file_path)
-                kwargs['transactions'] = transactions
-                logger.debug(f"Успешно загружено {len(transactions)} транзакций")
-            except Exception as e:
-                logger.error(f"Ошибка загрузки файла {file_path}: {str(e)}", exc_info=True)
-                raise
-
-            # 2. Вызываем исходную функцию
-            logger.debug(f"Вызов функции {func.__name__} с параметрами: {args}, {kwargs}")
-            result = func(file_path, *args, **kwargs)
-
-            # 3. Сохраняем результат только если не в тестовом режиме
+            # 1. Ищем результат в кеше: ключ - отпечаток содержимого файла и аргументы
+            cache = get_result_cache()
+            key = call_key(func, 'file_path', (file_path, *args), kwargs) if cache is not None else None
+            result = cache.get(key) if key is not None else None
+            if key is not None and cache.contains(result):
+                logger.info(f"Отчёт {func.__name__} взят из кеша")
+            else:
+                result = _run_report(func, file_path, *args, **kwargs)
+                if key is not None:
+                    cache.put(key, result)
+
+            # 2. Сохраняем результат только если не в тестовом режиме
             if not kwargs.get('skip_save', False):
                 filename = kwargs.pop('filename', default_filename)
                 if filename is None:
@@ -50,23 +94,30 @@ def report_to_file(default_filename: Optional[str] = None) -> Callable:
                         f"{datetime.now().strftime('%Y%m%d_%H%M%S')}"
                     )
 
-                try:
-                    if isinstance(result, pd.DataFrame):
-                        # Сохраняем в формате в зависимости от расширения
-                        if filename.endswith(('.xls', '.xlsx')):
-                            save_to_excel(result, filename, func.__name__)
-                        else:
-                            result.to_csv(filename, index=False)
-                            logger.info(f"Отчёт сохранён в CSV: {os.path.abspath(filename)}. "
-                                        f"Размер: {len(result)} строк")
-                    else:
-                        # Для не-DataFrame сохраняем как текст
-                        with open(filename, 'w', encoding='utf-8') as f:
-                            f.write(str(result))
-                        logger.info(f"Текстовый отчёт сохранён: {os.path.abspath(filename)}")
-                except Exception as e:
-                    logger.error(f"Ошибка сохранения отчёта {filename}: {str(e)}", exc_info=True)
-                    raise
+                digest = result_digest(result) if cache is not None else None
+                if cache is not None and cache.output_unchanged(filename, digest):
+                    logger.info(f"Отчёт не изменился, файл не перезаписан: {os.path.abspath(filename)}")
+                else:
+                    try:
+                        with measure('report.save'):
+                            if isinstance(result, pd.DataFrame):
+                                # Сохраняем в формате в зависимости от расширения
+                                if filename.endswith(('.xls', '.xlsx')):
+                                    save_to_excel(result, filename, func.__name__)
+                                else:
+                                    result.to_csv(filename, index=False)
+                                    logger.info(f"Отчёт сохранён в CSV: {os.path.abspath(filename)}. "
+                                                f"Размер: {len(result)} строк")
+                            else:
+                                # Для не-DataFrame сохраняем как текст
+                                with open(filename, 'w', encoding='utf-8') as f:
+                                    f.write(str(result))
+                                logger.info(f"Текстовый отчёт сохранён: {os.path.abspath(filename)}")
+                    except Exception as e:
+                        logger.error(f"Ошибка сохранения отчёта {filename}: {str(e)}", exc_info=True)
+                        raise
+                    if cache is not None:
+                        cache.remember_output(filename, digest)
 
             logger.debug(f"Функция {func.__name__} завершена успешно")
             return result
@@ -100,6 +151,326 @@ def save_to_excel(df: pd.DataFrame, filename: str, sheet_name: str) -> None:
         raise
 
 
+# Частичные агрегаты отчётов.
+# Каждый отчёт разбит на два этапа: partial_* считает по части данных суммы
+# (в копейках, чтобы объединение было точным) и количество операций по ключам,
+# finalize_* превращает объединённые агрегаты в итоговую таблицу. Части можно
+# считать в разных процессах или на разных машинах и объединять combine_partials.
+
+PARTIAL_VALUE_COLUMNS = ['sum', 'count']
+
+WEEKDAYS_ORDER = [
+    'Monday', 'Tuesday', 'Wednesday',
+    'Thursday', 'Friday', 'Saturday', 'Sunday'
+]
+
+
+def report_window(date: Optional[str] = None) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    Возвращает период отчёта: последние 3 месяца до указанной даты.
+
+    Args:
+        date: Дата отчета (по умолчанию - текущий момент)
+
+    Returns:
+        Кортеж (начало_периода, конец_периода)
+    """
+    date_obj = pd.Timestamp(datetime.now()) if date is None else pd.to_datetime(date)
+    start_date = date_obj - pd.DateOffset(months=3)
+    logger.debug(f"Период анализа: с {start_date.strftime('%Y-%m-%d')} по {date_obj.strftime('%Y-%m-%d')}")
+    return start_date, date_obj
+
+
+def _spending_in_window(transactions: pd.DataFrame, start_date: pd.Timestamp,
+                        end_date: pd.Timestamp) -> pd.DataFrame:
+    """Отбирает траты за период и добавляет сумму трат в копейках."""
+    mask = (
+            (transactions['amount'] < 0) &
+            (transactions['date'] >= start_date) &
+            (transactions['date'] <= end_date)
+    )
+    filtered = transactions[mask]
+    if filtered.empty:
+        return filtered
+    return filtered.assign(kopecks=(filtered['amount'] * 100).round().astype('int64'))
+
+
+def _aggregate_partial(filtered: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """Считает сумму в копейках и количество трат по ключам."""
+    return (
+        filtered
+        .groupby(keys, as_index=False, sort=False)
+        .agg(sum=('kopecks', 'sum'), count=('kopecks', 'size'))
+    )
+
+
+def combine_partials(partials: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Точно объединяет частичные агрегаты, посчитанные по разным частям данных.
+
+    Args:
+        partials: Список частичных агрегатов одного отчёта
+
+    Returns:
+        Объединённый частичный агрегат
+    """
+    partials = list(partials)
+    if not partials:
+        raise ValueError("Нет частичных агрегатов для объединения")
+
+    keys = [col for col in partials[0].columns if col not in PARTIAL_VALUE_COLUMNS]
+    non_empty = [part for part in partials if not part.empty]
+    if not non_empty:
+        return partials[0]
+    return (
+        pd.concat(non_empty, ignore_index=True)
+        .groupby(keys, as_index=False, sort=False)[PARTIAL_VALUE_COLUMNS]
+        .sum()
+    )
+
+
+def partial_spending_by_category(transactions: pd.DataFrame, category: str, start_date: pd.Timestamp,
+                                 end_date: pd.Timestamp) -> pd.DataFrame:
+    """
+    Частичный агрегат отчёта по категории: суммы трат по месяцам.
+
+    Args:
+        transactions: DataFrame с транзакциями (часть данных)
+        category: Категория для анализа
+        start_date: Начало периода
+        end_date: Конец периода
+
+    Returns:
+        DataFrame со столбцами Месяц, category, sum, count
+    """
+    empty = pd.DataFrame(columns=['Месяц', 'category'] + PARTIAL_VALUE_COLUMNS)
+    if 'category' not in transactions.columns:
+        logger.warning("Столбец 'category' не найден в данных")
+        return empty
+
+    filtered = Query().category(category).spending().dates(start_date, end_date).execute(transactions).to_pandas()
+    if filtered.empty:
+        return empty
+
+    logger.debug(f"Найдено {len(filtered)} транзакций по категории '{category}'")
+    kopecks = (filtered['amount'] * 100).round().astype('int64')
+    return _aggregate_partial(
+        filtered.assign(Месяц=filtered['date'].dt.to_period('M'), kopecks=kopecks), ['Месяц', 'category']
+    )
+
+
+def finalize_spending_by_category(partial: pd.DataFrame) -> pd.DataFrame:
+    """
+    Превращает агрегат отчёта по категории в итоговую таблицу.
+
+    Args:
+        partial: Объединённый частичный агрегат
+
+    Returns:
+        DataFrame со столбцами Месяц, Категория, Сумма
+    """
+    if partial.empty:
+        return pd.DataFrame(columns=['Месяц', 'Категория', 'Сумма'])
+
+    result = (
+        partial
+        .sort_values(['Месяц', 'category'], kind='stable')
+        .rename(columns={'category': 'Категория'})
+        .reset_index(drop=True)
+    )
+    # Делаем суммы положительными
+    result['Сумма'] = result['sum'].abs() / 100
+    return result[['Месяц', 'Категория', 'Сумма']]
+
+
+def partial_spending_by_weekday(transactions: pd.DataFrame, start_date: pd.Timestamp,
+                                end_date: pd.Timestamp) -> pd.DataFrame:
+    """
+    Частичный агрегат отчёта по дням недели.
+
+    Args:
+        transactions: DataFrame с транзакциями (часть данных)
+        start_date: Начало периода
+        end_date: Конец периода
+
+    Returns:
+        DataFrame со столбцами День_недели, sum, count
+    """
+    filtered = _spending_in_window(transactions, start_date, end_date)
+    if filtered.empty:
+        return pd.DataFrame(columns=['День_недели'] + PARTIAL_VALUE_COLUMNS)
+
+    logger.debug(f"Найдено {len(filtered)} трат за период")
+    return _aggregate_partial(filtered.assign(День_недели=filtered['date'].dt.day_name()), ['День_недели'])
+
+
+def finalize_spending_by_weekday(partial: pd.DataFrame) -> pd.DataFrame:
+    """
+    Превращает агрегат отчёта по дням недели в итоговую таблицу.
+
+    Args:
+        partial: Объединённый частичный агрегат
+
+    Returns:
+        DataFrame со столбцами День_недели, Средний_расход
+    """
+    if partial.empty:
+        return pd.DataFrame(columns=['День_недели', 'Средний_расход'])
+
+    result = partial.sort_values(
+        'День_недели',
+        key=lambda x: x.map({day: i for i, day in enumerate(WEEKDAYS_ORDER)})
+    ).reset_index(drop=True)
+
+    # Округление и абсолютные значения
+    result['Средний_расход'] = (result['sum'] / result['count'] / 100).abs().round(2)
+    return result[['День_недели', 'Средний_расход']]
+
+
+def partial_spending_by_workday(transactions: pd.DataFrame, start_date: pd.Timestamp,
+                                end_date: pd.Timestamp) -> pd.DataFrame:
+    """
+    Частичный агрегат отчёта по рабочим и выходным дням.
+
+    Args:
+        transactions: DataFrame с транзакциями (часть данных)
+        start_date: Начало периода
+        end_date: Конец периода
+
+    Returns:
+        DataFrame со столбцами Тип_дня, sum, count
+    """
+    filtered = _spending_in_window(transactions, start_date, end_date)
+    if filtered.empty:
+        return pd.DataFrame(columns=['Тип_дня'] + PARTIAL_VALUE_COLUMNS)
+
+    logger.debug(f"Найдено {len(filtered)} трат за период")
+    day_type = np.where(filtered['date'].dt.weekday >= 5, 'Выходной', 'Рабочий')
+    return _aggregate_partial(filtered.assign(Тип_дня=day_type), ['Тип_дня'])
+
+
+def finalize_spending_by_workday(partial: pd.DataFrame) -> pd.DataFrame:
+    """
+    Превращает агрегат отчёта по типам дней в итоговую таблицу.
+
+    Args:
+        partial: Объединённый частичный агрегат
+
+    Returns:
+        DataFrame со столбцами Тип_дня, Средний_расход
+    """
+    if partial.empty:
+        return pd.DataFrame(columns=['Тип_дня', 'Средний_расход'])
+
+    result = partial.sort_values('Тип_дня').reset_index(drop=True)
+    result['Средний_расход'] = (result['sum'] / result['count'] / 100).abs().round(2)
+    return result[['Тип_дня', 'Средний_расход']]
+
+
+# Ответ по предрасчитанным таблицам (src.rollups).
+# Полные дни периода берутся из таблицы день × категория, а если период
+# включает всю историю, отчёты по дням недели - из более крупной таблицы
+# день недели × категория. Неполные граничные дни считаются по операциям.
+
+def _as_frame(transactions: Union[pd.DataFrame, TransactionDataset]) -> pd.DataFrame:
+    """Возвращает транзакции в виде DataFrame."""
+    if isinstance(transactions, TransactionDataset):
+        return transactions.to_pandas()
+    return transactions
+
+
+def _raw_window(transactions: Union[pd.DataFrame, TransactionDataset], start: pd.Timestamp,
+                end: pd.Timestamp) -> pd.DataFrame:
+    """Отбирает операции за start <= date <= end (для набора данных - бинарным поиском)."""
+    if end < start:
+        return _as_frame(transactions).iloc[0:0]
+    if isinstance(transactions, TransactionDataset):
+        return transactions.slice_dates(start, end).to_pandas()
+    return transactions[(transactions['date'] >= start) & (transactions['date'] <= end)]
+
+
+def rollup_partial(report: str, rollups: Rollups, transactions: Union[pd.DataFrame, TransactionDataset],
+                   start_date: pd.Timestamp, end_date: pd.Timestamp, **params: Any) -> pd.DataFrame:
+    """
+    Считает частичный агрегат отчёта по предрасчитанным таблицам.
+    Результат совпадает с partial_* по всем операциям.
+
+    Args:
+        report: Имя отчёта из PARTIAL_REPORTS
+        rollups: Предрасчитанные таблицы по этим транзакциям
+        transactions: Транзакции (для неполных граничных дней)
+        start_date: Начало периода
+        end_date: Конец периода
+        **params: Параметры отчёта (например, category)
+
+    Returns:
+        Частичный агрегат
+    """
+    partial_func = PARTIAL_REPORTS[report][0]
+    first_day, last_day = start_date.ceil('D'), end_date.floor('D')
+
+    if report != 'spending_by_category' and rollups.covers(start_date, end_date):
+        table = rollups.tables['weekday_category']
+        weekdays = table['weekday'].to_numpy(dtype='int64')
+        boundary = []
+        logger.debug(f"Отчёт {report}: таблица weekday_category, {len(table)} строк")
+    else:
+        if first_day >= last_day:
+            # Период короче суток - только по операциям
+            return partial_func(_raw_window(transactions, start_date, end_date), start_date=start_date,
+                                end_date=end_date, **params)
+        table = rollups.slice_days('daily_category', first_day, last_day)
+        weekdays = table['day'].dt.dayofweek.to_numpy()
+        boundary = [
+            _raw_window(transactions, start_date, first_day - pd.Timedelta(1, 'ns')),
+            _raw_window(transactions, last_day, end_date),
+        ]
+        logger.debug(f"Отчёт {report}: таблица daily_category, {len(table)} строк")
+
+    if report == 'spending_by_category':
+        table = table[(table['category'].astype(object).str.lower() == params['category'].lower()).to_numpy()]
+        keys = ['Месяц', 'category']
+        table = table.assign(Месяц=table['day'].dt.to_period('M'))
+    elif report == 'spending_by_weekday':
+        keys = ['День_недели']
+        table = table.assign(День_недели=np.array(WEEKDAYS_ORDER, dtype=object)[weekdays])
+    else:
+        keys = ['Тип_дня']
+        table = table.assign(Тип_дня=np.where(weekdays >= 5, 'Выходной', 'Рабочий'))
+
+    partials = [
+        table.groupby(keys, as_index=False, sort=False)[PARTIAL_VALUE_COLUMNS].sum()
+        if not table.empty else pd.DataFrame(columns=keys + PARTIAL_VALUE_COLUMNS)
+    ]
+    for raw in boundary:
+        if not raw.empty:
+            partials.append(partial_func(raw, start_date=start_date, end_date=end_date, **params))
+    return combine_partials(partials)
+
+
+def report_partial(report: str, transactions: Union[pd.DataFrame, TransactionDataset],
+                   rollups: Optional[Rollups], start_date: pd.Timestamp, end_date: pd.Timestamp,
+                   **params: Any) -> pd.DataFrame:
+    """
+    Считает частичный агрегат отчёта по самой крупной подходящей предрасчитанной
+    таблице, а без таблиц - по всем операциям.
+
+    Args:
+        report: Имя отчёта из PARTIAL_REPORTS
+        transactions: Транзакции
+        rollups: Предрасчитанные таблицы или None
+        start_date: Начало периода
+        end_date: Конец периода
+        **params: Параметры отчёта
+
+    Returns:
+        Частичный агрегат
+    """
+    if rollups is not None:
+        return rollup_partial(report, rollups, transactions, start_date, end_date, **params)
+    return PARTIAL_REPORTS[report][0](_as_frame(transactions), start_date=start_date, end_date=end_date, **params)
+
+
 # Отчёт: Траты по категории
 @report_to_file()
 def spending_by_category(
@@ -123,44 +494,15 @@ def spending_by_category(
     transactions = kwargs['transactions']
     logger.info(f"Генерация отчёта по категории '{category}'")
 
-    # Проверяем наличие столбца category
-    if 'category' not in transactions.columns:
-        logger.warning("Столбец 'category' не найден в данных")
-        return pd.DataFrame(columns=['Месяц', 'Категория', 'Сумма'])
-
-    # Обработка даты
-    date_obj = datetime.now() if date is None else pd.to_datetime(date)
-    start_date = date_obj - pd.DateOffset(months=3)
-    logger.debug(f"Период анализа: с {start_date.strftime('%Y-%m-%d')} по {date_obj.strftime('%Y-%m-%d')}")
-
-    # Фильтрация данных
-    mask = (
-            (transactions['category'].str.lower() == category.lower()) &
-            (transactions['amount'] < 0) &
-            (transactions['date'] >= start_date) &
-            (transactions['date'] <= date_obj)
-    )
-    filtered = transactions[mask].copy()
+    start_date, date_obj = report_window(date)
+    result = finalize_spending_by_category(report_partial(
+        'spending_by_category', transactions, kwargs.get('rollups'), start_date, date_obj, category=category
+    ))
 
-    if filtered.empty:
+    if result.empty:
         logger.warning(f"Нет данных по категории '{category}' за указанный период")
-        return pd.DataFrame(columns=['Месяц', 'Категория', 'Сумма'])
-
-    logger.debug(f"Найдено {len(filtered)} транзакций по категории '{category}'")
-
-    # Агрегация по месяцам
-    result = (
-        filtered
-        .assign(Месяц=filtered['date'].dt.to_period('M'))
-        .groupby(['Месяц', 'category'], as_index=False)
-        .agg(Сумма=('amount', 'sum'))
-        .rename(columns={'category': 'Категория'})
-    )
-
-    # Делаем суммы положительными
-    result['Сумма'] = result['Сумма'].abs()
-    logger.info(f"Отчёт по категории '{category}' сгенерирован: {len(result)} записей")
-
+    else:
+        logger.info(f"Отчёт по категории '{category}' сгенерирован: {len(result)} записей")
     return result
 
 
@@ -185,47 +527,15 @@ def spending_by_weekday(
     transactions = kwargs['transactions']
     logger.info("Генерация отчёта по дням недели")
 
-    date_obj = datetime.now() if date is None else pd.to_datetime(date)
-    start_date = date_obj - pd.DateOffset(months=3)
-    logger.debug(f"Период анализа: с {start_date.strftime('%Y-%m-%d')} по {date_obj.strftime('%Y-%m-%d')}")
+    start_date, date_obj = report_window(date)
+    result = finalize_spending_by_weekday(report_partial(
+        'spending_by_weekday', transactions, kwargs.get('rollups'), start_date, date_obj
+    ))
 
-    # Фильтрация трат
-    mask = (
-            (transactions['amount'] < 0) &
-            (transactions['date'] >= start_date) &
-            (transactions['date'] <= date_obj)
-    )
-    filtered = transactions[mask].copy()
-
-    if filtered.empty:
+    if result.empty:
         logger.warning("Нет данных о тратах за указанный период")
-        return pd.DataFrame(columns=['День_недели', 'Средний_расход'])
-
-    logger.debug(f"Найдено {len(filtered)} трат за период")
-
-    # Добавляем день недели
-    filtered['День_недели'] = filtered['date'].dt.day_name()
-
-    # Группировка и сортировка
-    weekdays_order = [
-        'Monday', 'Tuesday', 'Wednesday',
-        'Thursday', 'Friday', 'Saturday', 'Sunday'
-    ]
-
-    result = (
-        filtered
-        .groupby('День_недели', as_index=False)
-        .agg(Средний_расход=('amount', 'mean'))
-        .sort_values(
-            'День_недели',
-            key=lambda x: x.map({day: i for i, day in enumerate(weekdays_order)})
-        )
-    )
-
-    # Округление и абсолютные значения
-    result['Средний_расход'] = result['Средний_расход'].abs().round(2)
-    logger.info(f"Отчёт по дням недели сгенерирован: {len(result)} записей")
-
+    else:
+        logger.info(f"Отчёт по дням недели сгенерирован: {len(result)} записей")
     return result
 
 
@@ -250,37 +560,105 @@ def spending_by_workday(
     transactions = kwargs['transactions']
     logger.info("Генерация отчёта по типам дней (рабочие/выходные)")
 
-    date_obj = datetime.now() if date is None else pd.to_datetime(date)
-    start_date = date_obj - pd.DateOffset(months=3)
-    logger.debug(f"Период анализа: с {start_date.strftime('%Y-%m-%d')} по {date_obj.strftime('%Y-%m-%d')}")
-
-    mask = (
-            (transactions['amount'] < 0) &
-            (transactions['date'] >= start_date) &
-            (transactions['date'] <= date_obj)
-    )
-    filtered = transactions[mask].copy()
+    start_date, date_obj = report_window(date)
+    result = finalize_spending_by_workday(report_partial(
+        'spending_by_workday', transactions, kwargs.get('rollups'), start_date, date_obj
+    ))
 
-    if filtered.empty:
+    if result.empty:
         logger.warning("Нет данных о тратах за указанный период")
-        return pd.DataFrame(columns=['Тип_дня', 'Средний_расход'])
+    else:
+        logger.info(f"Отчёт по типам дней сгенерирован: {len(result)} записей")
+    return result
 
-    logger.debug(f"Найдено {len(filtered)} трат за период")
 
-    # Определяем тип дня
-    filtered['Тип_дня'] = (
-        filtered['date'].apply(
-            lambda x: 'Выходной' if x.weekday() >= 5 else 'Рабочий'
-        )
-    )
+# Распределённый расчёт отчётов: имя отчёта -> (частичный агрегат, итоговая таблица)
+PARTIAL_REPORTS: Dict[str, Tuple[Callable, Callable]] = {
+    'spending_by_category': (partial_spending_by_category, finalize_spending_by_category),
+    'spending_by_weekday': (partial_spending_by_weekday, finalize_spending_by_weekday),
+    'spending_by_workday': (partial_spending_by_workday, finalize_spending_by_workday),
+}
 
-    result = (
-        filtered
-        .groupby('Тип_дня', as_index=False)
-        .agg(Средний_расход=('amount', 'mean'))
-    )
 
-    result['Средний_расход'] = result['Средний_расход'].abs().round(2)
-    logger.info(f"Отчёт по типам дней сгенерирован: {len(result)} записей")
+def shard_transactions(transactions: pd.DataFrame, by: str = 'month') -> List[pd.DataFrame]:
+    """
+    Делит транзакции на независимые части для распределённого расчёта.
+
+    Args:
+        transactions: DataFrame с транзакциями
+        by: 'month' - по месяцам операции, 'card' - по картам
+
+    Returns:
+        Список частей
+    """
+    if by == 'month':
+        key = transactions['date'].dt.to_period('M')
+    elif by == 'card':
+        key = transactions['card_last_digits']
+    else:
+        raise ValueError("Поддерживается деление только по 'month' или 'card'")
+    return [part for _, part in transactions.groupby(key, sort=False, dropna=False)]
+
+
+def compute_partial(report: str, shard: Union[str, Path, pd.DataFrame, TransactionDataset],
+                    params: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Считает частичный агрегат отчёта по одной части данных (выполняется воркером).
+
+    Args:
+        report: Имя отчёта из PARTIAL_REPORTS
+        shard: Путь к файлу выгрузки, DataFrame или выборка набора данных Arrow
+        params: Параметры частичного агрегата (включая start_date и end_date)
+
+    Returns:
+        Частичный агрегат
+    """
+    if isinstance(shard, pd.DataFrame):
+        transactions = shard
+    elif isinstance(shard, TransactionDataset):
+        transactions = shard.to_pandas()
+    else:
+        transactions = load_transactions(str(shard))
+    return PARTIAL_REPORTS[report][0](transactions, **params)
+
+
+def run_report_distributed(
+        report: str,
+        shards: List[Union[str, Path, pd.DataFrame, TransactionDataset]],
+        date: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        **params: Any
+) -> pd.DataFrame:
+    """
+    Считает отчёт по частям данных в пуле процессов и точно объединяет результат.
+
+    Args:
+        report: Имя отчёта ('spending_by_category', 'spending_by_weekday', 'spending_by_workday')
+        shards: Части данных: пути к выгрузкам, DataFrame или выборки набора данных
+            (TransactionDataset передаётся воркерам без копирования, через memory map)
+        date: Дата отчета (опционально)
+        max_workers: Число процессов (1 - расчёт в текущем процессе)
+        **params: Параметры отчёта (например, category)
+
+    Returns:
+        Итоговая таблица отчёта, как у соответствующей функции отчёта
+    """
+    if report not in PARTIAL_REPORTS:
+        raise ValueError(f"Неизвестный отчёт: {report}")
+
+    start_date, end_date = report_window(date)
+    params = {**params, 'start_date': start_date, 'end_date': end_date}
+    logger.info(f"Распределённый расчёт отчёта {report} по {len(shards)} частям")
+
+    with measure(f'report.{report}.distributed') as stage:
+        if max_workers == 1 or len(shards) <= 1:
+            partials = [compute_partial(report, shard, params) for shard in shards]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                partials = list(executor.map(
+                    compute_partial, repeat(report), shards, repeat(params)
+                ))
+        result = PARTIAL_REPORTS[report][1](combine_partials(partials))
+        stage['rows'] = len(result)
 
     return result
@@ -0,0 +1,271 @@
+import json
+import logging
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Предрасчитанные таблицы: имя -> ключи группировки
+ROLLUP_KEYS: Dict[str, List[str]] = {
+    'daily_card': ['day', 'card_last_digits'],
+    'daily_category': ['day', 'category'],
+    'monthly_mcc': ['month', 'mcc'],
+    'weekday_category': ['weekday', 'category'],
+}
+
+# Показатели каждой таблицы (суммы - в копейках, как в частичных агрегатах отчётов)
+ROLLUP_VALUES = ['sum', 'count', 'min', 'max']
+
+ROLLUPS_META = 'meta.json'
+
+
+def rollups_path(dataset_path: str) -> str:
+    """Возвращает путь к каталогу предрасчитанных таблиц рядом с набором данных."""
+    return f"{dataset_path}.rollups"
+
+
+def _rollup_frames(transactions: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Считает все предрасчитанные таблицы по тратам (amount < 0) одним проходом.
+
+    Args:
+        transactions: DataFrame с транзакциями
+
+    Returns:
+        Словарь имя таблицы -> DataFrame с ключами и ROLLUP_VALUES
+    """
+    spending = transactions[(transactions['amount'] < 0) & transactions['date'].notna()]
+    days = spending['date'].dt.normalize()
+    base = pd.DataFrame({
+        'day': days,
+        'month': days.dt.to_period('M').dt.start_time,
+        'weekday': days.dt.dayofweek,
+        'kopecks': (spending['amount'] * 100).round().astype('int64'),
+    })
+    for column in ('card_last_digits', 'category', 'mcc'):
+        base[column] = spending[column] if column in spending.columns else np.nan
+
+    tables = {}
+    for name, keys in ROLLUP_KEYS.items():
+        tables[name] = (
+            base.groupby(keys, dropna=False, sort=True)['kopecks']
+            .agg(['sum', 'count', 'min', 'max'])
+            .reset_index()
+        )
+    return tables
+
+
+def _merge(frames: List[pd.DataFrame], keys: List[str]) -> pd.DataFrame:
+    """Точно объединяет таблицы с одинаковыми ключами."""
+    non_empty = [frame for frame in frames if not frame.empty]
+    if not non_empty:
+        return frames[0]
+    if len(non_empty) == 1:
+        return non_empty[0]
+    frames = non_empty
+    return (
+        pd.concat(frames, ignore_index=True)
+        .groupby(keys, dropna=False, sort=True)
+        .agg(sum=('sum', 'sum'), count=('count', 'sum'), min=('min', 'min'), max=('max', 'max'))
+        .reset_index()
+    )
+
+
+class Rollups:
+    """
+    Предрасчитанные агрегаты трат: день × карта, день × категория,
+    месяц × MCC и день недели × категория, каждый с суммой, числом, минимумом
+    и максимумом трат. Таблицы объединяются точно (суммы в копейках),
+    поэтому их можно обновлять по мере поступления данных (update)
+    и хранить рядом с набором данных (save/load).
+    """
+
+    def __init__(self, tables: Optional[Dict[str, pd.DataFrame]] = None,
+                 meta: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Args:
+            tables: Таблицы по именам ROLLUP_KEYS
+            meta: Метаданные: rows, first_date, last_date, dataset
+        """
+        self.tables = tables or {
+            name: pd.DataFrame(columns=keys + ROLLUP_VALUES) for name, keys in ROLLUP_KEYS.items()
+        }
+        self.meta = meta or {'rows': 0, 'first_date': None, 'last_date': None}
+
+    @classmethod
+    def from_transactions(cls, transactions: pd.DataFrame) -> 'Rollups':
+        """
+        Строит таблицы по транзакциям.
+
+        Args:
+            transactions: DataFrame с транзакциями
+
+        Returns:
+            Rollups
+        """
+        return cls().update(transactions)
+
+    @property
+    def first_date(self) -> Optional[pd.Timestamp]:
+        """Время первой операции в данных."""
+        return None if self.meta['first_date'] is None else pd.Timestamp(self.meta['first_date'])
+
+    @property
+    def last_date(self) -> Optional[pd.Timestamp]:
+        """Время последней операции в данных."""
+        return None if self.meta['last_date'] is None else pd.Timestamp(self.meta['last_date'])
+
+    def update(self, chunk: pd.DataFrame) -> 'Rollups':
+        """
+        Добавляет новые операции: агрегируются только они, затем таблицы
+        объединяются с уже накопленными.
+
+        Args:
+            chunk: DataFrame с новыми транзакциями
+
+        Returns:
+            Этот же объект (для цепочек вызовов)
+        """
+        if chunk.empty:
+            return self
+        fresh = _rollup_frames(chunk)
+        for name, keys in ROLLUP_KEYS.items():
+            self.tables[name] = _merge([self.tables[name], fresh[name]], keys)
+
+        dates = chunk['date'].dropna()
+        if not dates.empty:
+            first, last = dates.min(), dates.max()
+            self.meta['first_date'] = str(min(first, self.first_date) if self.first_date is not None else first)
+            self.meta['last_date'] = str(max(last, self.last_date) if self.last_date is not None else last)
+        self.meta['rows'] += len(chunk)
+        return self
+
+    def covers(self, start_date: pd.Timestamp, end_date: pd.Timestamp) -> bool:
+        """Проверяет, что период включает всю историю операций."""
+        return self.first_date is not None and start_date <= self.first_date and end_date >= self.last_date
+
+    def slice_days(self, name: str, start: pd.Timestamp, stop: pd.Timestamp) -> pd.DataFrame:
+        """
+        Выбирает строки дневной таблицы за дни start <= day < stop
+        бинарным поиском по отсортированному столбцу day.
+
+        Args:
+            name: 'daily_card' или 'daily_category'
+            start: Первый день
+            stop: День после последнего
+
+        Returns:
+            Строки таблицы
+        """
+        table = self.tables[name]
+        days = table['day'].to_numpy(dtype='datetime64[ns]')
+        lo = np.searchsorted(days, np.datetime64(start), side='left')
+        hi = np.searchsorted(days, np.datetime64(stop), side='left')
+        return table.iloc[lo:max(hi, lo)]
+
+    def aggregate(self, name: str, by: Union[str, List[str]],
+                  start_date: Optional[Union[str, pd.Timestamp]] = None,
+                  end_date: Optional[Union[str, pd.Timestamp]] = None) -> pd.DataFrame:
+        """
+        Сворачивает таблицу до нужных ключей, при необходимости за диапазон дней
+        или месяцев (границы включительно, с точностью до ключа времени таблицы).
+
+        Args:
+            name: Имя таблицы из ROLLUP_KEYS
+            by: Ключ или ключи таблицы для итоговой группировки
+            start_date: Начало периода
+            end_date: Конец периода
+
+        Returns:
+            DataFrame: ключи by, sum, count, min, max (в рублях)
+        """
+        table = self.tables[name]
+        time_key = ROLLUP_KEYS[name][0]
+        if time_key in ('day', 'month') and (start_date is not None or end_date is not None):
+            period = table[time_key]
+            freq = 'D' if time_key == 'day' else 'M'
+            mask = np.ones(len(table), dtype=bool)
+            if start_date is not None:
+                mask &= (period >= pd.Timestamp(start_date).to_period(freq).start_time).to_numpy()
+            if end_date is not None:
+                mask &= (period <= pd.Timestamp(end_date).to_period(freq).start_time).to_numpy()
+            table = table[mask]
+
+        by = [by] if isinstance(by, str) else list(by)
+        result = table.groupby(by, dropna=False).agg(
+            sum=('sum', 'sum'), count=('count', 'sum'), min=('min', 'min'), max=('max', 'max')
+        ).reset_index()
+        for column in ('sum', 'min', 'max'):
+            result[column] = result[column] / 100
+        return result
+
+    def save(self, path: str, dataset_path: Optional[str] = None) -> None:
+        """
+        Сохраняет таблицы в каталог (файлы Arrow IPC и meta.json).
+
+        Args:
+            path: Каталог таблиц
+            dataset_path: Набор данных, по которому построены таблицы
+                (его размер и время изменения проверяются при загрузке)
+
+        Returns:
+            None
+        """
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name, table in self.tables.items():
+            table.reset_index(drop=True).to_feather(os.path.join(tmp_path, f"{name}.arrow"))
+
+        meta = dict(self.meta)
+        if dataset_path is not None:
+            meta['dataset'] = {'size': os.path.getsize(dataset_path), 'mtime': os.path.getmtime(dataset_path)}
+        with open(os.path.join(tmp_path, ROLLUPS_META), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        logger.info(f"Предрасчитанные таблицы сохранены: {os.path.abspath(path)}")
+
+    @classmethod
+    def load(cls, path: str) -> 'Rollups':
+        """
+        Загружает таблицы из каталога.
+
+        Args:
+            path: Каталог таблиц
+
+        Returns:
+            Rollups
+        """
+        with open(os.path.join(path, ROLLUPS_META), encoding='utf-8') as f:
+            meta = json.load(f)
+        tables = {name: pd.read_feather(os.path.join(path, f"{name}.arrow")) for name in ROLLUP_KEYS}
+        return cls(tables, meta)
+
+
+def load_rollups(dataset_path: str) -> Optional[Rollups]:
+    """
+    Загружает таблицы, сохраненные рядом с набором данных, если они есть
+    и построены по текущей версии набора.
+
+    Args:
+        dataset_path: Путь к набору данных
+
+    Returns:
+        Rollups или None
+    """
+    path = rollups_path(dataset_path)
+    if not os.path.isdir(path):
+        return None
+    rollups = Rollups.load(path)
+    source = rollups.meta.get('dataset')
+    current = {'size': os.path.getsize(dataset_path), 'mtime': os.path.getmtime(dataset_path)}
+    if source != current:
+        logger.warning(f"Предрасчитанные таблицы {path} устарели и не используются")
+        return None
+    return rollups
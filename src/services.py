@@ -1,42 +1,90 @@
 import pandas as pd
-from typing import Dict, List, Any
+import numpy as np
+from typing import Dict, List, Any, Optional, Union
 import logging
+from src.cache import memoized
+from src.cashback import CashbackRules
+from src.dataset import TransactionDataset
+from src.merchants import match_merchants, merchant_key
+from src.query import Query
 
 logger = logging.getLogger(__name__)
 
+# Транзакции можно передавать списком словарей, DataFrame или набором данных Arrow
+Transactions = Union[List[Dict[str, Any]], pd.DataFrame, TransactionDataset]
 
+# Периоды регулярных платежей: номинальный интервал в днях, допуск по дате в днях
+# и минимальное число списаний
+RECURRING_PERIODS = {
+    'weekly': (7.0, 1.0, 3),
+    'monthly': (30.44, 3.0, 3),
+    'yearly': (365.25, 7.0, 2),
+}
+
+
+def to_transactions_frame(data: Transactions) -> pd.DataFrame:
+    """
+    Приводит транзакции к DataFrame без лишних копий.
+    DataFrame возвращается как есть, список словарей преобразуется,
+    столбец date разбирается только если он еще не в формате даты.
+
+    Args:
+        data: Список транзакций, DataFrame или TransactionDataset
+
+    Returns:
+        DataFrame с транзакциями
+    """
+    if isinstance(data, pd.DataFrame):
+        df = data
+    elif isinstance(data, TransactionDataset):
+        df = data.to_pandas()
+    else:
+        df = pd.DataFrame(data)
+
+    if 'date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['date']):
+        df = df.assign(date=pd.to_datetime(df['date']))
+    return df
+
+
+def _month_spending(df: pd.DataFrame, year: int, month: int) -> pd.DataFrame:
+    """Отбирает траты за указанный месяц."""
+    return Query().month(year, month).spending().execute(df).to_pandas()
+
+
+@memoized('data')
 def analyze_cashback_categories(
-        data: List[Dict[str, Any]],
+        data: Transactions,
         year: int,
-        month: int
+        month: int,
+        rules: Optional[CashbackRules] = None
 ) -> Dict[str, float]:
     """
     Анализирует выгодные категории для повышенного кешбэка.
-    Рассчитывает потенциальный кешбэк 5% от суммы трат по категориям.
+    Рассчитывает потенциальный кешбэк 5% от суммы трат по категориям,
+    а если переданы правила - кешбэк по этим правилам с учетом лимитов.
 
     Args:
-        data: Список транзакций
+        data: Транзакции (список словарей, DataFrame или TransactionDataset)
         year: Год анализа
         month: Месяц анализа
+        rules: Набор правил кешбэка (src.cashback.CashbackRules)
 
     Returns:
         Словарь с категориями и суммами потенциального кешбэка
     """
     try:
-        df = pd.DataFrame(data)
-        df['date'] = pd.to_datetime(df['date'])
+        filtered = _month_spending(to_transactions_frame(data), year, month)
 
-        # Фильтрация по месяцу и тратам
-        filtered = df[
-            (df['date'].dt.year == year) &
-            (df['date'].dt.month == month) &
-            (df['amount'] < 0)
-            ]
+        if rules is not None:
+            cashback = rules.evaluate(filtered)['cashback']
+            return cashback.groupby(filtered['category']).sum().round(2).to_dict()
 
         # Расчет кешбэка по категориям (5% от суммы)
         result = (
-            filtered.groupby('category')['amount']
-            .apply(lambda x: x.abs().sum() * 0.05)
+            (-filtered['amount'])
+            .groupby(filtered['category'])
+            .sum()
+            .mul(0.05)
             .to_dict()
         )
 
@@ -47,9 +95,10 @@ def analyze_cashback_categories(
         return {}
 
 
+@memoized('transactions')
 def investment_bank(
         month: str,
-        transactions: List[Dict[str, Any]],
+        transactions: Transactions,
         limit: int
 ) -> float:
     """
@@ -57,7 +106,7 @@ def investment_bank(
 
     Args:
         month: Месяц анализа в формате 'YYYY-MM'
-        transactions: Список транзакций
+        transactions: Транзакции (список словарей, DataFrame или TransactionDataset)
         limit: Лимит округления
 
     Returns:
@@ -65,22 +114,13 @@ def investment_bank(
     """
     try:
         year, month = map(int, month.split('-'))
-        df = pd.DataFrame(transactions)
-        df['date'] = pd.to_datetime(df['date'])
-
-        # Фильтрация по месяцу и тратам
-        filtered = df[
-            (df['date'].dt.year == year) &
-            (df['date'].dt.month == month) &
-            (df['amount'] < 0)
-            ]
+        filtered = _month_spending(to_transactions_frame(transactions), year, month)
 
         # Расчет округления с ограничением
-        roundup = filtered['amount'].apply(
-            lambda x: min(limit, (abs(x) // limit + 1) * limit - abs(x))
-        )
+        spent = -filtered['amount'].to_numpy(dtype='float64')
+        roundup = np.minimum(limit, (spent // limit + 1) * limit - spent)
 
-        return roundup.sum()
+        return float(roundup.sum())
 
     except Exception as e:
         logger.error(f"Error in investment_bank: {str(e)}")
@@ -89,24 +129,157 @@ def investment_bank(
 
 def simple_search(
         query: str,
-        transactions: List[Dict[str, Any]]
-) -> List[Dict[str, Any]]:
+        transactions: Transactions
+) -> Union[List[Dict[str, Any]], pd.DataFrame]:
     """
     Выполняет поиск транзакций по описанию или категории.
+    Описания сравниваются и по ключу продавца (src.merchants), поэтому
+    'пятерочка' находит и 'PYATEROCHKA MOSKVA'.
 
     Args:
         query: Строка поиска
-        transactions: Список транзакций для поиска
+        transactions: Транзакции (список словарей, DataFrame или TransactionDataset)
 
     Returns:
-        Список найденных транзакций
+        Найденные транзакции: DataFrame для DataFrame и TransactionDataset,
+        список исходных словарей для списка
     """
     try:
-        return [
-            t for t in transactions
-            if query.lower() in str(t.get('description', '')).lower() or
-               query.lower() in str(t.get('category', '')).lower()
-        ]
+        if isinstance(transactions, (pd.DataFrame, TransactionDataset)):
+            df = to_transactions_frame(transactions)
+        elif not transactions:
+            return []
+        else:
+            df = pd.DataFrame(transactions)
+
+        found = np.zeros(len(df), dtype=bool)
+        found[Query().text(query).execute(df).positions] = True
+        if 'description' in df.columns:
+            found |= match_merchants(df['description'], query)
+
+        if isinstance(transactions, list):
+            return [transactions[i] for i in np.flatnonzero(found)]
+        return df[found]
     except Exception as e:
         logger.error(f"Error in simple_search: {str(e)}")
         return []
+
+
+@memoized('transactions')
+def detect_recurring_payments(
+        transactions: Transactions,
+        amount_tolerance: float = 0.1,
+        min_share: float = 0.8
+) -> List[Dict[str, Any]]:
+    """
+    Находит подписки и регулярные платежи: повторяющиеся траты у одного продавца
+    (ключ описания и MCC) с почти постоянным интервалом и суммой.
+
+    Операции сортируются по продавцу и дате, интервалы между соседними списаниями
+    и отклонения сумм считаются векторно (groupby + diff), поэтому время работы
+    почти линейно по числу операций.
+
+    Args:
+        transactions: Транзакции (список словарей, DataFrame или TransactionDataset)
+        amount_tolerance: Допустимое относительное отклонение суммы от медианной
+        min_share: Минимальная доля интервалов и сумм, укладывающихся в допуск
+
+    Returns:
+        Список регулярных платежей по убыванию месячной стоимости
+    """
+    try:
+        df = to_transactions_frame(transactions)
+        if df.empty:
+            return []
+
+        spending = df['amount'] < 0
+        if 'status' in df.columns:
+            spending &= df['status'].ne('FAILED')
+        df = df[spending & df['date'].notna()]
+
+        # Ключ продавца считается один раз на уникальное описание
+        codes, descriptions = pd.factorize(df['description'])
+        keys = np.array([merchant_key(d) for d in descriptions] + [''], dtype=object)[codes]
+        mcc = pd.to_numeric(df['mcc'], errors='coerce') if 'mcc' in df.columns else pd.Series(np.nan, index=df.index)
+        frame = pd.DataFrame({
+            'key': keys,
+            'mcc': mcc.fillna(-1).to_numpy(dtype='int64'),
+            'date': df['date'].to_numpy(),
+            'amount': -df['amount'].to_numpy(dtype='float64'),
+            'description': df['description'].to_numpy(),
+        })
+        frame = frame[frame['key'] != ''].sort_values(['key', 'mcc', 'date'], kind='stable')
+        if frame.empty:
+            return []
+
+        group = frame.groupby(['key', 'mcc'], sort=False).ngroup().to_numpy()
+        gaps = frame['date'].diff().dt.total_seconds().to_numpy() / 86400
+        gaps[np.r_[True, group[1:] != group[:-1]]] = np.nan
+        frame = frame.assign(group=group, gap=gaps)
+
+        stats = frame.groupby('group').agg(
+            occurrences=('amount', 'size'),
+            median_gap=('gap', 'median'),
+            median_amount=('amount', 'median'),
+            average_amount=('amount', 'mean'),
+            last_date=('date', 'max'),
+            description=('description', 'last'),
+            mcc=('mcc', 'last'),
+        )
+
+        # Период группы - тот, в допуск которого попадает медианный интервал
+        names = list(RECURRING_PERIODS)
+        nominal = np.array([RECURRING_PERIODS[name][0] for name in names])
+        tolerance = np.array([RECURRING_PERIODS[name][1] for name in names])
+        min_count = np.array([RECURRING_PERIODS[name][2] for name in names])
+        matches = np.abs(stats['median_gap'].to_numpy()[:, None] - nominal) <= tolerance
+        period = np.where(matches.any(axis=1), matches.argmax(axis=1), -1)
+        stats['period'] = period
+
+        row_period = period[frame['group'].to_numpy()]
+        has_period = row_period >= 0
+        safe_period = np.where(has_period, row_period, 0)
+        gap_ok = np.abs(frame['gap'].to_numpy() - nominal[safe_period]) <= tolerance[safe_period]
+        median_amount = stats['median_amount'].to_numpy()[frame['group'].to_numpy()]
+        amount_ok = np.abs(frame['amount'].to_numpy() - median_amount) <= amount_tolerance * median_amount
+
+        checks = pd.DataFrame({
+            'group': frame['group'].to_numpy(),
+            'gap_ok': gap_ok & has_period,
+            'amount_ok': amount_ok,
+        }).groupby('group').agg(gap_ok=('gap_ok', 'sum'), amount_ok=('amount_ok', 'mean'))
+        stats = stats.join(checks)
+
+        safe = np.where(stats['period'].to_numpy() >= 0, stats['period'].to_numpy(), 0)
+        intervals = (stats['occurrences'] - 1).clip(lower=1)
+        recurring = stats[
+            (stats['period'] >= 0)
+            & (stats['occurrences'] >= min_count[safe])
+            & (stats['gap_ok'] / intervals >= min_share)
+            & (stats['amount_ok'] >= min_share)
+        ]
+
+        latest = df['date'].max()
+        result = []
+        for row in recurring.itertuples():
+            days, tol, _ = RECURRING_PERIODS[names[row.period]]
+            next_date = row.last_date + pd.Timedelta(days=days)
+            result.append({
+                'merchant': row.description,
+                'mcc': None if row.mcc < 0 else int(row.mcc),
+                'period': names[row.period],
+                'occurrences': int(row.occurrences),
+                'average_amount': round(float(row.average_amount), 2),
+                'monthly_cost': round(float(row.average_amount) * 30.44 / days, 2),
+                'last_date': row.last_date.strftime('%Y-%m-%d'),
+                'next_expected_date': next_date.strftime('%Y-%m-%d'),
+                'active': bool(next_date + pd.Timedelta(days=tol) >= latest),
+            })
+
+        result.sort(key=lambda item: item['monthly_cost'], reverse=True)
+        logger.info(f"Найдено регулярных платежей: {len(result)}")
+        return result
+
+    except Exception as e:
+        logger.error(f"Error in detect_recurring_payments: {str(e)}")
+        return []
@@ -0,0 +1,595 @@
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+import pandas as pd
+
+from src.profiling import timed
+
+logger = logging.getLogger(__name__)
+
+# Скетчи строятся за один потоковый проход по частям данных, сохраняются
+# по месяцам и объединяются для любого диапазона месяцев без повторного чтения
+# операций. Границы ошибок при параметрах по умолчанию:
+#   KLLSketch (k=200): ошибка ранга процентиля не больше ~1,3% с вероятностью 99%
+#     (для p90 возвращается значение с рангом от 0,887 до 0,913);
+#   HyperLogLog (p=12, 4096 регистров): стандартная относительная ошибка
+#     числа различных значений 1,04 / sqrt(4096) = 1,6%;
+#   CountMinSketch (2048 × 4): оценка не меньше точной и завышена не более чем
+#     на e / 2048 = 0,13% суммы всех трат с вероятностью 1 - e^-4 = 98%;
+#   SpaceSaving (200 продавцов): точная сумма продавца лежит в [spend - error, spend],
+#     продавец с долей больше 1/200 всех трат гарантированно попадает в список.
+KLL_K = 200
+KLL_MIN_CAPACITY = 8
+HLL_PRECISION = 12
+CMS_WIDTH = 2048
+CMS_DEPTH = 4
+TOP_CAPACITY = 200
+
+# Ключи хеширования строк Count-Min (pandas требует ровно 16 символов)
+_CMS_HASH_KEYS = [f"countminsketch{row:02d}" for row in range(16)]
+
+SKETCH_EXTENSION = '.npz'
+
+_rng = np.random.default_rng()
+
+
+def _hash(values: np.ndarray, hash_key: str = '0123456789123456') -> np.ndarray:
+    """Хеширует значения в uint64 (стабильно между запусками)."""
+    return pd.util.hash_array(np.asarray(values, dtype=object).astype(str).astype(object), hash_key=hash_key)
+
+
+class KLLSketch:
+    """
+    Скетч KLL для процентилей: уровни-компакторы, на уровне h каждое
+    значение представляет 2^h исходных. Переполненный уровень сортируется,
+    и каждое второе значение (со случайным сдвигом) переходит уровнем выше.
+    """
+
+    def __init__(self, k: int = KLL_K, seed: Optional[int] = None) -> None:
+        """
+        Args:
+            k: Размер верхнего компактора (точность ~1,3% при k=200)
+            seed: Зерно генератора случайных сдвигов
+        """
+        self.k = k
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = _rng if seed is None else np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - 1 - level
+        return max(KLL_MIN_CAPACITY, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self) -> None:
+        while True:
+            level = next((i for i, items in enumerate(self.levels) if len(items) > self._capacity(i)), None)
+            if level is None:
+                return
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            # При нечетном размере одно значение остается на уровне
+            keep = len(items) % 2
+            promoted = items[keep:][int(self._rng.integers(2))::2]
+            self.levels[level] = items[:keep]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    def update(self, values: Any) -> 'KLLSketch':
+        """
+        Добавляет значения.
+
+        Args:
+            values: Массив чисел (NaN пропускаются)
+
+        Returns:
+            Этот же объект (для цепочек вызовов)
+        """
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        """
+        Объединяет со скетчем другой части данных.
+
+        Args:
+            other: Скетч с тем же k
+
+        Returns:
+            Этот же объект (для цепочек вызовов)
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """
+        Возвращает приближенные процентили.
+
+        Args:
+            qs: Доли от 0 до 1
+
+        Returns:
+            Массив значений (NaN для пустого скетча)
+        """
+        qs = np.asarray(qs, dtype='float64')
+        if self.count == 0:
+            return np.full(len(qs), np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, qs * cumulative[-1], side='left')
+        result = items[np.minimum(positions, len(items) - 1)]
+        # Крайние процентили известны точно
+        result = np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, result))
+        return result
+
+
+class HyperLogLog:
+    """Скетч HyperLogLog для числа различных значений (продавцов, карт)."""
+
+    def __init__(self, precision: int = HLL_PRECISION) -> None:
+        """
+        Args:
+            precision: Число бит индекса регистра (от 4 до 16)
+        """
+        if not 4 <= precision <= 16:
+            raise ValueError("precision должен быть от 4 до 16")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values: Any) -> 'HyperLogLog':
+        """
+        Добавляет значения (пропуски не учитываются).
+
+        Args:
+            values: Массив или Series значений
+
+        Returns:
+            Этот же объект (для цепочек вызовов)
+        """
+        values = pd.Series(values, dtype=object).dropna().to_numpy()
+        if len(values) == 0:
+            return self
+        hashes = _hash(values)
+        bits = 64 - self.precision
+        index = (hashes >> np.uint64(bits)).astype(np.int64)
+        rest = hashes & np.uint64((1 << bits) - 1)
+        # Позиция первой единицы в оставшихся битах: bits - длина числа + 1
+        _, length = np.frexp(rest.astype('float64'))
+        rank = (bits - length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        """Объединяет со скетчем с той же точностью."""
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> int:
+        """
+        Оценивает число различных значений.
+
+        Returns:
+            Оценка числа различных значений
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int((self.registers == 0).sum())
+        if raw <= 2.5 * m and zeros:
+            # Поправка для малых значений (linear counting)
+            raw = m * np.log(m / zeros)
+        return int(round(raw))
+
+
+class CountMinSketch:
+    """Скетч Count-Min: приближенная сумма трат по любому продавцу."""
+
+    def __init__(self, width: int = CMS_WIDTH, depth: int = CMS_DEPTH) -> None:
+        """
+        Args:
+            width: Число счетчиков в строке
+            depth: Число строк (независимых хешей, не больше 16)
+        """
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype='float64')
+
+    def _columns(self, keys: np.ndarray) -> List[np.ndarray]:
+        return [(_hash(keys, _CMS_HASH_KEYS[row]) % np.uint64(self.width)).astype(np.int64)
+                for row in range(self.depth)]
+
+    def update(self, keys: Any, weights: Any) -> 'CountMinSketch':
+        """
+        Добавляет веса (неотрицательные) по ключам.
+
+        Args:
+            keys: Ключи
+            weights: Веса
+
+        Returns:
+            Этот же объект (для цепочек вызовов)
+        """
+        keys = np.asarray(keys, dtype=object)
+        if len(keys) == 0:
+            return self
+        weights = np.asarray(weights, dtype='float64')
+        for row, columns in enumerate(self._columns(keys)):
+            np.add.at(self.table[row], columns, weights)
+        return self
+
+    def merge(self, other: 'CountMinSketch') -> 'CountMinSketch':
+        """Объединяет со скетчем того же размера."""
+        self.table += other.table
+        return self
+
+    def estimate(self, keys: Any) -> np.ndarray:
+        """
+        Оценивает суммы по ключам (не меньше точных).
+
+        Args:
+            keys: Ключи
+
+        Returns:
+            Массив оценок
+        """
+        keys = np.atleast_1d(np.asarray(keys, dtype=object))
+        rows = [self.table[row][columns] for row, columns in enumerate(self._columns(keys))]
+        return np.min(rows, axis=0)
+
+
+class SpaceSaving:
+    """
+    Скетч Space-Saving для крупнейших продавцов по сумме трат: хранится не больше
+    capacity счетчиков, у каждого - оценка сверху и максимальная ошибка.
+    """
+
+    def __init__(self, capacity: int = TOP_CAPACITY) -> None:
+        """
+        Args:
+            capacity: Число отслеживаемых продавцов
+        """
+        self.capacity = capacity
+        self.counts = pd.Series(dtype='float64')
+        self.errors = pd.Series(dtype='float64')
+        # Наибольшая возможная сумма продавца, не попавшего в счетчики
+        self.floor = 0.0
+
+    def update(self, keys: Any, weights: Any) -> 'SpaceSaving':
+        """
+        Добавляет веса по ключам: часть данных сворачивается точно
+        и объединяется с накопленными счетчиками.
+
+        Args:
+            keys: Ключи
+            weights: Веса
+
+        Returns:
+            Этот же объект (для цепочек вызовов)
+        """
+        chunk = SpaceSaving(self.capacity)
+        totals = pd.Series(np.asarray(weights, dtype='float64')).groupby(np.asarray(keys, dtype=object)).sum()
+        chunk.counts = totals
+        chunk.errors = pd.Series(0.0, index=totals.index)
+        chunk._truncate(0.0)
+        return self.merge(chunk)
+
+    def _truncate(self, floor: float) -> None:
+        if len(self.counts) > self.capacity:
+            order = self.counts.sort_values(ascending=False, kind='stable')
+            floor = max(floor, float(order.iloc[self.capacity]))
+            kept = order.index[:self.capacity]
+            self.counts = self.counts.loc[kept]
+            self.errors = self.errors.loc[kept]
+        self.floor = floor
+
+    def merge(self, other: 'SpaceSaving') -> 'SpaceSaving':
+        """
+        Объединяет со скетчем другой части данных: продавец, которого нет
+        в одном из скетчей, получает из него оценку floor (и такую же ошибку).
+
+        Args:
+            other: Скетч другой части данных
+
+        Returns:
+            Этот же объект (для цепочек вызовов)
+        """
+        keys = self.counts.index.union(other.counts.index)
+        counts = self.counts.reindex(keys, fill_value=self.floor) + other.counts.reindex(keys, fill_value=other.floor)
+        errors = (self.errors.reindex(keys, fill_value=self.floor)
+                  + other.errors.reindex(keys, fill_value=other.floor))
+        self.counts, self.errors = counts, errors
+        self._truncate(self.floor + other.floor)
+        return self
+
+    def top(self, n: int = 10) -> pd.DataFrame:
+        """
+        Возвращает крупнейших продавцов.
+
+        Args:
+            n: Число продавцов
+
+        Returns:
+            DataFrame: merchant, spend (оценка сверху), error
+        """
+        order = self.counts.sort_values(ascending=False, kind='stable').index[:n]
+        return pd.DataFrame({
+            'merchant': order.to_numpy(dtype=object),
+            'spend': self.counts.loc[order].round(2).to_numpy(),
+            'error': self.errors.loc[order].round(2).to_numpy(),
+        })
+
+
+class SpendSketches:
+    """
+    Набор скетчей трат за период: процентили сумм по категориям (KLL),
+    число различных продавцов и карт (HyperLogLog), суммы по продавцам
+    (Count-Min) и крупнейшие продавцы (Space-Saving). Продавец - описание операции.
+    Источники (sources) - выгрузки, уже учтенные в скетчах.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.sources: Set[str] = set()
+        self.categories: Dict[str, KLLSketch] = {}
+        self.merchants = HyperLogLog()
+        self.cards = HyperLogLog()
+        self.merchant_spend = CountMinSketch()
+        self.top_merchants = SpaceSaving()
+
+    def update(self, chunk: pd.DataFrame) -> 'SpendSketches':
+        """
+        Добавляет траты (amount < 0) из части данных.
+
+        Args:
+            chunk: DataFrame с транзакциями
+
+        Returns:
+            Этот же объект (для цепочек вызовов)
+        """
+        spending = chunk[chunk['amount'] < 0]
+        if spending.empty:
+            return self
+        spent = -spending['amount'].to_numpy(dtype='float64')
+        self.count += len(spent)
+        self.total += float(spent.sum())
+
+        categories = spending['category'].fillna('').astype(str) if 'category' in spending.columns else None
+        if categories is not None:
+            for category, positions in categories.groupby(categories.to_numpy()).indices.items():
+                self.categories.setdefault(category, KLLSketch()).update(spent[positions])
+        # Для HyperLogLog повторы не важны: хешируются только уникальные значения
+        if 'card_last_digits' in spending.columns:
+            self.cards.update(spending['card_last_digits'].unique())
+        if 'description' in spending.columns:
+            by_merchant = pd.Series(spent).groupby(spending['description'].to_numpy()).sum()
+            keys = by_merchant.index.to_numpy(dtype=object)
+            self.merchants.update(keys)
+            self.merchant_spend.update(keys, by_merchant.to_numpy())
+            self.top_merchants.update(keys, by_merchant.to_numpy())
+        return self
+
+    def merge(self, other: 'SpendSketches') -> 'SpendSketches':
+        """
+        Объединяет со скетчами другого периода.
+
+        Args:
+            other: Скетчи другого периода
+
+        Returns:
+            Этот же объект (для цепочек вызовов)
+        """
+        self.count += other.count
+        self.total += other.total
+        self.sources |= other.sources
+        for category, sketch in other.categories.items():
+            self.categories.setdefault(category, KLLSketch()).merge(sketch)
+        self.merchants.merge(other.merchants)
+        self.cards.merge(other.cards)
+        self.merchant_spend.merge(other.merchant_spend)
+        self.top_merchants.merge(other.top_merchants)
+        return self
+
+    def save(self, path: str) -> None:
+        """
+        Сохраняет скетчи в файл .npz (без pickle).
+
+        Args:
+            path: Путь к файлу
+
+        Returns:
+            None
+        """
+        categories = sorted(self.categories)
+        meta = {
+            'count': self.count,
+            'total': self.total,
+            'categories': [
+                {'name': name, 'count': self.categories[name].count, 'min': self.categories[name].min,
+                 'max': self.categories[name].max, 'levels': [len(items) for items in self.categories[name].levels]}
+                for name in categories
+            ],
+            'top_floor': self.top_merchants.floor,
+            'sources': sorted(self.sources),
+        }
+        arrays = {
+            'meta': np.array(json.dumps(meta, ensure_ascii=False)),
+            'merchants': self.merchants.registers,
+            'cards': self.cards.registers,
+            'merchant_spend': self.merchant_spend.table,
+            'top_keys': self.top_merchants.counts.index.to_numpy(dtype=str),
+            'top_counts': self.top_merchants.counts.to_numpy(dtype='float64'),
+            'top_errors': self.top_merchants.errors.to_numpy(dtype='float64'),
+        }
+        # Уровни всех скетчей KLL хранятся одним массивом, длины уровней - в meta
+        levels = [items for name in categories for items in self.categories[name].levels]
+        arrays['kll_items'] = np.concatenate(levels) if levels else np.empty(0)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'SpendSketches':
+        """
+        Загружает скетчи из файла .npz.
+
+        Args:
+            path: Путь к файлу
+
+        Returns:
+            SpendSketches
+        """
+        sketches = cls()
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            sketches.count = meta['count']
+            sketches.total = meta['total']
+            sketches.sources = set(meta.get('sources', []))
+            lengths = [length for entry in meta['categories'] for length in entry['levels']]
+            levels = iter(np.split(data['kll_items'], np.cumsum(lengths)[:-1]) if lengths else [])
+            for entry in meta['categories']:
+                sketch = KLLSketch()
+                sketch.levels = [next(levels) for _ in entry['levels']]
+                sketch.count, sketch.min, sketch.max = entry['count'], entry['min'], entry['max']
+                sketches.categories[entry['name']] = sketch
+            sketches.merchants.registers = data['merchants'].copy()
+            sketches.cards.registers = data['cards'].copy()
+            sketches.merchant_spend.table = data['merchant_spend'].copy()
+            keys = data['top_keys'].astype(object)
+            sketches.top_merchants.counts = pd.Series(data['top_counts'], index=keys)
+            sketches.top_merchants.errors = pd.Series(data['top_errors'], index=keys)
+            sketches.top_merchants.floor = meta['top_floor']
+        return sketches
+
+    def summary(self, quantiles: Sequence[float] = (0.5, 0.9, 0.99), top_n: int = 10) -> Dict[str, Any]:
+        """
+        Формирует приближенную сводку трат.
+
+        Args:
+            quantiles: Процентили сумм трат по категориям
+            top_n: Число крупнейших продавцов
+
+        Returns:
+            Словарь: transactions, total_spent, distinct_merchants, distinct_cards,
+            percentiles (DataFrame категория × процентиль), top_merchants (DataFrame)
+        """
+        percentiles = pd.DataFrame(
+            [sketch.quantiles(quantiles) for sketch in self.categories.values()],
+            index=pd.Index(list(self.categories), name='category'),
+            columns=[f'p{round(q * 100):g}' for q in quantiles],
+        ).sort_index().round(2)
+        return {
+            'transactions': self.count,
+            'total_spent': round(self.total, 2),
+            'distinct_merchants': self.merchants.estimate(),
+            'distinct_cards': self.cards.estimate(),
+            'percentiles': percentiles,
+            'top_merchants': self.top_merchants.top(top_n),
+        }
+
+
+@timed()
+def build_monthly_sketches(chunks: Iterable[pd.DataFrame]) -> Dict[str, SpendSketches]:
+    """
+    Строит скетчи по месяцам за один проход по частям данных
+    (например, iter_transactions или результату load_transactions).
+
+    Args:
+        chunks: Части DataFrame с транзакциями
+
+    Returns:
+        Словарь 'YYYY-MM' -> SpendSketches
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    months: Dict[str, SpendSketches] = {}
+    for chunk in chunks:
+        chunk = chunk[chunk['date'].notna()]
+        if chunk.empty:
+            continue
+        labels = chunk['date'].to_numpy(dtype='datetime64[ns]').astype('datetime64[M]')
+        for month, part in chunk.groupby(labels):
+            months.setdefault(str(np.datetime64(month, 'M')), SpendSketches()).update(part)
+    logger.info(f"Скетчи построены: {len(months)} месяцев")
+    return months
+
+
+def save_monthly_sketches(months: Dict[str, SpendSketches], directory: str, source: Optional[str] = None,
+                          merge: bool = False) -> None:
+    """
+    Сохраняет скетчи месяцев в каталог (файл на месяц). По умолчанию файл месяца
+    перезаписывается. С merge=True скетч объединяется с уже сохраненным, чтобы
+    дополнить каталог данными другой выгрузки: месяц, в котором выгрузка source
+    уже учтена, пропускается (скетчи нельзя вычесть, повторное объединение
+    посчитало бы операции дважды).
+
+    Args:
+        months: Результат build_monthly_sketches
+        directory: Каталог скетчей
+        source: Имя выгрузки, по которой построены скетчи
+        merge: Объединять с уже сохраненными скетчами месяцев
+
+    Returns:
+        None
+    """
+    os.makedirs(directory, exist_ok=True)
+    saved = 0
+    for month, sketches in months.items():
+        path = os.path.join(directory, f"{month}{SKETCH_EXTENSION}")
+        if source is not None:
+            sketches.sources.add(source)
+        if merge and os.path.exists(path):
+            existing = SpendSketches.load(path)
+            if source is not None and source in existing.sources:
+                logger.warning(f"Выгрузка {source} уже учтена в скетчах {month}, месяц пропущен")
+                continue
+            sketches = existing.merge(sketches)
+        sketches.save(path)
+        saved += 1
+    logger.info(f"Скетчи сохранены: {os.path.abspath(directory)}. Месяцев: {saved}")
+
+
+@timed()
+def load_sketches(directory: str, start_month: Optional[str] = None,
+                  end_month: Optional[str] = None) -> SpendSketches:
+    """
+    Загружает и объединяет скетчи месяцев из диапазона (границы включительно).
+
+    Args:
+        directory: Каталог скетчей
+        start_month: Первый месяц 'YYYY-MM'
+        end_month: Последний месяц 'YYYY-MM'
+
+    Returns:
+        SpendSketches за период
+    """
+    merged = SpendSketches()
+    for name in sorted(os.listdir(directory)):
+        month, extension = os.path.splitext(name)
+        if extension != SKETCH_EXTENSION:
+            continue
+        if (start_month and month < start_month) or (end_month and month > end_month):
+            continue
+        merged.merge(SpendSketches.load(os.path.join(directory, name)))
+    return merged
@@ -0,0 +1,166 @@
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Union
+
+import pandas as pd
+
+from src.profiling import timed
+
+logger = logging.getLogger(__name__)
+
+# Допустимые ключи разбивки рядов
+SERIES_KEYS = ('category', 'card_last_digits', 'mcc')
+
+# Частоты агрегирования: день, неделя (с понедельника), месяц
+FREQUENCIES = {'D': 'D', 'W': 'W-SUN', 'M': 'MS'}
+
+TOTAL_KEY = 'total'
+
+# Столбец трат без значения ключа разбивки (нет категории, карты или MCC)
+MISSING_KEY = 'Не указано'
+
+
+@timed()
+def daily_spend_matrix(
+        transactions: pd.DataFrame,
+        key: Optional[str] = None,
+        start_date: Optional[Union[str, datetime]] = None,
+        end_date: Optional[Union[str, datetime]] = None
+) -> pd.DataFrame:
+    """
+    Строит плотную матрицу трат «день × ключ» за один проход по данным.
+    Дни без трат заполняются нулями, суммы трат положительные. Траты без значения
+    ключа попадают в столбец MISSING_KEY, поэтому сумма столбцов равна общей сумме.
+
+    Args:
+        transactions: DataFrame с транзакциями
+        key: Столбец разбивки ('category', 'card_last_digits', 'mcc') или None для общей суммы
+        start_date: Первый день матрицы (по умолчанию - день первой траты)
+        end_date: Последний день матрицы (по умолчанию - день последней траты)
+
+    Returns:
+        DataFrame: индекс - дни, столбцы - значения ключа (или 'total')
+    """
+    if key is not None and key not in SERIES_KEYS:
+        raise ValueError(f"Неизвестный ключ разбивки: {key}. Доступны: {', '.join(SERIES_KEYS)}")
+
+    spending = transactions[transactions['amount'] < 0]
+    days = spending['date'].dt.normalize()
+    if key is None:
+        matrix = (-spending['amount']).groupby(days).sum().to_frame(TOTAL_KEY)
+    else:
+        keys = spending[key]
+        if keys.hasnans:
+            keys = keys.astype(object).fillna(MISSING_KEY)
+        matrix = (-spending['amount']).groupby([days, keys]).sum().unstack(fill_value=0.0)
+    matrix.index.name = 'date'
+    matrix.columns.name = key or TOTAL_KEY
+
+    first = pd.Timestamp(start_date).normalize() if start_date is not None else (
+        matrix.index.min() if not matrix.empty else None)
+    last = pd.Timestamp(end_date).normalize() if end_date is not None else (
+        matrix.index.max() if not matrix.empty else None)
+    if first is None or last is None:
+        return matrix.iloc[0:0]
+
+    full_range = pd.date_range(first, last, freq='D', name='date')
+    matrix = matrix.reindex(full_range, fill_value=0.0)
+    logger.info(f"Матрица трат: {matrix.shape[0]} дней × {matrix.shape[1]} ключей")
+    return matrix
+
+
+def spend_series(matrix: pd.DataFrame, freq: str = 'D') -> pd.DataFrame:
+    """
+    Агрегирует дневную матрицу трат до недель или месяцев.
+
+    Args:
+        matrix: Результат daily_spend_matrix
+        freq: 'D' - по дням, 'W' - по неделям (с понедельника), 'M' - по месяцам
+
+    Returns:
+        DataFrame: индекс - начало периода, столбцы - ключи
+    """
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Неизвестная частота: {freq}. Доступны: {', '.join(FREQUENCIES)}")
+    if freq == 'D':
+        return matrix
+    series = matrix.resample(FREQUENCIES[freq]).sum()
+    if freq == 'W':
+        # Метка недели - понедельник, а не воскресенье
+        series.index = series.index - pd.Timedelta(days=6)
+    series.index.name = 'date'
+    return series
+
+
+@timed()
+def rolling_stats(
+        matrix: pd.DataFrame,
+        windows: Iterable[int] = (7, 30, 90),
+        percentiles: Iterable[float] = (0.5, 0.9),
+        min_periods: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Считает скользящие суммы, средние и перцентили дневных трат
+    сразу для всех дат и всех ключей.
+
+    Args:
+        matrix: Дневная матрица трат (daily_spend_matrix)
+        windows: Размеры окон в днях
+        percentiles: Перцентили дневных трат в окне (доли от 0 до 1)
+        min_periods: Минимум дней в окне (по умолчанию - окно целиком)
+
+    Returns:
+        DataFrame в длинном формате: date, key, window, sum, mean, p50, p90, ...
+    """
+    frames = []
+    key_name = matrix.columns.name or 'key'
+    for window in windows:
+        rolling = matrix.rolling(window, min_periods=min_periods or window)
+        stats: Dict[str, pd.DataFrame] = {
+            'sum': rolling.sum(),
+            'mean': rolling.mean(),
+        }
+        for q in percentiles:
+            stats[f'p{int(round(q * 100))}'] = rolling.quantile(q)
+
+        stacked = pd.concat(
+            {name: frame.stack(future_stack=True) for name, frame in stats.items()}, axis=1
+        )
+        stacked.index.names = ['date', 'key']
+        frames.append(stacked.reset_index().assign(window=window))
+
+    if not frames:
+        return pd.DataFrame(columns=['date', 'key', 'window'])
+
+    result = pd.concat(frames, ignore_index=True)
+    columns = ['date', 'key', 'window'] + [col for col in result.columns if col not in ('date', 'key', 'window')]
+    logger.debug(f"Скользящие показатели по ключу '{key_name}': {len(result)} строк")
+    return result[columns]
+
+
+def spending_trends(
+        transactions: pd.DataFrame,
+        key: Optional[str] = None,
+        freq: str = 'D',
+        windows: Iterable[int] = (7, 30, 90),
+        percentiles: Iterable[float] = (0.5, 0.9)
+) -> Dict[str, pd.DataFrame]:
+    """
+    Готовит данные для графиков трендов: ряд трат нужной частоты
+    и скользящие показатели по дням для всей истории.
+
+    Args:
+        transactions: DataFrame с транзакциями
+        key: Столбец разбивки или None для общей суммы
+        freq: Частота ряда ('D', 'W', 'M')
+        windows: Размеры окон в днях
+        percentiles: Перцентили дневных трат в окне
+
+    Returns:
+        Словарь с ключами 'series' и 'rolling'
+    """
+    matrix = daily_spend_matrix(transactions, key)
+    return {
+        'series': spend_series(matrix, freq),
+        'rolling': rolling_stats(matrix, windows, percentiles),
+    }
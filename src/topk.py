@@ -0,0 +1,170 @@
+import heapq
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Столбцы транзакции, попадающие в топ
+TOP_COLUMNS = ['date', 'amount', 'category', 'description']
+
+# Способы ранжирования транзакций
+RANKINGS = ('spend', 'income', 'amount')
+
+
+def ranking_scores(amounts: Union[pd.Series, np.ndarray], ranking: str = 'spend') -> np.ndarray:
+    """
+    Считает оценку транзакций для ранжирования.
+    Неподходящие транзакции (например, доходы при ранжировании трат) получают NaN.
+
+    Args:
+        amounts: Суммы операций (траты отрицательные)
+        ranking: 'spend' - крупнейшие траты по модулю, 'income' - крупнейшие
+            поступления, 'amount' - наибольшие суммы со знаком
+
+    Returns:
+        Массив оценок (чем больше, тем выше в топе)
+    """
+    values = pd.to_numeric(pd.Series(amounts), errors='coerce').to_numpy(dtype='float64')
+    if ranking == 'spend':
+        return np.where(values < 0, -values, np.nan)
+    if ranking == 'income':
+        return np.where(values > 0, values, np.nan)
+    if ranking == 'amount':
+        return values
+    raise ValueError(f"Неизвестный способ ранжирования: {ranking}. Доступны: {', '.join(RANKINGS)}")
+
+
+class TopK:
+    """
+    Потоковый топ-K транзакций на ограниченной куче.
+
+    Обрабатывает данные частями (update), хранит не более k записей на группу
+    и объединяется с топами из других частей или процессов (merge).
+    При равной оценке выше стоит транзакция, встреченная раньше.
+    """
+
+    def __init__(self, k: int = 5, ranking: str = 'spend', by: Optional[str] = None,
+                 columns: Optional[List[str]] = None) -> None:
+        """
+        Args:
+            k: Размер топа
+            ranking: Способ ранжирования ('spend', 'income', 'amount')
+            by: Столбец для отдельного топа по группам (например, 'category')
+            columns: Столбцы транзакции в результате (по умолчанию TOP_COLUMNS)
+        """
+        if ranking not in RANKINGS:
+            raise ValueError(f"Неизвестный способ ранжирования: {ranking}. Доступны: {', '.join(RANKINGS)}")
+        self.k = k
+        self.ranking = ranking
+        self.by = by
+        self.columns = columns or TOP_COLUMNS
+        self._heaps: Dict[Any, List[Tuple[float, int, Dict[str, Any]]]] = {}
+        self._seen = 0
+
+    def _push(self, group: Any, score: float, record: Dict[str, Any]) -> None:
+        """Добавляет запись в кучу группы, вытесняя наименьшую при переполнении."""
+        heap = self._heaps.setdefault(group, [])
+        # Минимальная куча: при равной оценке первой вытесняется более поздняя запись
+        entry = (score, -self._seen, record)
+        self._seen += 1
+        if len(heap) < self.k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+    def update(self, chunk: pd.DataFrame) -> 'TopK':
+        """
+        Учитывает очередную часть транзакций.
+        Кандидаты отбираются векторно, в кучу попадает не более k строк на группу.
+
+        Args:
+            chunk: DataFrame с транзакциями
+
+        Returns:
+            Этот же объект (для цепочек вызовов)
+        """
+        if chunk.empty or 'amount' not in chunk.columns or self.k <= 0:
+            return self
+
+        scores = ranking_scores(chunk['amount'], self.ranking)
+        eligible = ~np.isnan(scores)
+        if not eligible.any():
+            return self
+
+        columns = [col for col in self.columns if col in chunk.columns]
+        if self.by is not None and self.by not in columns:
+            columns.append(self.by)
+        candidates = chunk.loc[eligible, columns].assign(_score=scores[eligible])
+        candidates = candidates.sort_values('_score', ascending=False, kind='stable')
+        if self.by is None:
+            candidates = candidates.head(self.k)
+            groups = [None] * len(candidates)
+        else:
+            candidates = candidates.groupby(self.by, sort=False, dropna=False).head(self.k)
+            groups = [None if pd.isna(group) else group for group in candidates[self.by].tolist()]
+
+        for group, score, record in zip(groups, candidates['_score'].tolist(),
+                                        candidates[[col for col in self.columns if col in columns]]
+                                        .to_dict('records')):
+            self._push(group, score, record)
+        return self
+
+    def merge(self, other: 'TopK') -> 'TopK':
+        """
+        Объединяет с топом, посчитанным по другой части данных.
+        При равных оценках выше остаются записи этого объекта.
+
+        Args:
+            other: TopK с теми же k, ranking и by
+
+        Returns:
+            Этот же объект
+        """
+        if (other.k, other.ranking, other.by) != (self.k, self.ranking, self.by):
+            raise ValueError("Объединять можно только топы с одинаковыми параметрами")
+        for group, heap in other._heaps.items():
+            for score, _, record in sorted(heap, reverse=True):
+                self._push(group, score, record)
+        return self
+
+    def _ordered(self, heap: List[Tuple[float, int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Возвращает записи кучи по убыванию оценки."""
+        return [dict(record) for _, _, record in sorted(heap, key=lambda e: e[:2], reverse=True)]
+
+    def result(self) -> Union[List[Dict[str, Any]], Dict[Any, List[Dict[str, Any]]]]:
+        """
+        Возвращает топ транзакций.
+
+        Returns:
+            Список записей по убыванию оценки или, если задан by,
+            словарь группа -> список записей
+        """
+        if self.by is None:
+            return self._ordered(self._heaps.get(None, []))
+        return {group: self._ordered(heap) for group, heap in self._heaps.items()}
+
+
+def top_transactions(chunks: Union[pd.DataFrame, Iterable[pd.DataFrame]], k: int = 5, ranking: str = 'spend',
+                     by: Optional[str] = None) -> Union[List[Dict[str, Any]], Dict[Any, List[Dict[str, Any]]]]:
+    """
+    Считает топ-K транзакций по DataFrame или потоку его частей
+    (например, iter_transactions(file_path)).
+
+    Args:
+        chunks: DataFrame или итерируемый набор DataFrame
+        k: Размер топа
+        ranking: Способ ранжирования ('spend', 'income', 'amount')
+        by: Столбец для отдельного топа по группам
+
+    Returns:
+        Список записей или словарь группа -> список записей
+    """
+    top = TopK(k, ranking, by)
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    for chunk in chunks:
+        top.update(chunk)
+    return top.result()
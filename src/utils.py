@@ -2,9 +2,24 @@ import pandas as pd
 from datetime import datetime, timedelta
 import logging
 from logging.handlers import RotatingFileHandler
-from typing import Union, List, Dict, Any, Tuple
+from typing import Union, List, Dict, Any, Tuple, Optional, Iterator, Iterable
 import json
 import re
+import glob
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from openpyxl import load_workbook
+from src.profiling import measure, timed
+from src.dataset import DATASET_EXTENSIONS, open_dataset, write_dataset
+from src.merchants import normalize_merchants
+from src.rollups import Rollups, rollups_path
+from src.validation import (
+    MAX_INVALID_SHARE,
+    format_quality_report,
+    validate_transactions,
+    write_quarantine
+)
 
 
 def setup_logging() -> None:
@@ -32,60 +47,268 @@ def setup_logging() -> None:
 
 setup_logging()
 
+# Соответствие столбцов выгрузки Тинькофф внутренним именам
+COLUMN_MAPPING = {
+    'Дата операции': 'date',
+    'Дата платежа': 'payment_date',
+    'Номер карты': 'card_last_digits',
+    'Статус': 'status',
+    'Сумма операции': 'amount',
+    'Валюта операции': 'currency',
+    'Сумма платежа': 'payment_amount',
+    'Валюта платежа': 'payment_currency',
+    'Кэшбэк': 'cashback',
+    'Категория': 'category',
+    'MCC': 'mcc',
+    'Описание': 'description',
+    'Бонусы (включая кэшбэк)': 'bonuses',
+    'Округление на инвесткопилку': 'rounding',
+    'Сумма операции с округлением': 'rounded_amount'
+}
+
+# Денежные столбцы (внутренние имена) и форматы дат выгрузки
+AMOUNT_COLUMNS = ['amount', 'payment_amount', 'cashback', 'bonuses', 'rounding', 'rounded_amount']
+OPERATION_DATE_FORMAT = '%d.%m.%Y %H:%M:%S'
+PAYMENT_DATE_FORMAT = '%d.%m.%Y'
+
+try:
+    import python_calamine  # noqa: F401
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    PYARROW_CSV_AVAILABLE = True
+except ImportError:
+    pa = pc = pa_csv = None
+    PYARROW_CSV_AVAILABLE = False
+
+
+# Параметры чтения CSV выгрузки Тинькофф (формат даты задан явно, без угадывания)
+CSV_READ_OPTIONS: Dict[str, Any] = {
+    'decimal': ',',
+    'thousands': ' ',
+    'parse_dates': ['Дата операции'],
+    'date_format': {'Дата операции': OPERATION_DATE_FORMAT}
+}
+
+# Столбцы выгрузки с датами и суммами для типизированного чтения CSV
+CSV_DATE_FORMATS = {'Дата операции': OPERATION_DATE_FORMAT, 'Дата платежа': PAYMENT_DATE_FORMAT}
+CSV_AMOUNT_COLUMNS = [col for col, name in COLUMN_MAPPING.items() if name in AMOUNT_COLUMNS]
+
+
+def normalize_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Приводит прочитанную выгрузку к внутренней схеме: переименовывает столбцы
+    по COLUMN_MAPPING, разбирает даты, не разобранные при чтении, и преобразует
+    денежные столбцы в числа.
+
+    Args:
+        df: DataFrame в формате выгрузки
+
+    Returns:
+        Тот же DataFrame с внутренними именами столбцов
+    """
+    # Переименовываем только те столбцы, которые есть в файле
+    existing_columns = [col for col in COLUMN_MAPPING.keys() if col in df.columns]
+    df.rename(columns={col: COLUMN_MAPPING[col] for col in existing_columns}, inplace=True)
+
+    # Даты и денежные столбцы, не разобранные при чтении, приводятся векторно
+    for col, date_format in (('date', OPERATION_DATE_FORMAT), ('payment_date', PAYMENT_DATE_FORMAT)):
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = parse_dates(df[col], date_format)
+    for col in AMOUNT_COLUMNS:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = parse_amounts(df[col])
+    return df
+
+
+def parse_amounts(values: pd.Series) -> pd.Series:
+    """
+    Разбирает суммы, записанные текстом ('-1 234,56'), в числа.
+    Нераспознанные значения становятся NaN.
+
+    Args:
+        values: Столбец сумм
+
+    Returns:
+        Series с float64
+    """
+    text = values.where(values.isna(), values.astype(str))
+    text = text.str.replace(r'[\s\u00a0]', '', regex=True).str.replace(',', '.', regex=False)
+    return pd.to_numeric(text, errors='coerce').astype('float64')
+
+
+def parse_dates(values: pd.Series, date_format: str) -> pd.Series:
+    """
+    Разбирает даты по известному формату выгрузки. Значения в другом виде
+    (без секунд, без времени, ISO) разбираются повторно с dayfirst,
+    нераспознанные становятся NaT.
+
+    Args:
+        values: Столбец дат (текст или datetime)
+        date_format: Формат даты выгрузки
 
-def load_transactions(file_path: str) -> pd.DataFrame:
+    Returns:
+        Series с datetime64
+    """
+    parsed = pd.to_datetime(values, format=date_format, errors='coerce')
+    rest = parsed.isna().to_numpy() & values.notna().to_numpy()
+    if rest.any():
+        parsed[rest] = pd.to_datetime(values[rest], dayfirst=True, format='mixed', errors='coerce')
+    return parsed
+
+
+def _arrow_amounts(column: Any) -> Any:
+    """
+    Разбирает текстовые суммы столбца Arrow в float64 векторно (pyarrow.compute).
+
+    Args:
+        column: Столбец pyarrow со строками
+
+    Returns:
+        Столбец pyarrow float64 (или None, если в столбце есть нераспознанные значения)
+    """
+    text = pc.replace_substring_regex(column, pattern=r'[\s\x{00a0}]', replacement='')
+    text = pc.replace_substring(text, pattern=',', replacement='.')
+    try:
+        return pc.cast(text, pa.float64())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return None
+
+
+def read_csv_fast(file_path: str) -> pd.DataFrame:
+    """
+    Читает CSV выгрузку многопоточным парсером pyarrow с известными форматами:
+    даты разбираются по OPERATION_DATE_FORMAT и PAYMENT_DATE_FORMAT, все денежные
+    столбцы сразу становятся float64. Без pyarrow или при ошибке разбора
+    используется pd.read_csv с CSV_READ_OPTIONS.
+
+    Args:
+        file_path: Путь к CSV файлу
+
+    Returns:
+        DataFrame с транзакциями (имена столбцов как в выгрузке)
+    """
+    if not PYARROW_CSV_AVAILABLE:
+        return pd.read_csv(file_path, **CSV_READ_OPTIONS)
+
+    # Сначала суммы разбираются прямо парсером (десятичная запятая); если в них
+    # встречаются пробелы-разделители или мусор, читаем их текстом и чистим векторно
+    text_columns = list(CSV_DATE_FORMATS) + ['MCC', 'Номер карты']
+    table = None
+    for amount_type in (pa.float64(), pa.string()):
+        types = {col: pa.string() for col in text_columns}
+        types.update({col: amount_type for col in CSV_AMOUNT_COLUMNS})
+        try:
+            table = pa_csv.read_csv(file_path, convert_options=pa_csv.ConvertOptions(
+                column_types=types, decimal_point=',', strings_can_be_null=True,
+            ))
+            break
+        except pa.ArrowInvalid as e:
+            error = e
+        except UnicodeDecodeError as e:
+            error = e
+            break
+    if table is None:
+        logging.getLogger(__name__).warning(f"pyarrow не разобрал {file_path} ({error}), чтение через pandas")
+        return pd.read_csv(file_path, **CSV_READ_OPTIONS)
+
+    columns = {}
+    fallback = {}
+    for name in table.column_names:
+        column = table.column(name)
+        if name in CSV_DATE_FORMATS:
+            parsed = pc.strptime(column, format=CSV_DATE_FORMATS[name], unit='ns', error_is_null=True)
+            if parsed.null_count > column.null_count:
+                # Даты в другом виде (например, без секунд) разбираются через pandas
+                fallback[name] = column
+            column = parsed
+        elif name in CSV_AMOUNT_COLUMNS and not pa.types.is_floating(column.type):
+            # Нераспознанные суммы остаются текстом и разбираются при проверке качества
+            column = _arrow_amounts(column) or column
+        elif name == 'MCC':
+            column = _arrow_amounts(column) or column
+        columns[name] = column
+    df = pa.table(columns).to_pandas()
+    for name, column in fallback.items():
+        df[name] = parse_dates(column.to_pandas(), CSV_DATE_FORMATS[name])
+    return df
+
+
+@timed()
+def load_transactions(
+        file_path: str,
+        exclude_statuses: Iterable[str] = (),
+        drop_duplicates: bool = False,
+        quarantine_path: Optional[str] = None,
+        max_invalid_share: float = MAX_INVALID_SHARE,
+        categorize: bool = False,
+        validate: bool = False
+) -> pd.DataFrame:
     """
     Загружает транзакции из Excel или CSV файла.
+    По умолчанию строки с нераспознанной датой или суммой остаются в результате
+    (NaT/NaN), как и при чтении частями (iter_transactions). С validate=True
+    (или при любом параметре карантина) выгрузка проходит проверку качества
+    (src.validation): без обязательных столбцов или с большой долей
+    нераспознанных дат и сумм она отклоняется сразу, а строки с ошибками
+    уходят в карантин. Отчет о качестве доступен в df.attrs['quality_report'].
 
     Args:
         file_path: Путь к файлу с транзакциями
+        exclude_statuses: Статусы операций, помещаемых в карантин (например, ['FAILED'])
+        drop_duplicates: Помещать ли в карантин полные повторы строк
+        quarantine_path: CSV файл для строк из карантина
+        max_invalid_share: Допустимая доля строк с нераспознанной датой или суммой
+        categorize: Добавить продавца и заполнить пропущенные категории (src.merchants)
+        validate: Проверять качество выгрузки и помещать строки с ошибками в карантин
 
     Returns:
         DataFrame с загруженными транзакциями
+
+    Raises:
+        DataQualityError: Если выгрузка не прошла проверку (только при проверке)
     """
     logger = logging.getLogger(__name__)
     logger.info(f"Загрузка файла: {file_path}")
 
     try:
-        if file_path.endswith('.xlsx'):
-            df = pd.read_excel(file_path, engine='openpyxl')
-        elif file_path.endswith('.csv'):
-            # Указываем явно параметры для CSV
-            df = pd.read_csv(
-                file_path,
-                decimal=',',
-                thousands=' ',
-                parse_dates=['Дата операции'],
-                dayfirst=True
-            )
-        else:
-            raise ValueError("Поддерживаются только .xlsx или .csv")
-
-        column_mapping = {
-            'Дата операции': 'date',
-            'Дата платежа': 'payment_date',
-            'Номер карты': 'card_last_digits',
-            'Статус': 'status',
-            'Сумма операции': 'amount',
-            'Валюта операции': 'currency',
-            'Сумма платежа': 'payment_amount',
-            'Валюта платежа': 'payment_currency',
-            'Кэшбэк': 'cashback',
-            'Категория': 'category',
-            'MCC': 'mcc',
-            'Описание': 'description',
-            'Бонусы (включая кэшбэк)': 'bonuses',
-            'Округление на инвесткопилку': 'rounding',
-            'Сумма операции с округлением': 'rounded_amount'
-        }
-
-        # Переименовываем только те столбцы, которые есть в файле
-        existing_columns = [col for col in column_mapping.keys() if col in df.columns]
-        df.rename(columns={col: column_mapping[col] for col in existing_columns}, inplace=True)
-
-        # Преобразуем amount в числовой формат
-        if 'amount' in df.columns:
-            df['amount'] = pd.to_numeric(df['amount'].astype(str).str.replace(',', '.'), errors='coerce')
+        with measure('load_transactions.read') as stage:
+            if file_path.endswith('.xlsx'):
+                df = read_xlsx_fast(file_path)
+            elif file_path.endswith('.csv'):
+                # Явные форматы дат и сумм, многопоточный разбор pyarrow
+                df = read_csv_fast(file_path)
+            elif file_path.endswith(DATASET_EXTENSIONS):
+                # Уже нормализованный набор данных Arrow, открывается через memory map
+                df = open_dataset(file_path).to_pandas()
+            else:
+                raise ValueError("Поддерживаются только .xlsx или .csv")
+            stage['rows'] = len(df)
+
+        with measure('load_transactions.normalize') as stage:
+            df = normalize_transactions(df)
+            stage['rows'] = len(df)
+
+        exclude_statuses = list(exclude_statuses)
+        if validate or exclude_statuses or drop_duplicates or quarantine_path:
+            with measure('load_transactions.validate') as stage:
+                df, quarantined, report = validate_transactions(
+                    df, max_invalid_share, exclude_statuses, drop_duplicates,
+                    numeric_columns=AMOUNT_COLUMNS, date_format=OPERATION_DATE_FORMAT
+                )
+                if quarantine_path and not quarantined.empty:
+                    write_quarantine(quarantined, quarantine_path)
+                df.attrs['quality_report'] = report
+                stage['rows'] = report['rows']
+            logger.info(f"Проверка качества {file_path}: {format_quality_report(report)}")
+
+        if categorize:
+            df = normalize_merchants(df)
 
         logger.info(f"Загружено {len(df)} транзакций")
         return df
@@ -95,6 +318,250 @@ def load_transactions(file_path: str) -> pd.DataFrame:
         raise
 
 
+def save_dataset(file_path: str, dataset_path: str) -> None:
+    """
+    Загружает выгрузку и сохраняет её как набор данных Arrow IPC
+    для быстрого совместного открытия несколькими процессами.
+    Рядом сохраняются предрасчитанные таблицы (src.rollups), из которых
+    отчёты по набору данных считаются без обхода всех операций.
+
+    Args:
+        file_path: Путь к выгрузке (.csv или .xlsx)
+        dataset_path: Путь к набору данных (.arrow или .feather)
+
+    Returns:
+        None
+    """
+    df = load_transactions(file_path)
+    write_dataset(df, dataset_path)
+    Rollups.from_transactions(df).save(rollups_path(dataset_path), dataset_path)
+
+
+def iter_transactions(file_path: str, chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+    """
+    Читает CSV выгрузку частями, не загружая весь файл в память.
+    Каждая часть приводится к внутренней схеме так же, как в load_transactions.
+    XLSX файлы читаются целиком и отдаются одной частью.
+
+    Args:
+        file_path: Путь к файлу с транзакциями
+        chunksize: Число строк в одной части
+
+    Returns:
+        Итератор DataFrame с транзакциями
+    """
+    if file_path.endswith('.xlsx'):
+        yield load_transactions(file_path)
+        return
+    if not file_path.endswith('.csv'):
+        raise ValueError("Поддерживаются только .xlsx или .csv")
+
+    with pd.read_csv(file_path, chunksize=chunksize, **CSV_READ_OPTIONS) as reader:
+        for chunk in reader:
+            yield normalize_transactions(chunk)
+
+
+def _xlsx_dates(series: pd.Series, name: str) -> pd.Series:
+    """
+    Приводит столбец дат XLSX к datetime64: числа - даты Excel,
+    текст - по формату выгрузки с разбором других видов дат.
+
+    Args:
+        series: Значения столбца (числа, текст или datetime)
+        name: Внутреннее имя столбца ('date' или 'payment_date')
+
+    Returns:
+        Series с datetime64
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    # Excel хранит даты как число дней от 1899-12-30
+    serial = pd.to_numeric(series, errors='coerce')
+    dates = pd.to_datetime(serial, unit='D', origin='1899-12-30').dt.round('s')
+    text = serial.isna().to_numpy()
+    if text.any():
+        date_format = OPERATION_DATE_FORMAT if name == 'date' else PAYMENT_DATE_FORMAT
+        dates = dates.where(~text, parse_dates(series[text], date_format))
+    return dates
+
+
+def _type_xlsx_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Переименовывает столбцы прочитанного XLSX по COLUMN_MAPPING и приводит
+    даты и суммы к единым типам (одинаково для calamine и openpyxl).
+
+    Args:
+        df: DataFrame с именами столбцов как в выгрузке
+
+    Returns:
+        DataFrame с внутренними именами столбцов
+    """
+    df = df.rename(columns={col: COLUMN_MAPPING[col] for col in df.columns if col in COLUMN_MAPPING})
+    for name in ('date', 'payment_date'):
+        if name in df.columns:
+            df[name] = _xlsx_dates(df[name], name)
+    for name in AMOUNT_COLUMNS:
+        if name in df.columns and not pd.api.types.is_numeric_dtype(df[name]):
+            df[name] = parse_amounts(df[name])
+    return df
+
+
+def read_xlsx_streaming(file_path: str) -> pd.DataFrame:
+    """
+    Читает первый лист XLSX выгрузки через openpyxl в режиме только чтения:
+    строки отдаются кортежами значений без объектов ячеек, даты распознаются
+    по стилю ячейки. Столбцы переименовываются и типизируются целиком (_type_xlsx_frame).
+
+    Args:
+        file_path: Путь к XLSX файлу
+
+    Returns:
+        DataFrame с транзакциями
+    """
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        # Пустые строки (все ячейки пусты) пропускаются
+        data = [row for row in rows if any(value is not None for value in row)]
+    finally:
+        workbook.close()
+
+    if header is None:
+        return pd.DataFrame()
+    width = len(header)
+    # Строки короче заголовка дополняем пустыми ячейками
+    data = [row + (None,) * (width - len(row)) if len(row) < width else row[:width] for row in data]
+    columns = [title if title is not None else f'Unnamed: {i}' for i, title in enumerate(header)]
+    return _type_xlsx_frame(pd.DataFrame.from_records(data, columns=columns).infer_objects())
+
+
+def read_xlsx_fast(file_path: str) -> pd.DataFrame:
+    """
+    Читает XLSX выгрузку самым быстрым доступным способом:
+    через python-calamine (если установлен) или openpyxl в режиме только чтения.
+
+    Args:
+        file_path: Путь к XLSX файлу
+
+    Returns:
+        DataFrame с транзакциями
+    """
+    if CALAMINE_AVAILABLE:
+        return _type_xlsx_frame(pd.read_excel(file_path, engine='calamine'))
+    return read_xlsx_streaming(file_path)
+
+
+# Столбцы, по которым одна и та же операция узнается в пересекающихся выгрузках
+DEDUP_COLUMNS = ['date', 'card_last_digits', 'amount', 'mcc', 'description', 'status']
+
+
+def find_transaction_files(path_or_pattern: str) -> List[str]:
+    """
+    Находит файлы выгрузок по пути к директории или glob-шаблону.
+
+    Args:
+        path_or_pattern: Директория с выгрузками или шаблон (например, 'data/*.csv')
+
+    Returns:
+        Отсортированный список путей к .csv и .xlsx файлам
+    """
+    if os.path.isdir(path_or_pattern):
+        candidates = glob.glob(os.path.join(path_or_pattern, '*'))
+    else:
+        candidates = glob.glob(path_or_pattern)
+    return sorted(path for path in candidates if path.endswith(('.csv', '.xlsx')))
+
+
+def deduplicate_transactions(df: pd.DataFrame, source_column: str = 'source_file') -> pd.DataFrame:
+    """
+    Удаляет операции, повторяющиеся в пересекающихся выгрузках.
+    Одинаковые операции внутри одного файла сохраняются: сравнивается номер
+    повторения операции в своем файле, поэтому дубль из другого файла отбрасывается,
+    а две реальные одинаковые покупки - нет.
+
+    Args:
+        df: DataFrame с транзакциями из нескольких файлов
+        source_column: Столбец с именем файла-источника
+
+    Returns:
+        DataFrame без повторов
+    """
+    key = [col for col in DEDUP_COLUMNS if col in df.columns]
+    if not key or df.empty:
+        return df
+
+    group_by = [source_column] + key if source_column in df.columns else key
+    occurrence = df.groupby(group_by, dropna=False, sort=False).cumcount()
+    duplicated = df[key].assign(_occurrence=occurrence.to_numpy()).duplicated()
+    return df.loc[~duplicated.to_numpy()]
+
+
+@timed()
+def load_transactions_many(path_or_pattern: str, max_workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Загружает транзакции из всех выгрузок в директории или по glob-шаблону.
+    Файлы разбираются параллельно в пуле процессов, результат объединяется,
+    очищается от повторов и сортируется по дате.
+
+    Args:
+        path_or_pattern: Директория с выгрузками или шаблон (например, 'data/*.xlsx')
+        max_workers: Число процессов (по умолчанию - по числу CPU)
+
+    Returns:
+        DataFrame с транзакциями из всех файлов и столбцом source_file
+    """
+    logger = logging.getLogger(__name__)
+    files = find_transaction_files(path_or_pattern)
+    if not files:
+        raise FileNotFoundError(f"Не найдено файлов .csv или .xlsx: {path_or_pattern}")
+
+    logger.info(f"Загрузка {len(files)} файлов: {path_or_pattern}")
+    try:
+        if len(files) == 1 or max_workers == 1:
+            frames = [load_transactions(path) for path in files]
+        else:
+            workers = min(len(files), max_workers or os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                frames = list(executor.map(load_transactions, files))
+
+        for path, frame in zip(files, frames):
+            frame['source_file'] = os.path.basename(path)
+
+        df = pd.concat(frames, ignore_index=True)
+        before = len(df)
+        df = deduplicate_transactions(df)
+        if 'date' in df.columns:
+            df = df.sort_values('date', kind='stable')
+        df = df.reset_index(drop=True)
+
+        logger.info(f"Загружено {len(df)} транзакций из {len(files)} файлов, "
+                    f"удалено повторов: {before - len(df)}")
+        return df
+
+    except Exception:
+        logger.exception("Ошибка загрузки набора файлов")
+        raise
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Вычисляет отпечаток содержимого DataFrame (столбцы и значения).
+    Содержимое хешируется при каждом вызове: DataFrame могли изменить на месте.
+
+    Args:
+        df: DataFrame с транзакциями
+
+    Returns:
+        Шестнадцатеричная строка SHA-1
+    """
+    digest = hashlib.sha1()
+    digest.update(repr(list(df.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+@timed()
 def filter_transactions_by_date(df: pd.DataFrame, start_date: Union[str, datetime],
                                 end_date: Union[str, datetime]) -> pd.DataFrame:
     """
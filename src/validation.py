@@ -0,0 +1,169 @@
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Столбцы, без которых выгрузку нельзя обработать (внутренние имена)
+REQUIRED_COLUMNS = ['date', 'amount']
+
+# Столбцы, которые ожидаются в выгрузке, но не обязательны
+EXPECTED_COLUMNS = ['card_last_digits', 'status', 'category', 'mcc', 'description']
+
+# Известные статусы операций
+KNOWN_STATUSES = ('OK', 'FAILED')
+
+# Доля строк с нераспознанной датой или суммой, при которой выгрузка отклоняется
+MAX_INVALID_SHARE = 0.05
+
+# Причины помещения строки в карантин (в порядке проверки)
+QUARANTINE_REASONS = ['invalid_date', 'invalid_amount', 'excluded_status', 'duplicate']
+
+
+class DataQualityError(ValueError):
+    """Выгрузка отклонена проверкой качества данных."""
+
+    def __init__(self, message: str, report: Dict[str, Any]) -> None:
+        super().__init__(message)
+        self.report = report
+
+
+def validate_transactions(
+        df: pd.DataFrame,
+        max_invalid_share: float = MAX_INVALID_SHARE,
+        exclude_statuses: Iterable[str] = (),
+        drop_duplicates: bool = False,
+        numeric_columns: Iterable[str] = ('amount',),
+        date_format: Optional[str] = None
+) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, Any]]:
+    """
+    Проверяет нормализованную выгрузку одним векторным проходом: обязательные
+    столбцы, типы, долю нераспознанных дат и сумм, повторы и статусы операций.
+    Выгрузка с отсутствующими обязательными столбцами или слишком большой долей
+    ошибок отклоняется сразу, до любых расчетов.
+
+    Args:
+        df: DataFrame с внутренними именами столбцов
+        max_invalid_share: Допустимая доля строк с нераспознанной датой или суммой
+        exclude_statuses: Статусы операций, помещаемых в карантин (например, 'FAILED')
+        drop_duplicates: Помещать ли в карантин полные повторы строк
+        numeric_columns: Денежные столбцы, которые должны быть числовыми
+        date_format: Формат даты операции для строкового столбца date
+
+    Returns:
+        Кортеж (корректные строки, строки в карантине со столбцом
+        quarantine_reason, отчет о качестве)
+
+    Raises:
+        DataQualityError: Если выгрузка отклонена
+    """
+    start = time.perf_counter()
+    report: Dict[str, Any] = {'rows': len(df)}
+
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    report['missing_columns'] = missing
+    report['missing_optional_columns'] = [col for col in EXPECTED_COLUMNS if col not in df.columns]
+    if missing:
+        raise DataQualityError(f"В выгрузке нет обязательных столбцов: {', '.join(missing)}", report)
+
+    # Приведение типов: строки не разбираются по одной, только векторно
+    converted = {}
+    dtype_issues = {}
+    if not pd.api.types.is_datetime64_any_dtype(df['date']):
+        dtype_issues['date'] = str(df['date'].dtype)
+        converted['date'] = pd.to_datetime(df['date'], format=date_format, dayfirst=True, errors='coerce')
+    for col in numeric_columns:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            dtype_issues[col] = str(df[col].dtype)
+            converted[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '.'), errors='coerce')
+    if converted:
+        df = df.assign(**converted)
+    report['dtype_issues'] = dtype_issues
+
+    invalid_date = df['date'].isna().to_numpy()
+    invalid_amount = df['amount'].isna().to_numpy()
+    rows = max(len(df), 1)
+    report['date_failure_rate'] = round(float(invalid_date.sum()) / rows, 4)
+    report['amount_failure_rate'] = round(float(invalid_amount.sum()) / rows, 4)
+
+    duplicate = df.duplicated(keep='first').to_numpy()
+    report['duplicates'] = int(duplicate.sum())
+
+    excluded = np.zeros(len(df), dtype=bool)
+    if 'status' in df.columns:
+        counts = df['status'].value_counts(dropna=False)
+        report['statuses'] = {str(status): int(count) for status, count in counts.items()}
+        report['unknown_statuses'] = [str(status) for status in counts.index if status not in KNOWN_STATUSES]
+        excluded = df['status'].isin(list(exclude_statuses)).to_numpy()
+
+    failures = [
+        name for name, rate in (('дат', report['date_failure_rate']), ('сумм', report['amount_failure_rate']))
+        if rate > max_invalid_share
+    ]
+    if failures:
+        report['seconds'] = round(time.perf_counter() - start, 4)
+        raise DataQualityError(
+            f"Выгрузка отклонена: доля нераспознанных {' и '.join(failures)} выше {max_invalid_share:.0%}", report
+        )
+
+    reason = np.select(
+        [invalid_date, invalid_amount, excluded, duplicate & drop_duplicates],
+        QUARANTINE_REASONS, ''
+    )
+    bad = reason != ''
+    report['quarantine'] = {name: int((reason == name).sum()) for name in QUARANTINE_REASONS}
+    report['quarantined_rows'] = int(bad.sum())
+    report['valid_rows'] = len(df) - report['quarantined_rows']
+    report['seconds'] = round(time.perf_counter() - start, 4)
+
+    if not bad.any():
+        return df, df.iloc[0:0].assign(quarantine_reason=pd.Series(dtype=object)), report
+    return df[~bad], df[bad].assign(quarantine_reason=reason[bad]), report
+
+
+def format_quality_report(report: Dict[str, Any]) -> str:
+    """
+    Форматирует отчет о качестве в одну строку для журнала.
+
+    Args:
+        report: Отчет validate_transactions
+
+    Returns:
+        Строка с основными показателями
+    """
+    parts = [
+        f"строк {report.get('rows', 0)}",
+        f"в карантине {report.get('quarantined_rows', 0)}",
+        f"ошибок дат {report.get('date_failure_rate', 0):.2%}",
+        f"ошибок сумм {report.get('amount_failure_rate', 0):.2%}",
+        f"повторов {report.get('duplicates', 0)}",
+    ]
+    if report.get('missing_columns'):
+        parts.append(f"нет столбцов: {', '.join(report['missing_columns'])}")
+    if report.get('dtype_issues'):
+        parts.append(f"приведены типы: {', '.join(report['dtype_issues'])}")
+    if report.get('unknown_statuses'):
+        parts.append(f"неизвестные статусы: {', '.join(report['unknown_statuses'])}")
+    return '; '.join(parts)
+
+
+def write_quarantine(quarantined: pd.DataFrame, path: str) -> None:
+    """
+    Сохраняет строки из карантина в отдельный CSV файл.
+
+    Args:
+        quarantined: Строки со столбцом quarantine_reason
+        path: Путь к файлу
+
+    Returns:
+        None
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    quarantined.to_csv(path, index=False)
+    logger.info(f"Строки в карантине сохранены: {os.path.abspath(path)}. Размер: {len(quarantined)} строк")
@@ -1,8 +1,14 @@
-from typing import Dict, List, Any
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Any, Optional, Tuple
 import requests
 import os
+import json
 import logging
+import threading
+import time
+from datetime import datetime
 from dotenv import load_dotenv
+from src.profiling import timed
 
 
 # Загрузка переменных окружения
@@ -17,71 +23,105 @@ STOCK_API_KEY = os.getenv('STOCK_API_KEY')
 CURRENCY_API_URL = os.getenv('CURRENCY_API_URL')
 STOCK_API_URL = os.getenv('STOCK_API_URL')
 
+# Файл с последними успешно полученными котировками
+MARKET_SNAPSHOT_PATH = os.getenv('MARKET_SNAPSHOT_PATH', os.path.join('data', 'market_snapshot.json'))
 
-def get_currency_rates() -> List[Dict[str, Any]]:
-    """
-    Возвращает курсы валют из API или заглушку.
+# Неизменившиеся котировки записываются в снимок не чаще раза в столько секунд
+SNAPSHOT_REFRESH_INTERVAL = 300.0
 
-    Returns:
-        Список словарей с валютами и курсами
-    """
-    try:
-        if not CURRENCY_API_KEY or not CURRENCY_API_URL:
-            logger.warning("Currency API credentials not configured, using fallback")
-            return get_currency_rates_fallback()
+# Таймаут запроса к API в секундах: (соединение, чтение)
+REQUEST_TIMEOUT = (3.05, 10)
 
-        params = {'apikey': CURRENCY_API_KEY}
-        response = requests.get(CURRENCY_API_URL, params=params, timeout=10)
-        response.raise_for_status()
-        rates_data = response.json()
+# Ошибок подряд до размыкания цепи и пауза до пробного запроса в секундах
+FAILURE_THRESHOLD = 3
+RECOVERY_TIMEOUT = 60.0
 
-        if 'rates' in rates_data:
-            major_currencies = ['EUR', 'GBP', 'JPY', 'CNY', 'RUB']
-            return [
-                {'currency': curr, 'rate': round(rates_data['rates'][curr], 2)}
-                for curr in major_currencies if curr in rates_data['rates']
-            ]
+# Виды котировок (имена методов поставщика)
+MARKET_KINDS = ('currency_rates', 'stock_prices')
 
-        return get_currency_rates_fallback()
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Currency API request failed: {e}")
-        return get_currency_rates_fallback()
-    except Exception as e:
-        logger.error(f"Error processing currency rates: {e}")
-        return get_currency_rates_fallback()
+class MarketDataProvider(ABC):
+    """Поставщик котировок: курсы валют и цены акций."""
 
+    name = 'provider'
 
-def get_currency_rates_fallback() -> List[Dict[str, Any]]:
-    """Заглушка для курсов валют при недоступности API."""
-    return [
-        {'currency': 'USD', 'rate': 75.50},
-        {'currency': 'EUR', 'rate': 85.20},
-        {'currency': 'GBP', 'rate': 95.75},
-        {'currency': 'JPY', 'rate': 0.68}
-    ]
+    @abstractmethod
+    def currency_rates(self) -> List[Dict[str, Any]]:
+        """
+        Возвращает курсы валют.
 
+        Returns:
+            Список словарей с ключами currency и rate
 
-def get_stock_prices() -> List[Dict[str, Any]]:
-    """
-    Возвращает цены акций из API или заглушку.
+        Raises:
+            Exception: Если котировки получить не удалось
+        """
 
-    Returns:
-        Список словарей с акциями и ценами
-    """
-    try:
-        if not STOCK_API_KEY or not STOCK_API_URL:
-            logger.warning("Stock API credentials not configured, using fallback")
-            return get_stock_prices_fallback()
+    @abstractmethod
+    def stock_prices(self) -> List[Dict[str, Any]]:
+        """
+        Возвращает цены акций.
+
+        Returns:
+            Список словарей с ключами stock и price
+
+        Raises:
+            Exception: Если котировки получить не удалось
+        """
+
+
+class ApiProvider(MarketDataProvider):
+    """Котировки из внешних API курсов валют и цен акций."""
+
+    name = 'api'
+
+    def __init__(self, currency_url: Optional[str] = CURRENCY_API_URL, currency_key: Optional[str] = CURRENCY_API_KEY,
+                 stock_url: Optional[str] = STOCK_API_URL, stock_key: Optional[str] = STOCK_API_KEY,
+                 timeout: Any = REQUEST_TIMEOUT) -> None:
+        """
+        Args:
+            currency_url: Адрес API курсов валют
+            currency_key: Ключ API курсов валют
+            stock_url: Адрес API цен акций
+            stock_key: Ключ API цен акций
+            timeout: Таймаут запроса (секунды или кортеж соединение/чтение)
+        """
+        self.currency_url = currency_url
+        self.currency_key = currency_key
+        self.stock_url = stock_url
+        self.stock_key = stock_key
+        self.timeout = timeout
+
+    def currency_rates(self) -> List[Dict[str, Any]]:
+        if not self.currency_key or not self.currency_url:
+            raise RuntimeError("Currency API credentials not configured")
+
+        params = {'apikey': self.currency_key}
+        response = requests.get(self.currency_url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        rates_data = response.json()
+
+        major_currencies = ['EUR', 'GBP', 'JPY', 'CNY', 'RUB']
+        rates = [
+            {'currency': curr, 'rate': round(rates_data['rates'][curr], 2)}
+            for curr in major_currencies if curr in rates_data.get('rates', {})
+        ]
+        if not rates:
+            raise ValueError("Currency API response has no rates")
+        return rates
+
+    def stock_prices(self) -> List[Dict[str, Any]]:
+        if not self.stock_key or not self.stock_url:
+            raise RuntimeError("Stock API credentials not configured")
 
         symbols = ['AAPL', 'GOOGL', 'MSFT', 'TSLA']
         params = {
-            'apikey': STOCK_API_KEY,
+            'apikey': self.stock_key,
             'function': 'GLOBAL_QUOTE',
             'symbol': ','.join(symbols)
         }
 
-        response = requests.get(STOCK_API_URL, params=params, timeout=10)
+        response = requests.get(self.stock_url, params=params, timeout=self.timeout)
         response.raise_for_status()
         prices_data = response.json()
 
@@ -95,15 +135,328 @@ def get_stock_prices() -> List[Dict[str, Any]]:
                         'stock': symbol,
                         'price': round(float(stock_data['05. price']), 2)
                     })
+        if not stocks:
+            raise ValueError("Stock API response has no prices")
+        return stocks
+
+
+class SnapshotProvider(MarketDataProvider):
+    """
+    Последние успешно полученные котировки из JSON файла.
+    Каждая котировка отдается с полем updated_at - временем получения.
+    Файл переписывается, только если котировки изменились или с прошлой
+    записи прошло больше refresh_interval секунд.
+    """
+
+    name = 'snapshot'
+
+    def __init__(self, path: str = MARKET_SNAPSHOT_PATH, refresh_interval: float = SNAPSHOT_REFRESH_INTERVAL,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Args:
+            path: Путь к файлу снимка
+            refresh_interval: Пауза между записями неизменившихся котировок в секундах
+            clock: Источник времени (для тестов)
+        """
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        # Последние записанные котировки: вид -> (котировки, время записи)
+        self._written: Dict[str, Tuple[List[Dict[str, Any]], float]] = {}
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _quotes(self, kind: str) -> List[Dict[str, Any]]:
+        entry = self._read().get(kind)
+        if not entry or not entry.get('quotes'):
+            raise LookupError(f"No {kind} in snapshot {self.path}")
+        return [dict(quote, updated_at=entry['updated_at']) for quote in entry['quotes']]
+
+    def currency_rates(self) -> List[Dict[str, Any]]:
+        return self._quotes('currency_rates')
+
+    def stock_prices(self) -> List[Dict[str, Any]]:
+        return self._quotes('stock_prices')
+
+    def save(self, kind: str, quotes: List[Dict[str, Any]], updated_at: Optional[datetime] = None) -> None:
+        """
+        Записывает котировки в снимок (атомарно, остальные виды сохраняются).
+        Те же котировки, что и при прошлой записи, повторно записываются
+        не чаще раза в refresh_interval секунд.
+
+        Args:
+            kind: 'currency_rates' или 'stock_prices'
+            quotes: Котировки
+            updated_at: Время получения (по умолчанию - текущее)
+
+        Returns:
+            None
+        """
+        with self._lock:
+            now = self.clock()
+            written = self._written.get(kind)
+            unchanged = written is not None and written[0] == quotes and now - written[1] < self.refresh_interval
+            if updated_at is None and unchanged:
+                return
+            snapshot = self._read()
+            snapshot[kind] = {
+                'updated_at': (updated_at or datetime.now()).isoformat(timespec='seconds'),
+                'quotes': quotes,
+            }
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            self._written[kind] = ([dict(quote) for quote in quotes], now)
+
+
+class StubProvider(MarketDataProvider):
+    """Локальные котировки без сети (для тестов и замеров): заглушки или заданные списки."""
+
+    name = 'stub'
+
+    def __init__(self, currency_rates: Optional[List[Dict[str, Any]]] = None,
+                 stock_prices: Optional[List[Dict[str, Any]]] = None,
+                 delay: float = 0.0, fail: bool = False) -> None:
+        """
+        Args:
+            currency_rates: Курсы валют (по умолчанию - get_currency_rates_fallback)
+            stock_prices: Цены акций (по умолчанию - get_stock_prices_fallback)
+            delay: Задержка ответа в секундах (имитация сети)
+            fail: Имитировать недоступность (каждый вызов - ошибка)
+        """
+        self._currency_rates = currency_rates
+        self._stock_prices = stock_prices
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def _respond(self, quotes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("Stub provider is down")
+        return [dict(quote) for quote in quotes]
+
+    def currency_rates(self) -> List[Dict[str, Any]]:
+        return self._respond(self._currency_rates or get_currency_rates_fallback())
+
+    def stock_prices(self) -> List[Dict[str, Any]]:
+        return self._respond(self._stock_prices or get_stock_prices_fallback())
+
+
+class CircuitBreaker:
+    """
+    Размыкатель цепи: после failure_threshold ошибок подряд запросы
+    не выполняются (ответ сразу из запасного источника), через
+    recovery_timeout секунд пропускается один пробный запрос:
+    успех замыкает цепь, ошибка снова размыкает ее.
+    """
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, recovery_timeout: float = RECOVERY_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Args:
+            failure_threshold: Число ошибок подряд до размыкания
+            recovery_timeout: Пауза до пробного запроса в секундах
+            clock: Источник времени (для тестов)
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Состояние: 'closed', 'open' или 'half_open'."""
+        if self.opened_at is None:
+            return 'closed'
+        if self._probing or self.clock() - self.opened_at >= self.recovery_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """
+        Проверяет, можно ли выполнить запрос. В полуоткрытом состоянии
+        разрешается только один пробный запрос одновременно.
 
-        return stocks if stocks else get_stock_prices_fallback()
+        Returns:
+            True, если запрос можно выполнить
+        """
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            return False
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Stock API request failed: {e}")
-        return get_stock_prices_fallback()
-    except Exception as e:
-        logger.error(f"Error processing stock prices: {e}")
-        return get_stock_prices_fallback()
+    def record_success(self) -> None:
+        """Отмечает успешный запрос: цепь замыкается."""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        """Отмечает ошибку: после порога или неудачной пробы цепь размыкается."""
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self._probing:
+                    logger.warning(f"Circuit opened after {self.failures} failures, "
+                                   f"next probe in {self.recovery_timeout:.0f}s")
+                self.opened_at = self.clock()
+                self._probing = False
+
+
+class MarketData:
+    """
+    Котировки с защитой от недоступности API: основной поставщик вызывается
+    через размыкатель цепи (свой для каждого вида котировок), успешный ответ
+    сохраняется в снимок, при ошибке или разомкнутой цепи ответ берется
+    из снимка, а если его нет - из запасного поставщика.
+    """
+
+    def __init__(self, primary: Optional[MarketDataProvider] = None,
+                 snapshot: Optional[SnapshotProvider] = None,
+                 fallback: Optional[MarketDataProvider] = None,
+                 failure_threshold: int = FAILURE_THRESHOLD,
+                 recovery_timeout: float = RECOVERY_TIMEOUT) -> None:
+        """
+        Args:
+            primary: Основной поставщик (None - только снимок и запасной поставщик)
+            snapshot: Снимок последних успешных котировок
+            fallback: Запасной поставщик (по умолчанию - StubProvider)
+            failure_threshold: Число ошибок подряд до размыкания цепи
+            recovery_timeout: Пауза до пробного запроса в секундах
+        """
+        self.primary = primary
+        self.snapshot = snapshot
+        self.fallback = fallback or StubProvider()
+        self.breakers = {kind: CircuitBreaker(failure_threshold, recovery_timeout) for kind in MARKET_KINDS}
+
+    def get(self, kind: str) -> List[Dict[str, Any]]:
+        """
+        Возвращает котировки одного вида.
+
+        Args:
+            kind: 'currency_rates' или 'stock_prices'
+
+        Returns:
+            Список котировок
+        """
+        breaker = self.breakers[kind]
+        if self.primary is not None and breaker.allow():
+            try:
+                quotes = getattr(self.primary, kind)()
+            except Exception as e:
+                breaker.record_failure()
+                logger.error(f"Market data request {kind} failed ({self.primary.name}): {e}")
+            else:
+                breaker.record_success()
+                if self.snapshot is not None:
+                    try:
+                        self.snapshot.save(kind, quotes)
+                    except OSError as e:
+                        logger.warning(f"Failed to save market snapshot: {e}")
+                return quotes
+
+        if self.snapshot is not None:
+            try:
+                return getattr(self.snapshot, kind)()
+            except (LookupError, OSError, ValueError) as e:
+                logger.debug(f"Snapshot unavailable: {e}")
+        logger.warning(f"Using {self.fallback.name} {kind}")
+        return getattr(self.fallback, kind)()
+
+    def currency_rates(self) -> List[Dict[str, Any]]:
+        """Курсы валют."""
+        return self.get('currency_rates')
+
+    def stock_prices(self) -> List[Dict[str, Any]]:
+        """Цены акций."""
+        return self.get('stock_prices')
+
+
+_market_data: Optional[MarketData] = None
+
+
+def get_market_data() -> MarketData:
+    """
+    Возвращает общий источник котировок. При первом обращении основной
+    поставщик - API (если настроены ключи), снимок - MARKET_SNAPSHOT_PATH.
+
+    Returns:
+        MarketData
+    """
+    global _market_data
+    if _market_data is None:
+        configured = (CURRENCY_API_KEY and CURRENCY_API_URL) or (STOCK_API_KEY and STOCK_API_URL)
+        if not configured:
+            logger.warning("Market API credentials not configured, using snapshot or fallback")
+        _market_data = MarketData(ApiProvider() if configured else None, SnapshotProvider())
+    return _market_data
+
+
+def set_market_data(market_data: Optional[MarketData]) -> None:
+    """
+    Заменяет общий источник котировок (None - создать заново по настройкам).
+
+    Args:
+        market_data: Новый источник котировок
+
+    Returns:
+        None
+    """
+    global _market_data
+    _market_data = market_data
+
+
+@timed()
+def get_currency_rates() -> List[Dict[str, Any]]:
+    """
+    Возвращает курсы валют из API, снимка последних котировок или заглушку.
+
+    Returns:
+        Список словарей с валютами и курсами
+    """
+    return get_market_data().currency_rates()
+
+
+def get_currency_rates_fallback() -> List[Dict[str, Any]]:
+    """Заглушка для курсов валют при недоступности API."""
+    return [
+        {'currency': 'USD', 'rate': 75.50},
+        {'currency': 'EUR', 'rate': 85.20},
+        {'currency': 'GBP', 'rate': 95.75},
+        {'currency': 'JPY', 'rate': 0.68}
+    ]
+
+
+@timed()
+def get_stock_prices() -> List[Dict[str, Any]]:
+    """
+    Возвращает цены акций из API, снимка последних котировок или заглушку.
+
+    Returns:
+        Список словарей с акциями и ценами
+    """
+    return get_market_data().stock_prices()
 
 
 def get_stock_prices_fallback() -> List[Dict[str, Any]]:
@@ -114,3 +467,17 @@ def get_stock_prices_fallback() -> List[Dict[str, Any]]:
         {'stock': 'MSFT', 'price': 305.50},
         {'stock': 'TSLA', 'price': 210.75}
     ]
+
+
+def get_market_snapshot() -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Возвращает курсы валют и цены акций одним снимком
+    (для переиспользования между многими расчетами).
+
+    Returns:
+        Словарь с ключами 'currency_rates' и 'stock_prices'
+    """
+    return {
+        'currency_rates': get_currency_rates(),
+        'stock_prices': get_stock_prices()
+    }
@@ -0,0 +1,637 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.anomalies import AnomalyScorer
+from src.batch import write_payloads
+from src.budgets import BudgetTracker, Budgets
+from src.cache import file_fingerprint
+from src.dataset import open_dataset, write_dataset
+from src.main import generate_home_history
+from src.reports import PARTIAL_REPORTS, report_partial, report_window
+from src.rollups import Rollups, rollups_path
+from src.utils import DEDUP_COLUMNS, load_transactions, setup_logging
+from src.views import get_market_snapshot
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+    WATCHDOG_AVAILABLE = False
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Файлы, которые считаются выгрузками
+EXPORT_EXTENSIONS = ('.csv', '.xlsx')
+
+# Сколько секунд файл не должен меняться, прежде чем его обработать
+DEFAULT_DEBOUNCE = 2.0
+
+# Период опроса каталога без watchdog и период цикла обработки
+DEFAULT_POLL_INTERVAL = 1.0
+
+# Отчёты считаются за 3 месяца до даты: изменение месяца затрагивает его и два следующих
+REPORT_MONTHS = 3
+
+# Частей журнала набора данных, после которых журнал сжимается в снимок
+MAX_JOURNAL_PARTS = 64
+
+# Столбец с хешем операции в снимке и журнале набора данных
+ROW_HASH_COLUMN = 'row_hash'
+
+
+def parse_export(path: str) -> pd.DataFrame:
+    """
+    Загружает одну выгрузку (в воркере) и отмечает файл-источник.
+
+    Args:
+        path: Путь к выгрузке
+
+    Returns:
+        DataFrame с транзакциями и столбцом source_file
+    """
+    df = load_transactions(path)
+    df['source_file'] = os.path.basename(path)
+    return df
+
+
+def _row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Хеши операций по ключевым столбцам с номером повторения внутри файла
+    (две одинаковые покупки дают разные хеши). Значения приводятся
+    к одному виду, чтобы хеши совпадали после сохранения в набор данных.
+
+    Args:
+        df: DataFrame с транзакциями одного файла
+
+    Returns:
+        Массив uint64
+    """
+    key = pd.DataFrame(index=df.index)
+    for column in DEDUP_COLUMNS:
+        if column not in df.columns:
+            continue
+        values = df[column]
+        if column == 'date':
+            key[column] = pd.to_datetime(values).to_numpy(dtype='datetime64[ns]').astype('int64')
+        elif column in ('amount', 'mcc'):
+            numbers = pd.to_numeric(values, errors='coerce')
+            key[column] = (numbers * (100 if column == 'amount' else 1)).round().fillna(-1).astype('int64')
+        else:
+            key[column] = values.where(values.notna(), '').astype(str)
+    key['_occurrence'] = key.groupby(list(key.columns), sort=False).cumcount()
+    return pd.util.hash_pandas_object(key, index=False).to_numpy()
+
+
+def _months(dates: pd.Series) -> Set[pd.Period]:
+    """Месяцы, в которые попадают даты."""
+    return set(pd.to_datetime(dates).dropna().dt.to_period('M').unique())
+
+
+class ChangeQueue:
+    """
+    Очередь изменившихся файлов с подавлением дребезга.
+
+    Повторные события по одному файлу сливаются в одну запись, файл выдается
+    только после debounce секунд без новых событий. Очередь хранит не больше
+    одной записи на файл, поэтому поток событий не накапливает задания.
+    """
+
+    def __init__(self, debounce: float = DEFAULT_DEBOUNCE, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Args:
+            debounce: Время тишины перед обработкой файла в секундах
+            clock: Источник времени (для тестов)
+        """
+        self.debounce = debounce
+        self.clock = clock
+        self._changes: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._changes)
+
+    def touch(self, path: str) -> None:
+        """
+        Отмечает изменение файла (из потока наблюдателя).
+
+        Args:
+            path: Путь к файлу
+
+        Returns:
+            None
+        """
+        if not path.endswith(EXPORT_EXTENSIONS) or os.path.basename(path).startswith('.'):
+            return
+        with self._lock:
+            self._changes[os.path.abspath(path)] = self.clock()
+
+    def take(self, limit: int, busy: Iterable[str] = ()) -> List[str]:
+        """
+        Выдает файлы, которые не менялись debounce секунд (сначала самые давние).
+        Файлы в обработке остаются в очереди до её окончания.
+
+        Args:
+            limit: Максимальное число файлов
+            busy: Файлы, которые сейчас обрабатываются
+
+        Returns:
+            Список путей
+        """
+        busy = set(busy)
+        now = self.clock()
+        with self._lock:
+            ready = sorted(
+                (changed, path) for path, changed in self._changes.items()
+                if now - changed >= self.debounce and path not in busy
+            )[:max(limit, 0)]
+            for _, path in ready:
+                del self._changes[path]
+        return [path for _, path in ready]
+
+
+class PollingWatcher:
+    """
+    Наблюдение за каталогом опросом: сравнение размера и времени изменения
+    файлов. Используется без watchdog и для начального обхода каталога.
+    """
+
+    def __init__(self, directory: str, queue: ChangeQueue, interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        """
+        Args:
+            directory: Каталог с выгрузками
+            queue: Очередь изменений
+            interval: Период опроса в секундах
+        """
+        self.directory = directory
+        self.queue = queue
+        self.interval = interval
+        self._seen: Dict[str, Tuple[int, int]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def scan(self) -> int:
+        """
+        Обходит каталог и ставит в очередь новые и изменившиеся файлы.
+
+        Returns:
+            Число изменившихся файлов
+        """
+        changed = 0
+        current = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.endswith(EXPORT_EXTENSIONS):
+                    continue
+                stat = entry.stat()
+                current[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                if self._seen.get(entry.path) != current[entry.path]:
+                    self.queue.touch(entry.path)
+                    changed += 1
+        self._seen = current
+        return changed
+
+    def start(self) -> None:
+        """Запускает опрос в фоновом потоке."""
+        def loop() -> None:
+            while not self._stop.wait(self.interval):
+                try:
+                    self.scan()
+                except OSError as e:
+                    logger.error(f"Ошибка опроса каталога {self.directory}: {str(e)}")
+
+        self._thread = threading.Thread(target=loop, name='poll-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Останавливает опрос."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class _QueueHandler(FileSystemEventHandler):
+    """Передает события watchdog в очередь изменений."""
+
+    def __init__(self, queue: ChangeQueue) -> None:
+        super().__init__()
+        self.queue = queue
+
+    def on_created(self, event: Any) -> None:
+        if not event.is_directory:
+            self.queue.touch(event.src_path)
+
+    def on_modified(self, event: Any) -> None:
+        if not event.is_directory:
+            self.queue.touch(event.src_path)
+
+    def on_moved(self, event: Any) -> None:
+        if not event.is_directory:
+            self.queue.touch(event.dest_path)
+
+
+class IncrementalStore:
+    """
+    Накопленный набор данных по всем выгрузкам каталога и состояние поверх него:
+    предрасчитанные таблицы (Rollups), траты для бюджетов (BudgetTracker)
+    и базовые линии необычных трат (AnomalyScorer).
+
+    Для каждой выгрузки хранятся хеши всех её операций (с номером повторения
+    в файле), поэтому операция попадает в набор данных, если её хеша нет ни
+    в одной выгрузке, - так же, как при полной загрузке (deduplicate_transactions).
+    Новая или дописанная выгрузка добавляет только свои новые операции:
+    агрегаты обновляются через update, новые строки пишутся отдельной частью
+    журнала рядом со снимком набора данных. Если из файла пропали операции,
+    удаляются только те, которых нет в других выгрузках, и состояние
+    пересчитывается по данным в памяти без повторного разбора файлов.
+    """
+
+    def __init__(self, state_dir: str) -> None:
+        """
+        Args:
+            state_dir: Каталог состояния (снимок и журнал набора данных, таблицы, хеши выгрузок)
+        """
+        os.makedirs(state_dir, exist_ok=True)
+        self.dataset_path = os.path.join(state_dir, 'transactions.arrow')
+        self._journal_dir = os.path.join(state_dir, 'journal')
+        self._hashes_dir = os.path.join(state_dir, 'hashes')
+        self._rollups_path = rollups_path(self.dataset_path)
+        self._sources_path = os.path.join(state_dir, 'sources.json')
+        os.makedirs(self._journal_dir, exist_ok=True)
+        os.makedirs(self._hashes_dir, exist_ok=True)
+        self.sources: Dict[str, str] = {}
+        if os.path.exists(self._sources_path):
+            with open(self._sources_path, encoding='utf-8') as f:
+                self.sources = json.load(f)
+
+        parts = [self.dataset_path] if os.path.exists(self.dataset_path) else []
+        parts += self._journal()
+        frames = [open_dataset(part).to_pandas() for part in parts]
+        self.df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        self._keys = np.empty(0, dtype='uint64')
+        self._hashes: Dict[str, np.ndarray] = {}
+        for entry in os.scandir(self._hashes_dir):
+            if entry.name.endswith('.npy'):
+                self._hashes[entry.name[:-len('.npy')]] = np.load(entry.path, allow_pickle=False)
+        if not self.df.empty:
+            self.df = self.df.sort_values('date', kind='stable', na_position='last').reset_index(drop=True)
+            if ROW_HASH_COLUMN in self.df.columns:
+                self._keys = self.df.pop(ROW_HASH_COLUMN).to_numpy(dtype='uint64')
+            else:
+                # Состояние без хешей: хеши восстанавливаются по строкам каждой выгрузки
+                self._keys = np.empty(len(self.df), dtype='uint64')
+                for source, rows in self.df.groupby('source_file', sort=False):
+                    hashes = _row_hashes(rows)
+                    self._keys[rows.index.to_numpy()] = hashes
+                    self._hashes.setdefault(source, hashes)
+
+        self.rollups = Rollups.load(self._rollups_path) if os.path.isdir(self._rollups_path) else Rollups()
+        if self.rollups.meta['rows'] != len(self.df):
+            self.rollups = Rollups.from_transactions(self.df)
+        self._rebuild_state(rollups=False)
+
+    def _journal(self) -> List[str]:
+        """Части журнала в порядке записи."""
+        return sorted(entry.path for entry in os.scandir(self._journal_dir) if entry.name.endswith('.arrow'))
+
+    def _rebuild_state(self, rollups: bool = True) -> None:
+        """Пересчитывает состояние по всему набору данных."""
+        if rollups:
+            self.rollups = Rollups.from_transactions(self.df)
+        self.budgets = BudgetTracker().update(self.df)
+        self.anomalies = AnomalyScorer().update(self.df)
+
+    def _write_part(self, rows: pd.DataFrame, keys: np.ndarray) -> None:
+        """Дописывает новые строки в журнал отдельной частью; частей много - сжимает журнал."""
+        journal = self._journal()
+        if len(journal) >= MAX_JOURNAL_PARTS:
+            self._compact()
+            return
+        number = int(os.path.basename(journal[-1]).split('.')[0]) + 1 if journal else 1
+        write_dataset(rows.assign(**{ROW_HASH_COLUMN: keys}),
+                      os.path.join(self._journal_dir, f"{number:06d}.arrow"))
+
+    def _compact(self) -> None:
+        """Записывает снимок всего набора данных и очищает журнал."""
+        write_dataset(self.df.assign(**{ROW_HASH_COLUMN: self._keys}), self.dataset_path)
+        for part in self._journal():
+            os.remove(part)
+
+    def _save_hashes(self, source: str) -> None:
+        """Сохраняет хеши операций одной выгрузки."""
+        path = os.path.join(self._hashes_dir, f"{source}.npy")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, self._hashes[source], allow_pickle=False)
+        os.replace(tmp_path, path)
+
+    def is_current(self, path: str) -> bool:
+        """Проверяет, что файл уже обработан в текущем виде."""
+        return self.sources.get(os.path.abspath(path)) == file_fingerprint(path)
+
+    def apply(self, path: str, frame: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Добавляет в накопленные данные разобранную выгрузку.
+
+        Args:
+            path: Путь к выгрузке
+            frame: Её транзакции (parse_export)
+
+        Returns:
+            Словарь: added (число новых операций), removed (число удаленных операций),
+            rebuilt (был ли пересчет состояния), months (затронутые месяцы),
+            anomalies (необычные среди новых операций)
+        """
+        source = os.path.basename(path)
+        hashes = _row_hashes(frame)
+        old = self._hashes.get(source, np.empty(0, dtype='uint64'))
+
+        # Новые операции: их хешей нет ни в одной выгрузке (повторы внутри файла различаются номером)
+        new = ~np.isin(hashes, self._keys)
+        added = frame[new]
+        added_keys = hashes[new]
+
+        # Пропавшие из файла операции остаются, если они есть в других выгрузках
+        vanished = old[~np.isin(old, hashes)]
+        removed = frame.iloc[:0]
+        if len(vanished):
+            holders = np.full(len(vanished), '', dtype=object)
+            for other, other_hashes in self._hashes.items():
+                if other != source:
+                    free = holders == ''
+                    holders[free & np.isin(vanished, other_hashes)] = other
+            gone = np.isin(self._keys, vanished[holders == ''])
+            removed = self.df[gone]
+            self.df, self._keys = self.df[~gone], self._keys[~gone]
+            # Операции этого файла, оставшиеся благодаря другим выгрузкам, переходят к ним
+            kept = holders != ''
+            moved = pd.Series(holders[kept], index=vanished[kept])
+            position = np.flatnonzero(np.isin(self._keys, vanished[kept]))
+            if len(position):
+                self.df = self.df.copy()
+                column = self.df.columns.get_loc('source_file')
+                self.df.iloc[position, column] = moved.reindex(self._keys[position]).to_numpy()
+        rebuilt = not removed.empty
+
+        months = _months(removed['date']) | _months(added['date'])
+        anomalies = added.iloc[:0]
+        if not added.empty:
+            scored = added.join(self.anomalies.score(added))
+            anomalies = scored[scored['anomaly']]
+            self.df = pd.concat([self.df, added], ignore_index=True)
+            self._keys = np.concatenate([self._keys, added_keys])
+            order = np.argsort(self.df['date'].to_numpy(dtype='datetime64[ns]'), kind='stable')
+            self.df, self._keys = self.df.iloc[order].reset_index(drop=True), self._keys[order]
+            if not rebuilt:
+                self.rollups.update(added)
+                self.budgets.update(added)
+                self.anomalies.update(added)
+
+        if rebuilt:
+            self.df = self.df.reset_index(drop=True)
+            self._rebuild_state()
+            self._compact()
+            logger.info(f"Из выгрузки {source} пропали операции: удалено {len(removed)}, состояние пересчитано")
+        elif not added.empty:
+            self._write_part(added, added_keys)
+        if rebuilt or not added.empty:
+            self.rollups.save(self._rollups_path)
+
+        self._hashes[source] = hashes
+        self._save_hashes(source)
+        self.sources[os.path.abspath(path)] = file_fingerprint(path)
+        tmp_path = f"{self._sources_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.sources, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self._sources_path)
+
+        logger.info(f"Выгрузка {source}: новых операций {len(added)}, затронуто месяцев {len(months)}")
+        return {'added': len(added), 'removed': len(removed), 'rebuilt': rebuilt, 'months': sorted(months),
+                'anomalies': anomalies}
+
+
+class FolderWatcher:
+    """
+    Демон, следящий за каталогом выгрузок.
+
+    События файловой системы (watchdog или опрос) проходят через очередь
+    с подавлением дребезга. Выгрузки разбираются в ограниченном пуле процессов:
+    новые файлы берутся из очереди, только когда в пуле есть свободное место,
+    поэтому всплеск файлов не создает очередь тяжелых заданий. Разобранные
+    файлы по одному добавляются в IncrementalStore, после чего для затронутых
+    месяцев пересчитываются данные домашней страницы и отчёты.
+    """
+
+    def __init__(self, directory: str, output_dir: str, state_dir: Optional[str] = None,
+                 max_workers: int = 2, debounce: float = DEFAULT_DEBOUNCE,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, use_watchdog: bool = True,
+                 budgets: Optional[Budgets] = None,
+                 market: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Args:
+            directory: Каталог с выгрузками
+            output_dir: Каталог результатов (home/, reports/, anomalies.csv, budgets.csv)
+            state_dir: Каталог состояния (по умолчанию output_dir/state)
+            max_workers: Число процессов разбора (1 - разбор в текущем процессе)
+            debounce: Время тишины перед обработкой файла в секундах
+            poll_interval: Период опроса каталога и цикла обработки
+            use_watchdog: Использовать watchdog, если он установлен
+            budgets: Бюджеты для оценки после каждого обновления
+            market: Готовый снимок котировок (по умолчанию запрашивается при публикации)
+            clock: Источник времени (для тестов)
+        """
+        self.directory = directory
+        self.output_dir = output_dir
+        self.max_workers = max(1, max_workers)
+        self.poll_interval = poll_interval
+        self.budgets = budgets
+        self.market = market
+        self.queue = ChangeQueue(debounce, clock)
+        self.poller = PollingWatcher(directory, self.queue, poll_interval)
+        self.store = IncrementalStore(state_dir or os.path.join(output_dir, 'state'))
+        self.use_watchdog = use_watchdog and WATCHDOG_AVAILABLE
+        self._observer: Any = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._running: Dict[str, Future] = {}
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Запускает наблюдение: начальный обход каталога, затем watchdog или опрос."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.poller.scan()
+        if self.use_watchdog:
+            self._observer = Observer()
+            self._observer.schedule(_QueueHandler(self.queue), self.directory, recursive=False)
+            self._observer.start()
+        else:
+            self.poller.start()
+        if self.max_workers > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        logger.info(f"Наблюдение за {os.path.abspath(self.directory)} "
+                    f"({'watchdog' if self.use_watchdog else 'опрос'}, процессов: {self.max_workers})")
+
+    def stop(self) -> None:
+        """Останавливает наблюдение и пул процессов."""
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        self.poller.stop()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def run_once(self) -> Dict[str, Any]:
+        """
+        Один шаг цикла: применяет разобранные файлы, публикует результаты
+        и отправляет в пул новые файлы из очереди по числу свободных мест.
+
+        Returns:
+            Сводка шага: processed, added, pending, running
+        """
+        finished = {path: future for path, future in self._running.items() if future.done()}
+        for path in finished:
+            del self._running[path]
+
+        free = self.max_workers - len(self._running)
+        for path in self.queue.take(free, busy=self._running):
+            if not os.path.exists(path) or self.store.is_current(path):
+                continue
+            if self._executor is None:
+                future: Future = Future()
+                try:
+                    future.set_result(parse_export(path))
+                except Exception as e:
+                    future.set_exception(e)
+                finished[path] = future
+            else:
+                self._running[path] = self._executor.submit(parse_export, path)
+
+        months: Set[pd.Period] = set()
+        anomalies = []
+        added = 0
+        for path, future in finished.items():
+            try:
+                result = self.store.apply(path, future.result())
+            except Exception as e:
+                logger.error(f"Ошибка обработки выгрузки {path}: {str(e)}")
+                continue
+            added += result['added']
+            months.update(result['months'])
+            anomalies.append(result['anomalies'])
+        if months:
+            self.publish(months, anomalies)
+        return {'processed': len(finished), 'added': added, 'pending': len(self.queue),
+                'running': len(self._running)}
+
+    def run(self) -> None:
+        """
+        Обрабатывает изменения до остановки (stop или Ctrl+C).
+
+        Returns:
+            None
+        """
+        self.start()
+        try:
+            while not self._stop.wait(self.poll_interval):
+                self.run_once()
+        except KeyboardInterrupt:
+            logger.info("Остановка наблюдения")
+        finally:
+            self.stop()
+
+    def publish(self, months: Iterable[pd.Period], anomalies: Iterable[pd.DataFrame] = ()) -> List[str]:
+        """
+        Пересчитывает результаты для затронутых месяцев: данные домашней страницы
+        на последний день месяца с данными и отчёты, окно которых включает месяц.
+
+        Args:
+            months: Затронутые месяцы
+            anomalies: Необычные операции среди новых
+
+        Returns:
+            Список записанных файлов
+        """
+        df = self.store.df
+        if df.empty:
+            return []
+        last_date = df['date'].max()
+        last_month = last_date.to_period('M')
+        market = self.market if self.market is not None else get_market_snapshot()
+        written = []
+
+        home_months = sorted(months)
+        report_months = sorted({month + shift for month in months for shift in range(REPORT_MONTHS)
+                                if month + shift <= last_month})
+        for month in sorted(set(home_months) | set(report_months)):
+            date_str = min(month.end_time, last_date).strftime('%Y-%m-%d')
+            if month in months:
+                path = os.path.join(self.output_dir, 'home', f"{month}.ndjson")
+                write_payloads(path, self.store.dataset_path, generate_home_history(df, [date_str], market=market))
+                written.append(path)
+            if month in report_months:
+                directory = os.path.join(self.output_dir, 'reports', str(month))
+                os.makedirs(directory, exist_ok=True)
+                # Отчёты считаются по таблицам и данным в памяти, без чтения набора данных
+                start_date, end_date = report_window(f"{date_str} 23:59:59")
+                for report, name in (('spending_by_weekday', 'weekly_spending.csv'),
+                                     ('spending_by_workday', 'workday_spending.csv')):
+                    path = os.path.join(directory, name)
+                    finalize = PARTIAL_REPORTS[report][1]
+                    finalize(report_partial(report, df, self.store.rollups, start_date, end_date)).to_csv(
+                        path, index=False)
+                    written.append(path)
+
+        flagged = [frame for frame in anomalies if not frame.empty]
+        if flagged:
+            path = os.path.join(self.output_dir, 'anomalies.csv')
+            pd.concat(flagged).to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+            written.append(path)
+
+        if self.budgets is not None:
+            path = os.path.join(self.output_dir, 'budgets.csv')
+            self.store.budgets.evaluate(self.budgets).to_csv(path, index=False)
+            written.append(path)
+
+        logger.info(f"Обновлено файлов результатов: {len(written)} (месяцев: {len(home_months)})")
+        return written
+
+
+def watch_main() -> None:
+    """
+    Точка входа режима наблюдения за каталогом.
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description='Наблюдение за каталогом выгрузок')
+    parser.add_argument('directory', help='Каталог, куда попадают выгрузки (.csv, .xlsx)')
+    parser.add_argument('--output', default='output', help='Каталог результатов')
+    parser.add_argument('--state', default=None, help='Каталог состояния (по умолчанию OUTPUT/state)')
+    parser.add_argument('--workers', type=int, default=2, help='Число процессов разбора')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE,
+                        help='Секунд без изменений перед обработкой файла')
+    parser.add_argument('--poll', action='store_true', help='Опрос каталога вместо watchdog')
+    parser.add_argument('--budgets', default=None, help='Бюджеты: CSV со столбцами category, limit')
+    args = parser.parse_args()
+
+    budgets = pd.read_csv(args.budgets) if args.budgets else None
+    FolderWatcher(args.directory, args.output, args.state, max_workers=args.workers, debounce=args.debounce,
+                  use_watchdog=not args.poll, budgets=budgets).run()
+
+
+if __name__ == '__main__':
+    watch_main()
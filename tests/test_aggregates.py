@@ -0,0 +1,68 @@
+import gc
+import weakref
+import pandas as pd
+from unittest.mock import patch
+from src.aggregates import (
+    MonthToDateAggregator,
+    month_to_date_block,
+    clear_aggregates_cache,
+    _cached_home_block,
+)
+from src.main import generate_home_data
+
+
+def make_transactions():
+    """Тестовые транзакции за два месяца по двум картам"""
+    return pd.DataFrame({
+        'date': pd.to_datetime([
+            '2023-01-01 00:00:00', '2023-01-02 10:00:00', '2023-01-03 12:00:00',
+            '2023-01-05 00:00:00', '2023-01-05 09:00:00', '2023-02-01 08:00:00',
+        ]),
+        'amount': [-100.0, 500.0, -300.0, -50.0, -20.0, -70.0],
+        'card_last_digits': ['*5678', '*1234', '*1234', '*5678', None, '*1234'],
+        'category': ['food', 'salary', 'food', 'taxi', 'food', 'food'],
+        'description': ['a', 'b', 'c', 'd', 'e', 'f'],
+    })
+
+
+@patch('src.main.get_stock_prices', return_value=[])
+@patch('src.main.get_currency_rates', return_value=[])
+def test_aggregator_matches_generate_home_data(mock_rates, mock_stocks):
+    """Тест совпадения предрасчитанных агрегатов с прямым расчетом"""
+    df = make_transactions()
+    aggregator = MonthToDateAggregator(df)
+
+    for day in pd.date_range('2022-12-31', '2023-02-02'):
+        date_str = day.strftime('%Y-%m-%d')
+        expected = generate_home_data(df, date_str)
+        block = aggregator.home_block(date_str)
+        assert block['cards'] == expected['cards'], date_str
+        assert block['top_transactions'] == expected['top_transactions'], date_str
+
+
+def test_month_to_date_block_cache():
+    """Тест LRU-кеша по (отпечаток данных, дата)"""
+    clear_aggregates_cache()
+    df = make_transactions()
+
+    first = month_to_date_block(df, '2023-01-05')
+    first['cards'].clear()  # Изменение результата не должно портить кеш
+    second = month_to_date_block(df.copy(), '2023-01-05')
+
+    assert len(second['cards']) == 2
+    assert _cached_home_block.cache_info().hits == 1
+
+
+def test_in_place_edit_gives_fresh_block():
+    """Тест: после изменения DataFrame на месте блок считается заново, агрегатор не держит DataFrame"""
+    clear_aggregates_cache()
+    df = make_transactions()
+    assert month_to_date_block(df, '2023-01-04')['cards'][0]['total_spent'] == 100.0
+
+    df.loc[0, 'amount'] = -1000.0
+    assert month_to_date_block(df, '2023-01-04')['cards'][0]['total_spent'] == 1000.0
+
+    ref = weakref.ref(df)
+    del df
+    gc.collect()
+    assert ref() is None
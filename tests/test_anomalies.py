@@ -0,0 +1,64 @@
+import pytest
+import pandas as pd
+from src.anomalies import AnomalyScorer, detect_anomalies
+
+
+@pytest.fixture
+def history():
+    """Фикстура: месяц обычных трат по карте в кафе днем"""
+    dates = pd.date_range('2023-01-01 13:00', periods=30, freq='D')
+    return pd.DataFrame({
+        'date': dates,
+        'card_last_digits': '*1234',
+        'status': 'OK',
+        'amount': [-300.0, -320.0, -280.0, -310.0, -290.0] * 6,
+        'category': 'Кафе',
+        'mcc': 5814,
+        'description': 'Кофейня'
+    })
+
+
+@pytest.fixture
+def new_day():
+    """Фикстура: обычная трата, крупная трата, ночная трата, новый MCC и доход"""
+    return pd.DataFrame({
+        'date': pd.to_datetime(['2023-01-31 13:10', '2023-01-31 13:30', '2023-01-31 03:00',
+                                '2023-01-31 14:00', '2023-01-31 15:00']),
+        'card_last_digits': '*1234',
+        'status': 'OK',
+        'amount': [-305.0, -5000.0, -300.0, -300.0, 10000.0],
+        'category': ['Кафе', 'Кафе', 'Кафе', 'Кафе', 'Пополнения'],
+        'mcc': [5814, 5814, 5814, 7995, None],
+        'description': ['Кофейня', 'Кофейня', 'Кофейня', 'Казино', 'Зарплата']
+    }, index=[100, 101, 102, 103, 104])
+
+
+def test_score_flags(history, new_day):
+    """Тест: каждая аномалия получает свой флаг, обычная трата и доход - нет"""
+    scores = AnomalyScorer(window_days=60).update(history).score(new_day)
+
+    assert list(scores.index) == list(new_day.index)
+    assert scores['anomaly'].tolist() == [False, True, True, True, False]
+    assert scores.loc[101, 'unusual_amount']
+    assert scores.loc[102, 'unusual_hour'] and not scores.loc[102, 'unusual_amount']
+    assert scores.loc[103, 'unusual_mcc']
+    assert pd.isna(scores.loc[104, 'amount_score'])
+
+
+def test_incremental_update_matches_full(history, new_day):
+    """Тест: базовые линии по частям совпадают с построенными сразу по всей истории"""
+    incremental = AnomalyScorer(window_days=10)
+    for _, part in history.groupby(history['date'].dt.day // 7):
+        incremental.update(part)
+    full = AnomalyScorer(window_days=10).update(history)
+
+    assert len(incremental) == len(full) == 10
+    pd.testing.assert_frame_equal(incremental.score(new_day), full.score(new_day))
+
+
+def test_detect_anomalies(history, new_day):
+    """Тест поиска необычных операций за день"""
+    result = detect_anomalies(pd.concat([history, new_day]), '2023-01-31', window_days=60)
+
+    assert list(result.index) == [101, 102, 103]
+    assert 'amount_score' in result.columns
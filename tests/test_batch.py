@@ -0,0 +1,86 @@
+import json
+import src.batch
+from src.batch import read_manifest, run_batch
+
+MARKET = {'currency_rates': [{'currency': 'USD', 'rate': 75.5}], 'stock_prices': []}
+
+CSV_HEADER = 'Дата операции,Номер карты,Сумма операции,Категория,Описание\n'
+
+
+def write_export(path):
+    """Записывает маленькую выгрузку в формате Тинькофф"""
+    path.write_text(
+        CSV_HEADER +
+        '02.01.2023 10:00:00,*1234,"-100,00",Кафе,Кофейня\n'
+        '03.01.2023 11:00:00,*1234,"-50,00",Такси,Яндекс\n',
+        encoding='utf-8'
+    )
+
+
+def test_read_manifest_ndjson(tmp_path):
+    """Тест чтения манифеста в формате NDJSON"""
+    manifest = tmp_path / 'manifest.ndjson'
+    manifest.write_text(
+        json.dumps({'file': 'a.csv', 'dates': ['2023-01-02', '2023-01-03'], 'output': 'a.ndjson'}) + '\n' +
+        json.dumps({'id': 'b', 'file': 'b.csv', 'dates': '2023-01-05', 'output': 'b.ndjson'}) + '\n',
+        encoding='utf-8'
+    )
+
+    entries = read_manifest(str(manifest))
+
+    assert entries[0]['id'] == 'a.csv|a.ndjson'
+    assert entries[0]['dates'] == ['2023-01-02', '2023-01-03']
+    assert entries[1]['id'] == 'b'
+    assert entries[1]['dates'] == ['2023-01-05']
+
+
+def test_run_batch_and_resume(tmp_path):
+    """Тест пакетной обработки, учета ошибок и продолжения после сбоя"""
+    write_export(tmp_path / 'user1.csv')
+    out = tmp_path / 'out' / 'user1.ndjson'
+    manifest = tmp_path / 'manifest.csv'
+    manifest.write_text(
+        'file,dates,output\n'
+        f'{tmp_path / "user1.csv"},2023-01-03;2023-01-04,{out}\n'
+        f'{tmp_path / "missing.csv"},2023-01-03,{tmp_path / "out" / "missing.ndjson"}\n',
+        encoding='utf-8'
+    )
+
+    summary = run_batch(str(manifest), max_workers=1, market=MARKET)
+
+    assert summary['succeeded'] == 1
+    assert summary['failed'] == 1
+    assert summary['payloads'] == 2
+    lines = [json.loads(line) for line in out.read_text(encoding='utf-8').splitlines()]
+    assert [line['date'] for line in lines] == ['2023-01-03', '2023-01-04']
+    assert lines[1]['payload']['cards'][0]['total_spent'] == 150.0
+    assert lines[1]['payload']['currency_rates'] == MARKET['currency_rates']
+
+    resumed = run_batch(str(manifest), max_workers=1, market=MARKET)
+
+    assert resumed['skipped'] == 1
+    assert resumed['succeeded'] == 0
+    assert resumed['failed'] == 1
+
+
+def test_run_batch_groups_entries_by_file(tmp_path, monkeypatch):
+    """Тест: задания по одной выгрузке выполняются одной группой"""
+    write_export(tmp_path / 'user1.csv')
+    write_export(tmp_path / 'user2.csv')
+    manifest = tmp_path / 'manifest.csv'
+    manifest.write_text(
+        'file,dates,output\n'
+        f'{tmp_path / "user1.csv"},2023-01-03,{tmp_path / "out" / "a.ndjson"}\n'
+        f'{tmp_path / "user2.csv"},2023-01-03,{tmp_path / "out" / "b.ndjson"}\n'
+        f'{tmp_path / "user1.csv"},2023-01-04,{tmp_path / "out" / "c.ndjson"}\n',
+        encoding='utf-8'
+    )
+    groups = []
+    process_group = src.batch.process_group
+    monkeypatch.setattr(src.batch, 'process_group', lambda entries: groups.append(entries) or process_group(entries))
+
+    summary = run_batch(str(manifest), max_workers=1, market=MARKET)
+
+    assert summary['succeeded'] == 3
+    assert sorted(len(group) for group in groups) == [1, 2]
+    assert {entry['file'] for entry in max(groups, key=len)} == {str(tmp_path / 'user1.csv')}
@@ -0,0 +1,73 @@
+import pytest
+import pandas as pd
+from src.budgets import BudgetTracker, evaluate_budgets
+
+
+@pytest.fixture
+def transactions():
+    """Фикстура с тратами двух пользователей"""
+    return pd.DataFrame({
+        'user': ['anna', 'anna', 'anna', 'anna', 'boris', 'boris'],
+        'date': pd.to_datetime(['2023-04-01', '2023-04-05', '2023-04-10', '2023-03-31',
+                                '2023-04-02', '2023-04-03']),
+        'amount': [-1000.0, -500.0, 20000.0, -700.0, -3000.0, -100.1],
+        'category': ['Продукты', 'Продукты', 'Зарплата', 'Продукты', 'Такси', 'Продукты'],
+    })
+
+
+def test_evaluate_budgets(transactions):
+    """Тест процента использования, прогноза и статуса по пользователям"""
+    budgets = pd.DataFrame({
+        'user': ['anna', 'boris', 'boris', 'anna'],
+        'category': ['Продукты', 'Такси', 'Продукты', 'Продукты'],
+        'limit': [4000.0, 2000.0, 1000.0, 1000.0],
+        'month': [None, None, None, '2023-03'],
+    })
+
+    result = evaluate_budgets(transactions, budgets, as_of='2023-04-10')
+
+    assert result['month'].tolist() == ['2023-04', '2023-04', '2023-04', '2023-03']
+    assert result['spent'].tolist() == [1500.0, 3000.0, 100.1, 700.0]
+    assert result['percent_used'].tolist() == [37.5, 150.0, 10.0, 70.0]
+    # 1500 за 10 дней -> 150 в день -> 4500 за 30 дней апреля
+    assert result.loc[0, 'forecast'] == 4500.0
+    assert result.loc[0, 'projected_overspend'] == 500.0
+    # Прошедший месяц: прогноз равен фактическим тратам
+    assert result.loc[3, 'forecast'] == 700.0
+    assert result['status'].tolist() == ['at_risk', 'over', 'ok', 'ok']
+
+
+def test_incremental_update(transactions):
+    """Тест: суммы по частям совпадают с суммами по всем данным сразу"""
+    tracker = BudgetTracker()
+    for _, part in transactions.groupby(transactions.index % 3):
+        tracker.update(part)
+    full = BudgetTracker().update(transactions)
+
+    key = ['user', 'month', 'category']
+    pd.testing.assert_frame_equal(
+        tracker.totals().sort_values(key).reset_index(drop=True),
+        full.totals().sort_values(key).reset_index(drop=True)
+    )
+
+
+def test_default_date_is_last_operation(transactions):
+    """Тест: без даты оценки берется месяц последней операции пользователя"""
+    tracker = BudgetTracker().update(transactions.drop(columns='user'), user='anna')
+
+    result = tracker.evaluate([{'category': 'Продукты', 'limit': 2000.0}], user='anna')
+
+    assert result.loc[0, 'user'] == 'anna'
+    assert result.loc[0, 'month'] == '2023-04'
+    assert result.loc[0, 'spent'] == 1600.1
+
+
+def test_categories_match_ignoring_case_and_spaces(transactions):
+    """Тест: категории бюджета и трат сопоставляются без учета регистра и пробелов"""
+    transactions.loc[1, 'category'] = ' продукты '
+    budgets = [{'user': 'anna', 'category': 'ПРОДУКТЫ ', 'limit': 4000.0}]
+
+    result = evaluate_budgets(transactions, budgets, as_of='2023-04-10')
+
+    assert result['spent'].tolist() == [1500.0]
+    assert result['category'].tolist() == ['ПРОДУКТЫ ']
@@ -0,0 +1,125 @@
+import os
+import pytest
+import pandas as pd
+from datetime import datetime
+from unittest.mock import patch
+
+import src.reports
+from src.cache import ResultCache, call_key, get_result_cache, set_data_version, set_result_cache
+from src.reports import spending_by_weekday
+from src.services import analyze_cashback_categories, investment_bank
+
+
+@pytest.fixture
+def cache():
+    """Фикстура: отдельный кеш результатов на время теста"""
+    previous = get_result_cache()
+    cache = ResultCache()
+    set_result_cache(cache)
+    yield cache
+    set_result_cache(previous)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    """Фикстура: выгрузка операций в CSV"""
+    path = tmp_path / 'operations.csv'
+    pd.DataFrame({
+        'Дата операции': ['01.02.2023 10:00:00', '02.02.2023 11:30:00', '04.02.2023 09:15:00'],
+        'Статус': ['OK'] * 3,
+        'Сумма операции': ['-100,5', '-20', '-300'],
+        'Категория': ['Кафе', 'Такси', 'Кафе'],
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def test_report_is_memoized_by_content(cache, csv_path):
+    """Тест: повторный отчёт берется из кеша, изменение файла сбрасывает результат"""
+    with patch('src.reports.load_transactions', wraps=src.reports.load_transactions) as mock_load:
+        first = spending_by_weekday(csv_path, date='2023-02-28', skip_save=True)
+        second = spending_by_weekday(csv_path, date='2023-02-28 00:00:00', skip_save=True)
+        assert mock_load.call_count == 1
+        pd.testing.assert_frame_equal(first, second)
+
+        with open(csv_path, 'a', encoding='utf-8') as f:
+            f.write('05.02.2023 12:00:00,OK,"-50",Кафе\n')
+        spending_by_weekday(csv_path, date='2023-02-28', skip_save=True)
+        assert mock_load.call_count == 2
+
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+
+def test_unchanged_report_is_not_rewritten(cache, csv_path, tmp_path):
+    """Тест: выходной файл не перезаписывается, если результат не изменился"""
+    output = str(tmp_path / 'weekly.csv')
+    spending_by_weekday(csv_path, date='2023-02-28', filename=output)
+    written = os.stat(output).st_mtime_ns
+
+    spending_by_weekday(csv_path, date='2023-02-28', filename=output)
+
+    assert os.stat(output).st_mtime_ns == written
+    assert cache.stats()['hits'] == 1
+
+
+def test_current_date_is_not_cached(csv_path):
+    """Тест: отчёт без даты зависит от текущего момента и не кешируется"""
+    assert call_key(spending_by_weekday.__wrapped__, 'file_path', (csv_path,), {}) is None
+    assert call_key(spending_by_weekday.__wrapped__, 'file_path', (csv_path,), {'date': '2023-02-28'})
+
+
+def test_service_is_memoized(cache):
+    """Тест: сервис с той же версией данных и аргументами не пересчитывается"""
+    data = [{'date': datetime(2023, 1, 1), 'amount': -123}, {'date': datetime(2023, 1, 2), 'amount': -456}]
+    df = pd.DataFrame(data)
+    set_data_version(df, 'v1')
+
+    assert investment_bank('2023-01', df, 100) == 121.0
+    assert investment_bank('2023-01', df, limit=100) == 121.0
+    assert investment_bank('2023-01', df, 50) == 71.0
+
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+
+def test_unversioned_data_is_not_cached(cache):
+    """Тест: данные в памяти без версии не хешируются и не кешируются"""
+    data = [{'date': datetime(2023, 1, 1), 'amount': -123}]
+
+    assert investment_bank('2023-01', data, 100) == 77.0
+    assert investment_bank('2023-01', pd.DataFrame(data), 100) == 77.0
+
+    assert cache.stats()['hits'] + cache.stats()['misses'] == 0
+
+
+def test_in_place_edit_invalidates_result(cache):
+    """Тест: после изменения DataFrame на месте и новой версии результат пересчитывается"""
+    df = pd.DataFrame({
+        'date': [datetime(2023, 1, 5), datetime(2023, 1, 7)],
+        'amount': [-100.0, -200.0],
+        'category': ['Кафе', 'Такси'],
+        'status': ['OK', 'OK'],
+    })
+    set_data_version(df, 1)
+    assert analyze_cashback_categories(df, 2023, 1) == {'Такси': 10.0, 'Кафе': 5.0}
+
+    df.loc[0, 'amount'] = -5000.0
+    set_data_version(df, 2)
+    assert analyze_cashback_categories(df, 2023, 1) == {'Кафе': 250.0, 'Такси': 10.0}
+    assert cache.stats()['hits'] == 0
+
+
+def test_size_eviction_and_disk_tier(tmp_path):
+    """Тест: память ограничена по размеру, вытесненное читается с диска"""
+    frames = [pd.DataFrame({'value': range(1000)}) + i for i in range(3)]
+    limit = int(frames[0].memory_usage(deep=True).sum() * 2)
+    cache = ResultCache(max_bytes=limit, directory=str(tmp_path / 'cache'))
+    for i, frame in enumerate(frames):
+        cache.put(f'key{i}', frame)
+
+    assert cache.stats()['entries'] == 2
+    assert cache.stats()['evictions'] == 1
+
+    restored = ResultCache(directory=str(tmp_path / 'cache')).get('key0')
+    pd.testing.assert_frame_equal(restored, frames[0])
+    assert not cache.contains(cache.get('missing'))
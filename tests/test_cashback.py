@@ -0,0 +1,96 @@
+import json
+import pytest
+import pandas as pd
+from src.cashback import CashbackRules, load_cashback_rules
+from src.services import analyze_cashback_categories
+
+RULES = {
+    'default_rate': 0.01,
+    'exclude_categories': ['Переводы'],
+    'exclude_mcc': [6011],
+    'exclude_statuses': ['FAILED'],
+    'rules': [
+        {'name': 'Рестораны', 'rate': 0.05, 'categories': ['Рестораны'], 'mcc_ranges': [[5811, 5814]],
+         'min_amount': 100, 'monthly_cap': 60},
+        {'name': 'АЗС', 'rate': 0.03, 'mcc': [5541, 5812]},
+    ]
+}
+
+
+@pytest.fixture
+def transactions():
+    """Фикстура с тратами по двум картам в двух месяцах"""
+    return pd.DataFrame({
+        'date': pd.to_datetime(['2023-01-05', '2023-01-03', '2023-01-10', '2023-01-12', '2023-01-15',
+                                '2023-01-16', '2023-01-17', '2023-01-18', '2023-02-01', '2023-01-20']),
+        'card_last_digits': ['*1', '*1', '*1', '*2', '*1', '*1', '*1', '*1', '*1', '*1'],
+        'status': ['OK'] * 9 + ['FAILED'],
+        'amount': [-1000.0, -500.0, -50.0, -1000.0, -2000.0, -1000.0, -700.0, 3000.0, -1000.0, -1000.0],
+        'category': ['Рестораны', 'Фастфуд', 'Рестораны', 'Рестораны', 'Топливо',
+                     'Переводы', 'Наличные', 'Пополнения', 'Рестораны', 'Рестораны'],
+        'mcc': [5812, 5814, 5812, 5812, 5541, 4829, 6011, None, 5812, 5812],
+    })
+
+
+def test_evaluate_rules(transactions):
+    """Тест: первое подходящее правило, минимальная сумма, лимит и исключения"""
+    result = CashbackRules.from_dict(RULES).evaluate(transactions)
+
+    assert list(result.index) == list(transactions.index)
+    # 03.01: 5% от 500 = 25, 05.01: 5% от 1000 = 50, но лимит 60 оставляет 35
+    assert result['cashback'].tolist() == [35.0, 25.0, 0.5, 50.0, 60.0, 0.0, 0.0, 0.0, 50.0, 0.0]
+    assert result['rule'].tolist() == ['Рестораны', 'Рестораны', None, 'Рестораны', 'АЗС',
+                                       None, None, None, 'Рестораны', None]
+    assert result.loc[2, 'rate'] == 0.01  # меньше min_amount - ставка по умолчанию
+
+
+def test_default_rules_match_calculate_cashback(transactions):
+    """Тест: набор по умолчанию дает 1% от трат"""
+    result = CashbackRules().evaluate(transactions)
+    spent = -transactions['amount'].clip(upper=0)
+
+    assert result['cashback'].round(2).tolist() == (spent * 0.01).round(2).tolist()
+
+
+def test_monthly_cap_for_card():
+    """Тест общего месячного лимита по карте"""
+    df = pd.DataFrame({
+        'date': pd.date_range('2023-01-01', periods=4, freq='12D'),
+        'card_last_digits': '*1',
+        'amount': [-3000.0, -3000.0, -3000.0, -3000.0],
+    })
+    result = CashbackRules(monthly_cap=50).evaluate(df)
+
+    assert result['cashback'].tolist() == [30.0, 20.0, 0.0, 30.0]
+
+
+def test_invalid_rule():
+    """Тест: правило без условий и ставка больше 1 отклоняются"""
+    with pytest.raises(ValueError):
+        CashbackRules([{'name': 'Все', 'rate': 0.1}])
+    with pytest.raises(ValueError):
+        CashbackRules([{'name': 'Ошибка', 'rate': 5, 'categories': ['Рестораны']}])
+
+
+def test_load_rules_from_files(tmp_path, transactions):
+    """Тест загрузки правил из JSON и YAML"""
+    json_path = tmp_path / 'rules.json'
+    json_path.write_text(json.dumps(RULES, ensure_ascii=False), encoding='utf-8')
+    yaml = pytest.importorskip('yaml')
+    yaml_path = tmp_path / 'rules.yaml'
+    yaml_path.write_text(yaml.safe_dump(RULES, allow_unicode=True), encoding='utf-8')
+
+    from_json = load_cashback_rules(str(json_path))
+    from_yaml = load_cashback_rules(str(yaml_path))
+
+    assert from_json.fingerprint == from_yaml.fingerprint
+    pd.testing.assert_frame_equal(from_json.evaluate(transactions), from_yaml.evaluate(transactions))
+
+
+def test_analyze_cashback_categories_with_rules(transactions):
+    """Тест анализа категорий по правилам кешбэка"""
+    result = analyze_cashback_categories(transactions, 2023, 1, rules=CashbackRules.from_dict(RULES))
+
+    assert result['Рестораны'] == 85.5
+    assert result['Топливо'] == 60.0
+    assert result['Переводы'] == 0.0
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime
+
+from src.cohorts import CohortMatrix, PercentileTables, build_cohort_matrix, monthly_category_totals
+
+
+@pytest.fixture
+def transactions():
+    """Фикстура: 10 пользователей, траты на кафе 100..1000 в месяц за январь и февраль"""
+    rows = []
+    for i in range(10):
+        user = f'user{i}'
+        for month in (1, 2):
+            rows.append((user, datetime(2024, month, 10), -100.0 * (i + 1), 'Кафе', 'OK'))
+        rows.append((user, datetime(2024, 1, 5), -50.0, 'Такси' if i < 5 else None, 'OK'))
+    rows.append(('user0', datetime(2024, 1, 6), -10_000.0, 'Кафе', 'FAILED'))
+    rows.append(('user0', datetime(2024, 1, 7), 5000.0, 'Пополнения', 'OK'))
+    return pd.DataFrame(rows, columns=['user', 'date', 'amount', 'category', 'status'])
+
+
+def test_matrix_from_transactions(transactions):
+    """Тест: матрица пользователи × категории × месяцы без доходов и неуспешных операций"""
+    matrix = CohortMatrix.from_transactions(transactions)
+
+    assert matrix.values.shape == (10, 3, 2)
+    assert matrix.categories == ['Без категории', 'Кафе', 'Такси']
+    assert matrix.months == ['2024-01', '2024-02']
+    row = matrix.values[matrix.user_index('user0')]
+    assert row[1].tolist() == [100.0, 100.0]
+    assert row[2].tolist() == [50.0, 0.0]
+    assert matrix.average()[matrix.user_index('user9')].tolist() == [25.0, 1000.0, 0.0]
+
+
+def test_rank_matches_table(transactions):
+    """Тест: процентили одним поиском по всем категориям, в том числе для многих пользователей"""
+    tables = PercentileTables(CohortMatrix.from_transactions(transactions))
+    cafe = tables.tables['all'][:, 1]
+
+    ranks = tables.rank(np.array([[0.0, 0.0, 0.0], [0.0, 550.0, 50.0], [0.0, 5000.0, 0.0]]))
+    assert ranks[0].tolist() == [0.0, 0.0, 0.0]
+    assert ranks[1, 1] == 50.0 and np.interp(50, tables.percentiles, cafe) == 550.0
+    assert ranks[1, 2] == 100.0
+    assert ranks[2, 1] == 100.0
+
+    # Один пользователь и все пользователи сразу дают одинаковые ранги
+    everyone = tables.rank_all()
+    assert everyone.loc['user3'].tolist() == tables.rank(tables.averages[3]).tolist()
+    assert everyone['Кафе'].is_monotonic_increasing
+
+
+def test_compare_user_and_cohorts(transactions):
+    """Тест: сравнение пользователя идет со своей когортой"""
+    cohorts = {f'user{i}': 'young' if i < 5 else 'senior' for i in range(10)}
+    matrix = CohortMatrix.from_transactions(transactions, cohorts=cohorts)
+    tables = PercentileTables(matrix, months=['2024-01'])
+
+    assert tables.sizes == {'senior': 5, 'young': 5}
+    result = tables.compare_user('user4')
+    cafe = result.set_index('category').loc['Кафе']
+    assert (cafe['spent'], cafe['percentile'], cafe['cohort_median']) == (500.0, 100.0, 300.0)
+    with pytest.raises(KeyError):
+        tables.compare_user('nobody')
+    with pytest.raises(KeyError):
+        tables.rank(np.zeros(3), 'unknown')
+
+
+def test_build_from_files_and_save(transactions, tmp_path):
+    """Тест: матрица из файлов пользователей совпадает с матрицей из одной таблицы, сохраняется в .npz"""
+    for user, group in transactions.groupby('user'):
+        pd.DataFrame({
+            'Дата операции': group['date'].dt.strftime('%d.%m.%Y %H:%M:%S'),
+            'Номер карты': '*7197',
+            'Статус': group['status'],
+            'Сумма операции': group['amount'].map(lambda value: f'{value:.2f}'.replace('.', ',')),
+            'Категория': group['category'],
+            'Описание': 'Покупка',
+        }).to_csv(tmp_path / f'{user}.csv', index=False)
+
+    matrix = build_cohort_matrix(str(tmp_path), max_workers=1)
+    expected = CohortMatrix.from_transactions(transactions)
+    order = [matrix.user_index(user) for user in expected.users]
+    assert matrix.categories == expected.categories
+    assert np.array_equal(matrix.values[order], expected.values)
+
+    matrix.save(str(tmp_path / 'cohorts.npz'))
+    loaded = CohortMatrix.load(str(tmp_path / 'cohorts.npz'))
+    assert loaded.users.tolist() == matrix.users.tolist()
+    assert np.array_equal(loaded.values, matrix.values)
+    with pytest.raises(FileNotFoundError):
+        build_cohort_matrix(str(tmp_path / 'missing'))
+
+
+def test_build_skips_broken_files(transactions, tmp_path):
+    """Тест: выгрузка с ошибкой пропускается, остальные пользователи попадают в матрицу"""
+    for user in ('user0', 'user1'):
+        group = transactions[transactions['user'] == user]
+        pd.DataFrame({
+            'Дата операции': group['date'].dt.strftime('%d.%m.%Y %H:%M:%S'),
+            'Номер карты': '*7197',
+            'Статус': group['status'],
+            'Сумма операции': group['amount'].map(lambda value: f'{value:.2f}'.replace('.', ',')),
+            'Категория': group['category'],
+            'Описание': 'Покупка',
+        }).to_csv(tmp_path / f'{user}.csv', index=False)
+    (tmp_path / 'broken.csv').write_text('нет нужных столбцов\n1\n', encoding='utf-8')
+
+    matrix = build_cohort_matrix(str(tmp_path), max_workers=1)
+    assert sorted(matrix.users.tolist()) == ['user0', 'user1']
+    assert list(matrix.skipped) == ['broken']
+
+    with pytest.raises(ValueError):
+        build_cohort_matrix([str(tmp_path / 'broken.csv')])
+
+
+def test_totals_without_user_column(transactions):
+    """Тест: выгрузка одного пользователя без столбца user"""
+    totals = monthly_category_totals(transactions.drop(columns='user'))
+    assert totals.loc[('all', 'Кафе', '2024-02')] == 5500.0
@@ -0,0 +1,55 @@
+import pytest
+import pandas as pd
+from datetime import datetime
+
+from src.comparison import compare_periods
+
+
+@pytest.fixture
+def transactions():
+    """Фикстура с тратами за март и февраль 2024 и март 2023"""
+    rows = [
+        (datetime(2024, 3, 5), -300.0, 'Кафе', '*1111'),
+        (datetime(2024, 3, 9), -100.0, 'Кафе', '*1111'),
+        (datetime(2024, 2, 7), -200.0, 'Кафе', '*1111'),
+        (datetime(2024, 3, 1), -50.0, 'Такси', '*2222'),
+        (datetime(2024, 2, 1), -250.0, 'Такси', '*2222'),
+        (datetime(2023, 3, 15), -400.0, 'Кафе', '*1111'),
+        (datetime(2024, 2, 20), -80.0, 'Кино', '*1111'),
+        (datetime(2024, 3, 20), 5000.0, 'Пополнения', '*1111'),
+    ]
+    return pd.DataFrame(rows, columns=['date', 'amount', 'category', 'card_last_digits'])
+
+
+def test_month_over_month(transactions):
+    """Тест: разница, процент и вклад в изменение по каждой паре категория × карта"""
+    result = compare_periods(transactions, '2024-03', comparisons=['mom'])
+
+    assert result['category'].tolist() == ['Кафе', 'Такси', 'Кино']
+    kafe = result.set_index('category').loc['Кафе']
+    assert (kafe['current'], kafe['previous'], kafe['delta']) == (400.0, 200.0, 200.0)
+    assert kafe['pct_change'] == 100.0
+    # Общее изменение: 200 - 200 - 80 = -80
+    assert kafe['contribution'] == -250.0
+    assert result['contribution'].sum() == pytest.approx(100.0)
+    assert result['base_period'].unique().tolist() == ['2024-02']
+
+
+def test_year_over_year_and_default_month(transactions):
+    """Тест: по умолчанию - последний месяц с тратами, новые ключи без процента"""
+    result = compare_periods(transactions, by='category')
+    yoy = result[result['comparison'] == 'yoy'].set_index('category')
+
+    assert result['period'].unique().tolist() == ['2024-03']
+    assert yoy.loc['Кафе', 'delta'] == 0.0
+    assert yoy.loc['Кафе', 'pct_change'] == 0.0
+    assert yoy.loc['Такси', 'previous'] == 0.0
+    assert pd.isna(yoy.loc['Такси', 'pct_change'])
+    assert 'Пополнения' not in result['category'].tolist()
+
+
+def test_unknown_comparison(transactions):
+    """Тест: неизвестное сравнение"""
+    with pytest.raises(ValueError):
+        compare_periods(transactions, comparisons=['wow'])
+    assert compare_periods(transactions.iloc[:0]).empty
@@ -0,0 +1,50 @@
+import pickle
+import pytest
+import pandas as pd
+from src.dataset import open_dataset, write_dataset
+from src.utils import load_transactions
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def dataset_path(tmp_path):
+    """Фикстура с набором данных Arrow из неотсортированных транзакций"""
+    df = pd.DataFrame({
+        'date': pd.to_datetime(['2024-02-10', '2024-01-05', '2024-03-01', '2024-01-20']),
+        'amount': [-200.0, -100.0, -300.0, 50.0],
+        'category': ['food', 'taxi', 'food', 'salary'],
+        'mcc': [5411, '4121', None, 6011],  # Смешанные типы сохраняются строками
+    })
+    path = tmp_path / 'transactions.arrow'
+    write_dataset(df, str(path))
+    return str(path)
+
+
+def test_open_and_slice_dates(dataset_path):
+    """Тест открытия набора и выбора диапазона дат"""
+    dataset = open_dataset(dataset_path)
+
+    assert len(dataset) == 4
+    january = dataset.slice_dates('2024-01-01', '2024-01-31').select(['date', 'amount']).to_pandas()
+    assert list(january.columns) == ['date', 'amount']
+    assert january['amount'].tolist() == [-100.0, 50.0]
+    assert [len(part) for part in dataset.month_slices()] == [2, 1, 1]
+
+
+def test_pickle_reopens_slice(dataset_path):
+    """Тест: выборка передается между процессами как ссылка на файл"""
+    february = open_dataset(dataset_path).slice_dates('2024-02-01', '2024-02-29')
+
+    restored = pickle.loads(pickle.dumps(february))
+
+    assert restored.path == dataset_path
+    assert restored.to_pandas().equals(february.to_pandas())
+
+
+def test_load_transactions_from_dataset(dataset_path):
+    """Тест загрузки набора данных через load_transactions"""
+    df = load_transactions(dataset_path)
+
+    assert df['date'].is_monotonic_increasing
+    assert df['mcc'].tolist()[:2] == ['4121', '6011']
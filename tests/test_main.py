@@ -2,7 +2,7 @@ import pytest
 from unittest.mock import patch, MagicMock
 from datetime import datetime
 import pandas as pd
-from src.main import main_function, get_greeting, generate_home_data
+from src.main import main_function, get_greeting, generate_home_data, generate_home_history
 
 
 def test_get_greeting():
@@ -47,6 +47,8 @@ def test_main_function_success(mock_print, mock_generate, mock_load, mock_parse_
     mock_args = MagicMock()
     mock_args.file = 'test.csv'
     mock_args.date = '2023-01-01'
+    mock_args.profile = None
+    mock_args.metrics_json = None
     mock_parse_args.return_value = mock_args
 
     # Mock данных
@@ -68,6 +70,8 @@ def test_main_function_file_not_found(mock_load, mock_parse_args):
     mock_args = MagicMock()
     mock_args.file = '/nonexistent/file.csv'
     mock_args.date = '2023-01-01'
+    mock_args.profile = None
+    mock_args.metrics_json = None
     mock_parse_args.return_value = mock_args
 
     # Mock ошибки загрузки
@@ -75,3 +79,26 @@ def test_main_function_file_not_found(mock_load, mock_parse_args):
 
     with pytest.raises(FileNotFoundError):
         main_function()
+
+
+@patch('src.main.get_stock_prices')
+@patch('src.main.get_currency_rates')
+def test_generate_home_history(mock_rates, mock_stocks):
+    """Тест генерации данных за много дат: котировки запрашиваются один раз"""
+    mock_rates.return_value = [{'currency': 'USD', 'rate': 75.5}]
+    mock_stocks.return_value = [{'stock': 'AAPL', 'price': 150.12}]
+    test_df = pd.DataFrame({
+        'date': pd.date_range('2023-01-01', periods=10),
+        'amount': [-100.0] * 10,
+        'card_last_digits': ['1234'] * 10,
+        'category': ['food'] * 10,
+        'description': ['test'] * 10
+    })
+
+    result = generate_home_history(test_df, ['2023-01-03', '2023-01-05'])
+
+    assert result['2023-01-03']['cards'][0]['total_spent'] == 300.0
+    assert result['2023-01-05']['cards'][0]['total_spent'] == 500.0
+    assert result['2023-01-05']['currency_rates'] == mock_rates.return_value
+    mock_rates.assert_called_once()
+    mock_stocks.assert_called_once()
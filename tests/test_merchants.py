@@ -0,0 +1,80 @@
+import json
+import pytest
+import numpy as np
+import pandas as pd
+
+from src.merchants import (MerchantRules, clean_description, load_merchant_rules, match_merchants,
+                           merchant_key, normalize_merchants)
+from src.services import simple_search
+
+
+@pytest.fixture
+def transactions():
+    """Фикстура с разными написаниями одних продавцов и пропущенными категориями"""
+    return pd.DataFrame({
+        'amount': [-100.0, -200.0, -50.0, -70.0, -300.0, -1000.0, -40.0, -500.0],
+        'category': ['Супермаркеты', None, 'Кафе', None, 'Аптеки', None, None, None],
+        'mcc': [5411, 5411, 5814, 5814, 5912, np.nan, 5912, 7011],
+        'description': ['Пятерочка 1234', 'PYATEROCHKA MOSKVA', 'Kofe s sobojj', 'Кофе с собой',
+                        'Apteka 7', 'Снятие в банкомате Сбербанк', 'Аптека Вита', 'OOO Hotel Moskva'],
+    })
+
+
+@pytest.mark.parametrize('first, second', [
+    ('Пятерочка 1234', 'PYATEROCHKA MOSKVA'),
+    ('Rumyanyj Khleb', 'Румяный хлеб'),
+    ('IP Yakubovskaya M. V.', 'IP Yakubovskaya M.V.'),
+    ('Тинькофф Мобайл +7 995 555-55-55', 'Tinkoff Mobajl'),
+])
+def test_spelling_variants_share_key(first, second):
+    """Тест: варианты написания одного продавца дают один ключ"""
+    assert merchant_key(first) == merchant_key(second) != ''
+
+
+def test_clean_description():
+    """Тест: из названия убираются номера, телефоны и организационно-правовая форма"""
+    assert clean_description('OOO "Nord-S"') == ('nords', 'Nord-S')
+    assert clean_description('Cvetprofi_Pechory3')[1] == 'Cvetprofi_Pechory'
+    assert merchant_key(None) == ''
+
+
+def test_normalize_merchants(transactions):
+    """Тест: продавцы объединяются, пропущенные категории заполняются"""
+    result = normalize_merchants(transactions)
+
+    assert result['merchant'].iloc[:2].tolist() == ['Пятёрочка', 'Пятёрочка']
+    assert result['merchant_key'].iloc[2] == result['merchant_key'].iloc[3]
+    # Из истории продавца, правила, истории MCC и таблицы MCC
+    assert result['category'].tolist() == ['Супермаркеты', 'Супермаркеты', 'Кафе', 'Кафе', 'Аптеки',
+                                           'Наличные', 'Аптеки', 'Отели']
+    assert result['merchant'].iloc[7] == 'Hotel'
+    assert transactions['category'].isna().sum() == 5
+
+
+def test_rules_from_file(tmp_path, transactions):
+    """Тест: правила продавцов загружаются из JSON"""
+    path = tmp_path / 'merchants.json'
+    path.write_text(json.dumps({
+        'rules': [{'merchant': 'Кофе с собой', 'patterns': ['кофе с собой'], 'category': 'Фастфуд'}],
+        'mcc_categories': {'7011': 'Путешествия'},
+    }, ensure_ascii=False), encoding='utf-8')
+    rules = load_merchant_rules(str(path))
+
+    result = normalize_merchants(transactions, rules)
+
+    assert result['merchant'].iloc[2] == 'Кофе с собой'
+    assert result['category'].iloc[7] == 'Путешествия'
+    assert rules.fingerprint != MerchantRules().fingerprint
+    with pytest.raises(ValueError):
+        MerchantRules([{'patterns': ['123'], 'category': 'Другое'}])
+
+
+def test_search_by_merchant(transactions):
+    """Тест: поиск находит все написания продавца"""
+    assert match_merchants(transactions['description'], 'пятёрочка').tolist()[:3] == [True, True, False]
+
+    found = simple_search('Пятерочка', transactions)
+    assert found['description'].tolist() == ['Пятерочка 1234', 'PYATEROCHKA MOSKVA']
+
+    records = transactions.to_dict('records')
+    assert simple_search('кофе', records) == records[2:4]
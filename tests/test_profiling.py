@@ -0,0 +1,93 @@
+import json
+from src.profiling import (
+    enable_memory_tracking,
+    measure,
+    timed,
+    get_profile_summary,
+    reset_profile,
+    render_prometheus,
+    save_profile_summary,
+    serve_metrics,
+)
+
+
+def test_measure_records_stage():
+    """Тест замера этапа через контекстный менеджер"""
+    reset_profile()
+    with measure('stage') as info:
+        info['rows'] = 10
+    with measure('stage') as info:
+        info['rows'] = 5
+
+    summary = get_profile_summary()
+    assert summary['stage']['calls'] == 2
+    assert summary['stage']['rows'] == 15
+    assert summary['stage']['total_seconds'] >= 0
+
+
+def test_timed_counts_result_rows():
+    """Тест декоратора timed: число строк берется из длины результата"""
+    reset_profile()
+
+    @timed('make_list')
+    def make_list():
+        return [1, 2, 3]
+
+    assert make_list() == [1, 2, 3]
+    assert get_profile_summary()['make_list']['rows'] == 3
+
+
+def test_timed_skips_rows_for_other_results():
+    """Тест декоратора timed: длина словаря не считается числом строк"""
+    reset_profile()
+
+    @timed('make_dict')
+    def make_dict():
+        return {'a': 1, 'b': 2}
+
+    make_dict()
+    assert get_profile_summary()['make_dict']['rows'] == 0
+
+
+def test_nested_measure_keeps_outer_peak():
+    """Тест: вложенный этап не сбрасывает пик памяти внешнего этапа"""
+    reset_profile()
+    enable_memory_tracking()
+    try:
+        with measure('outer'):
+            data = bytearray(20_000_000)
+            del data
+            with measure('inner'):
+                pass
+    finally:
+        enable_memory_tracking(False)
+
+    summary = get_profile_summary()
+    assert summary['outer']['peak_memory_bytes'] >= 20_000_000
+    assert summary['inner']['peak_memory_bytes'] < 20_000_000
+
+
+def test_render_prometheus_and_json(tmp_path):
+    """Тест выгрузки метрик в Prometheus и JSON"""
+    reset_profile()
+    with measure('load'):
+        pass
+
+    text = render_prometheus()
+    assert '# TYPE moneytalks_stage_calls_total counter' in text
+    assert 'moneytalks_stage_calls_total{stage="load"} 1' in text
+
+    path = tmp_path / 'profile.json'
+    save_profile_summary(str(path))
+    data = json.loads(path.read_text(encoding='utf-8'))
+    assert data['load']['calls'] == 1
+
+
+def test_metrics_server_is_local_by_default():
+    """Тест: сервер метрик по умолчанию слушает только локальный адрес"""
+    server = serve_metrics(port=0)
+    try:
+        assert server.server_address[0] == '127.0.0.1'
+    finally:
+        server.shutdown()
+        server.server_close()
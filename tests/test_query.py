@@ -0,0 +1,112 @@
+import gc
+import pytest
+import numpy as np
+import pandas as pd
+from src.query import Predicate, Query, _indexes, index_transactions
+
+
+@pytest.fixture
+def transactions():
+    """Фикстура: операции по двум картам за год, отсортированные по дате"""
+    rng = np.random.default_rng(3)
+    n = 2000
+    return pd.DataFrame({
+        'date': pd.Timestamp('2023-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 365 * 86400, n)), unit='s'),
+        'card_last_digits': rng.choice(['*1111', '*2222'], n),
+        'amount': -rng.uniform(1, 5000, n).round(2),
+        'category': rng.choice(['Такси', 'Кафе', 'Супермаркеты'], n),
+        'mcc': rng.choice([4121.0, 5812.0, 5411.0, np.nan], n),
+        'status': rng.choice(['OK', 'FAILED'], n, p=[0.9, 0.1]),
+        'description': rng.choice(['Яндекс Такси', 'Кофейня', 'Пятерочка'], n),
+    })
+
+
+def expected_mask(df):
+    return (
+        (df['card_last_digits'] == '*2222')
+        & df['mcc'].between(5000, 5999)
+        & df['amount'].between(-1000, -100)
+        & (df['date'] >= '2023-03-01') & (df['date'] < '2023-07-01')
+        & (df['status'] == 'OK')
+        & df['description'].str.lower().str.contains('кофе')
+    )
+
+
+@pytest.mark.parametrize('shuffle', [False, True])
+@pytest.mark.parametrize('indexed', [False, True])
+def test_query_matches_manual_masks(transactions, shuffle, indexed):
+    """Тест: запрос дает те же строки, что и ручные маски, при любом плане"""
+    df = transactions.sample(frac=1, random_state=5) if shuffle else transactions
+    if indexed:
+        index_transactions(df, ['card_last_digits', 'category', 'status', 'description'])
+    query = Query.parse('card:*2222 mcc:5000..5999 amount:-1000..-100 '
+                        'date:2023-03-01..2023-06-30 status:ok text:"КОФЕ"')
+
+    result = query.execute(df).to_pandas()
+
+    pd.testing.assert_frame_equal(result, df[expected_mask(df)])
+
+
+def test_plan_uses_sorted_dates_and_codes(transactions):
+    """Тест: диапазон дат выбирается бинарным поиском, равенство по кодам проверяется первым"""
+    df = transactions.assign(category=transactions['category'].astype('category'))
+    query = Query().amount(-4000, 0).category('такси').dates('2023-02-01', '2023-02-28')
+
+    rows, predicates = query.plan(df)
+
+    assert isinstance(rows, slice)
+    assert df['date'].iloc[rows].min() >= pd.Timestamp('2023-02-01')
+    assert [predicate.column for predicate in predicates] == ['category', 'amount']
+    assert query.explain(df).startswith(f"rows {rows.start}:{rows.stop}")
+
+
+def test_view_is_lazy(transactions):
+    """Тест: выборка по диапазону дат не копирует данные"""
+    view = Query().month(2023, 5).execute(transactions)
+
+    assert len(view) == transactions['date'].dt.month.eq(5).sum()
+    assert np.shares_memory(view.column('amount'), transactions['amount'].to_numpy())
+    assert view.sum() == pytest.approx(transactions.loc[transactions['date'].dt.month == 5, 'amount'].sum())
+
+
+def test_parse_errors():
+    """Тест: неизвестное поле или неверный диапазон отклоняются"""
+    with pytest.raises(ValueError):
+        Query.parse('merchant:Кофейня')
+    with pytest.raises(ValueError):
+        Query.parse('amount:много..мало')
+
+
+def test_index_does_not_outlive_frame(transactions):
+    """Тест: кеш индексов не удерживает DataFrame, по которым выполнялись запросы"""
+    frames = [transactions.copy() for _ in range(5)]
+    for df in frames:
+        index_transactions(df)
+        Query().card('*1111').execute(df)
+    keys = [id(df) for df in frames]
+    assert all(key in _indexes for key in keys)
+
+    del frames, df
+    gc.collect()
+    assert not any(key in _indexes for key in keys)
+
+
+def test_predicate_is_abstract():
+    """Тест: фильтр без проверки строк создать нельзя"""
+    with pytest.raises(TypeError):
+        Predicate()
+
+
+def test_query_after_in_place_edit(transactions):
+    """Тест: изменение DataFrame на месте учитывается следующим запросом"""
+    df = transactions.copy()
+    query = Query().dates('2023-01-01', '2023-12-31').category('Такси')
+    index_transactions(df)
+    query.execute(df)
+
+    df.loc[0, 'date'] = pd.Timestamp('2025-01-01')
+    df.loc[1, 'category'] = 'Такси' if df.loc[1, 'category'] != 'Такси' else 'Кафе'
+    index_transactions(df)
+
+    expected = df[(df['date'] <= '2023-12-31') & (df['category'] == 'Такси')]
+    pd.testing.assert_frame_equal(query.execute(df).to_pandas(), expected)
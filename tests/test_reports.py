@@ -8,6 +8,10 @@ from src.reports import (
     spending_by_category,
     spending_by_weekday,
     spending_by_workday,
+    combine_partials,
+    partial_spending_by_weekday,
+    run_report_distributed,
+    shard_transactions,
 )
 
 
@@ -143,3 +147,36 @@ def test_spending_functions_with_positive_amounts():
         assert len(result1) == 0
         assert len(result2) == 0
         assert len(result3) == 0
+
+
+def test_combine_partials_is_exact():
+    """Тест точного объединения частичных агрегатов"""
+    dates = pd.date_range(start='2024-01-01', periods=14, freq='D')
+    transactions = pd.DataFrame({'date': dates, 'amount': [-0.1, -0.2] * 7})
+    start, end = pd.Timestamp('2023-12-01'), pd.Timestamp('2024-02-01')
+
+    whole = partial_spending_by_weekday(transactions, start, end)
+    parts = [partial_spending_by_weekday(transactions.iloc[i::3], start, end) for i in range(3)]
+    combined = combine_partials(parts)
+
+    merged = whole.merge(combined, on='День_недели', suffixes=('', '_combined'))
+    assert len(merged) == 7
+    assert (merged['sum'] == merged['sum_combined']).all()
+    assert (merged['count'] == merged['count_combined']).all()
+
+
+@pytest.mark.parametrize('report, params', [
+    ('spending_by_category', {'category': 'food'}),
+    ('spending_by_weekday', {}),
+    ('spending_by_workday', {}),
+])
+def test_run_report_distributed_matches_single(mock_load_transactions, sample_transactions, report, params):
+    """Тест: расчёт по частям совпадает с расчётом по всем данным"""
+    import src.reports as reports
+
+    expected = getattr(reports, report)('dummy.csv', date='2024-03-31', skip_save=True, **params)
+    shards = shard_transactions(sample_transactions, by='month')
+    result = run_report_distributed(report, shards, date='2024-03-31', max_workers=1, **params)
+
+    assert len(shards) == 3
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True))
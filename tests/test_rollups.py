@@ -0,0 +1,87 @@
+import os
+import pytest
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+
+from src.reports import spending_by_category, spending_by_weekday, spending_by_workday
+from src.rollups import Rollups, load_rollups, rollups_path
+
+pytest.importorskip('pyarrow')
+
+from src.dataset import write_dataset  # noqa: E402
+
+
+@pytest.fixture
+def transactions():
+    """Фикстура с тратами и доходами за полгода в случайное время суток"""
+    rng = np.random.default_rng(7)
+    n = 400
+    return pd.DataFrame({
+        'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 182 * 24 * 3600, n), unit='s'),
+        'card_last_digits': rng.choice(['*1111', '*2222'], n),
+        'amount': np.where(rng.random(n) < 0.9, -1, 1) * rng.uniform(10, 3000, n).round(2),
+        'category': rng.choice(['Еда', 'Такси', 'Кино'], n),
+        'mcc': rng.choice([5411.0, 4121.0, 7832.0], n),
+    }).sort_values('date', ignore_index=True)
+
+
+@pytest.fixture
+def dataset(tmp_path, transactions):
+    """Фикстура: набор данных с предрасчитанными таблицами рядом"""
+    path = str(tmp_path / 'operations.arrow')
+    write_dataset(transactions, path)
+    Rollups.from_transactions(transactions).save(rollups_path(path), path)
+    return path
+
+
+def test_incremental_update_is_exact(transactions):
+    """Тест: таблицы, построенные по частям, совпадают с построенными сразу"""
+    full = Rollups.from_transactions(transactions)
+    incremental = Rollups()
+    for _, part in transactions.groupby(transactions['date'].dt.month):
+        incremental.update(part)
+
+    for name in full.tables:
+        pd.testing.assert_frame_equal(full.tables[name], incremental.tables[name], check_dtype=False)
+    assert incremental.meta == full.meta
+
+
+def test_aggregate(transactions):
+    """Тест свертки таблицы месяц × MCC"""
+    rollups = Rollups.from_transactions(transactions)
+    result = rollups.aggregate('monthly_mcc', 'mcc', start_date='2024-02-10', end_date='2024-03-05')
+
+    spending = transactions[(transactions['amount'] < 0) & (transactions['date'] >= '2024-02-01')
+                            & (transactions['date'] < '2024-04-01')]
+    expected = spending.groupby('mcc')['amount'].agg(['sum', 'count', 'min', 'max'])
+    assert result.set_index('mcc')['count'].tolist() == expected['count'].tolist()
+    assert np.allclose(result.set_index('mcc')['sum'], expected['sum'])
+
+
+@pytest.mark.parametrize('date', ['2024-05-20', '2024-04-03 17:45:00', '2024-12-31'])
+@pytest.mark.parametrize('report, params', [
+    (spending_by_category, {'category': 'еда'}),
+    (spending_by_weekday, {}),
+    (spending_by_workday, {}),
+])
+def test_reports_from_rollups_match_raw(dataset, transactions, report, params, date):
+    """Тест: отчёты по предрасчитанным таблицам совпадают с отчётами по всем операциям"""
+    with patch('src.reports.load_transactions', return_value=transactions):
+        expected = report('operations.csv', date=date, skip_save=True, **params)
+
+    with patch('src.reports.load_transactions') as mock_load:
+        result = report(dataset, date=date, skip_save=True, **params)
+        mock_load.assert_not_called()
+
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True), check_dtype=False)
+
+
+def test_stale_rollups_are_ignored(dataset, transactions):
+    """Тест: после изменения набора данных старые таблицы не используются"""
+    assert load_rollups(dataset) is not None
+
+    write_dataset(transactions.head(10), dataset)
+    os.utime(dataset, (0, 0))
+
+    assert load_rollups(dataset) is None
@@ -1,5 +1,6 @@
 from datetime import datetime
-from src.services import analyze_cashback_categories, investment_bank, simple_search
+import pandas as pd
+from src.services import analyze_cashback_categories, detect_recurring_payments, investment_bank, simple_search
 
 
 def test_analyze_cashback_categories():
@@ -48,4 +49,48 @@ def test_simple_search():
     result = simple_search('Пятерочка', test_data)
 
     assert len(result) == 1
-    assert result[0]['description'] == 'Магазин Пятерочка'
\ No newline at end of file
+    assert result[0]['description'] == 'Магазин Пятерочка'
+
+
+def test_services_accept_dataframe():
+    """Тест: сервисы принимают DataFrame и дают тот же результат, что и для списка"""
+    test_data = [
+        {'date': datetime(2023, 1, 1), 'amount': -1000, 'category': 'food', 'description': 'Пятерочка'},
+        {'date': datetime(2023, 1, 2), 'amount': -456, 'category': 'transport', 'description': 'Такси'},
+        {'date': datetime(2023, 1, 3), 'amount': 500, 'category': 'salary', 'description': None},
+        {'date': datetime(2023, 2, 1), 'amount': -500, 'category': 'food', 'description': 'Магнит'},
+    ]
+    df = pd.DataFrame(test_data)
+
+    assert analyze_cashback_categories(df, 2023, 1) == analyze_cashback_categories(test_data, 2023, 1)
+    assert investment_bank('2023-01', df, 100) == investment_bank('2023-01', test_data, 100) == 144.0
+
+    found = simple_search('ТАКСИ', df)
+    assert isinstance(found, pd.DataFrame)
+    assert found['description'].tolist() == ['Такси']
+    assert simple_search('food', test_data) == [test_data[0], test_data[3]]
+
+
+def test_detect_recurring_payments():
+    """Тест поиска подписок: ежемесячный платеж находится, случайные покупки - нет"""
+    dates = pd.date_range('2023-01-15', periods=6, freq='MS') + pd.to_timedelta([14, 13, 15, 14, 16, 14], unit='D')
+    test_data = [
+        {'date': date, 'amount': -299.0, 'category': 'Связь', 'mcc': 4814, 'description': 'Yandex.Plus'}
+        for date in dates
+    ] + [
+        {'date': datetime(2023, 1, 3), 'amount': -150.0, 'category': 'Фастфуд', 'mcc': 5814, 'description': 'Кафе'},
+        {'date': datetime(2023, 1, 9), 'amount': -870.0, 'category': 'Фастфуд', 'mcc': 5814, 'description': 'Кафе'},
+        {'date': datetime(2023, 3, 1), 'amount': -420.0, 'category': 'Фастфуд', 'mcc': 5814, 'description': 'Кафе'},
+        {'date': datetime(2023, 2, 1), 'amount': 5000.0, 'category': 'Пополнения', 'mcc': None,
+         'description': 'Yandex.Plus'},
+    ]
+
+    result = detect_recurring_payments(test_data)
+
+    assert len(result) == 1
+    assert result[0]['merchant'] == 'Yandex.Plus'
+    assert result[0]['period'] == 'monthly'
+    assert result[0]['occurrences'] == 6
+    assert result[0]['average_amount'] == 299.0
+    assert result[0]['active'] is True
+    assert detect_recurring_payments(pd.DataFrame(test_data)) == result
@@ -0,0 +1,105 @@
+import pytest
+import numpy as np
+import pandas as pd
+from src.sketches import (
+    CountMinSketch,
+    HyperLogLog,
+    KLLSketch,
+    SpaceSaving,
+    build_monthly_sketches,
+    load_sketches,
+    save_monthly_sketches,
+)
+
+
+@pytest.fixture
+def transactions():
+    """Фикстура: полгода трат с логнормальными суммами и частыми продавцами"""
+    rng = np.random.default_rng(11)
+    n = 60_000
+    return pd.DataFrame({
+        'date': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 181 * 86400, n), unit='s'),
+        'card_last_digits': rng.choice([f'*{i:04d}' for i in range(40)], n),
+        'amount': -np.exp(rng.normal(6, 1, n)).round(2),
+        'category': rng.choice(['Такси', 'Кафе', 'Супермаркеты'], n),
+        'description': [f'Магазин {i}' for i in rng.zipf(1.5, n) % 3000],
+    })
+
+
+def test_kll_rank_error_after_merge():
+    """Тест: процентили объединенного скетча KLL в пределах ошибки ранга"""
+    rng = np.random.default_rng(1)
+    values = np.exp(rng.normal(0, 1, 200_000))
+    sketch = KLLSketch(seed=1).update(values[:120_000]).merge(KLLSketch(seed=2).update(values[120_000:]))
+
+    estimates = sketch.quantiles([0.0, 0.5, 0.9, 0.99, 1.0])
+    ranks = np.searchsorted(np.sort(values), estimates[1:4]) / len(values)
+
+    assert np.all(np.abs(ranks - [0.5, 0.9, 0.99]) < 0.02)
+    assert estimates[0] == values.min() and estimates[-1] == values.max()
+    assert sum(len(level) for level in sketch.levels) < 1000
+
+
+def test_hyperloglog_union():
+    """Тест: оценка числа различных значений объединения в пределах 5%"""
+    left = HyperLogLog().update([f'shop {i}' for i in range(0, 30_000)])
+    right = HyperLogLog().update([f'shop {i}' for i in range(20_000, 50_000)] * 2)
+
+    assert left.merge(right).estimate() == pytest.approx(50_000, rel=0.05)
+    assert HyperLogLog().update(['a', 'b', 'a', None]).estimate() == 2
+
+
+def test_heavy_hitters_bounds():
+    """Тест: Count-Min не занижает суммы, Space-Saving дает границы для точной суммы"""
+    rng = np.random.default_rng(2)
+    keys = np.array([f'm{i}' for i in rng.zipf(1.4, 100_000) % 5000], dtype=object)
+    weights = rng.uniform(1, 100, len(keys))
+    exact = pd.Series(weights).groupby(keys).sum()
+
+    cms = CountMinSketch()
+    top = SpaceSaving(capacity=50)
+    for part in np.array_split(np.arange(len(keys)), 7):
+        cms.update(keys[part], weights[part])
+        top.update(keys[part], weights[part])
+
+    estimates = cms.estimate(exact.index.to_numpy())
+    assert np.all(estimates >= exact.to_numpy() - 1e-6)
+    assert np.all(estimates - exact.to_numpy() <= np.e / cms.width * weights.sum())
+
+    result = top.top(10)
+    truth = exact.loc[result['merchant']].to_numpy()
+    assert np.all(result['spend'] + 0.01 >= truth) and np.all(result['spend'] - result['error'] - 0.01 <= truth)
+    assert list(result['merchant'][:5]) == list(exact.sort_values(ascending=False).index[:5])
+
+
+def test_monthly_sketches_roundtrip(tmp_path, transactions):
+    """Тест: скетчи по месяцам сохраняются, диапазон месяцев объединяется"""
+    chunks = [transactions.iloc[i:i + 15_000] for i in range(0, len(transactions), 15_000)]
+    save_monthly_sketches(build_monthly_sketches(chunks), str(tmp_path))
+
+    summary = load_sketches(str(tmp_path), '2023-02', '2023-04').summary(quantiles=(0.5, 0.9), top_n=3)
+
+    period = transactions[(transactions['date'] >= '2023-02-01') & (transactions['date'] < '2023-05-01')]
+    assert summary['transactions'] == len(period)
+    assert summary['total_spent'] == pytest.approx(-period['amount'].sum())
+    assert summary['distinct_cards'] == pytest.approx(40, abs=1)
+    assert summary['distinct_merchants'] == pytest.approx(period['description'].nunique(), rel=0.05)
+    assert list(summary['percentiles'].columns) == ['p50', 'p90']
+    assert summary['top_merchants']['merchant'].iloc[0] == period.groupby('description')['amount'].sum().idxmin()
+
+
+def test_monthly_sketches_resave_does_not_double_count(tmp_path, transactions):
+    """Тест: повторное сохранение выгрузки не удваивает траты, объединение - только явное"""
+    first, second = transactions.iloc[:30_000], transactions.iloc[30_000:]
+
+    save_monthly_sketches(build_monthly_sketches([first]), str(tmp_path), source='first.csv')
+    save_monthly_sketches(build_monthly_sketches([first]), str(tmp_path), source='first.csv')
+    assert load_sketches(str(tmp_path), '2023-01', '2023-01').count == (first['date'] < '2023-02-01').sum()
+
+    save_monthly_sketches(build_monthly_sketches([first]), str(tmp_path), source='first.csv', merge=True)
+    assert load_sketches(str(tmp_path), '2023-01', '2023-01').count == (first['date'] < '2023-02-01').sum()
+
+    save_monthly_sketches(build_monthly_sketches([second]), str(tmp_path), source='second.csv', merge=True)
+    merged = load_sketches(str(tmp_path), '2023-01', '2023-01')
+    assert merged.count == (transactions['date'] < '2023-02-01').sum()
+    assert merged.sources == {'first.csv', 'second.csv'}
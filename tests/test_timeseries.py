@@ -0,0 +1,55 @@
+import pytest
+import pandas as pd
+from src.timeseries import MISSING_KEY, daily_spend_matrix, spend_series, rolling_stats
+
+
+@pytest.fixture
+def transactions():
+    """Фикстура с тратами и доходами по двум категориям"""
+    return pd.DataFrame({
+        'date': pd.to_datetime(['2024-01-01 10:00', '2024-01-01 18:00', '2024-01-03 12:00',
+                                '2024-01-08 09:00', '2024-01-09 09:00']),
+        'amount': [-100.0, -50.0, 1000.0, -30.0, -20.0],
+        'category': ['food', 'taxi', 'salary', 'food', 'food']
+    })
+
+
+def test_daily_spend_matrix_is_dense(transactions):
+    """Тест плотной матрицы день × категория"""
+    matrix = daily_spend_matrix(transactions, key='category')
+
+    assert len(matrix) == 9  # с 1 по 9 января без пропусков
+    assert list(matrix.columns) == ['food', 'taxi']  # доходы не учитываются
+    assert matrix.loc['2024-01-01', 'food'] == 100.0
+    assert matrix.loc['2024-01-02'].sum() == 0.0
+
+
+def test_daily_spend_matrix_keeps_missing_keys(transactions):
+    """Тест: траты без категории не теряются, сумма по категориям равна общей"""
+    transactions.loc[1, 'category'] = None
+    matrix = daily_spend_matrix(transactions, key='category')
+
+    assert matrix.loc['2024-01-01', MISSING_KEY] == 50.0
+    pd.testing.assert_series_equal(matrix.sum(axis=1), daily_spend_matrix(transactions)['total'],
+                                   check_names=False)
+
+
+def test_spend_series_weekly(transactions):
+    """Тест недельного ряда с меткой понедельника"""
+    series = spend_series(daily_spend_matrix(transactions), freq='W')
+
+    assert list(series.index) == [pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-08')]
+    assert series['total'].tolist() == [150.0, 50.0]
+
+
+def test_rolling_stats(transactions):
+    """Тест скользящих сумм, средних и перцентилей"""
+    matrix = daily_spend_matrix(transactions, key='category')
+
+    result = rolling_stats(matrix, windows=(7,), percentiles=(0.5,))
+    row = result[(result['date'] == '2024-01-08') & (result['key'] == 'food')].iloc[0]
+
+    assert set(result.columns) == {'date', 'key', 'window', 'sum', 'mean', 'p50'}
+    assert row['sum'] == 30.0  # 100 от 1 января уже вне окна
+    assert row['mean'] == pytest.approx(30.0 / 7)
+    assert result[result['date'] < '2024-01-07']['sum'].isna().all()
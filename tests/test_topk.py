@@ -0,0 +1,55 @@
+import pytest
+import pandas as pd
+from src.topk import TopK, top_transactions
+
+
+@pytest.fixture
+def transactions():
+    """Фикстура с тратами, доходами и возвратами"""
+    return pd.DataFrame({
+        'date': pd.date_range('2023-01-01', periods=8),
+        'amount': [-100.0, 5000.0, -700.0, 300.0, -700.0, -50.0, -900.0, -20.0],
+        'category': ['food', 'salary', 'food', 'refund', 'taxi', 'taxi', 'food', 'taxi'],
+        'description': ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']
+    })
+
+
+def test_top_spend_ignores_income(transactions):
+    """Тест: топ трат не содержит доходов и возвратов, равные суммы - по порядку"""
+    result = top_transactions(transactions, k=3, ranking='spend')
+
+    assert [t['description'] for t in result] == ['g', 'c', 'e']
+
+
+def test_top_income(transactions):
+    """Тест топа поступлений"""
+    result = top_transactions(transactions, k=5, ranking='income')
+
+    assert [t['amount'] for t in result] == [5000.0, 300.0]
+
+
+def test_top_by_category(transactions):
+    """Тест отдельного топа по категориям"""
+    result = top_transactions(transactions, k=2, ranking='spend', by='category')
+
+    assert set(result) == {'food', 'taxi'}
+    assert [t['description'] for t in result['food']] == ['g', 'c']
+    assert [t['description'] for t in result['taxi']] == ['e', 'f']
+
+
+def test_chunks_and_merge_match_single_pass(transactions):
+    """Тест: обработка частями и объединение частей дают тот же топ"""
+    expected = top_transactions(transactions, k=3)
+
+    chunked = top_transactions((transactions.iloc[i:i + 3] for i in range(0, 8, 3)), k=3)
+    left = TopK(3).update(transactions.iloc[:4])
+    right = TopK(3).update(transactions.iloc[4:])
+
+    assert chunked == expected
+    assert left.merge(right).result() == expected
+
+
+def test_unknown_ranking():
+    """Тест ошибки при неизвестном способе ранжирования"""
+    with pytest.raises(ValueError):
+        TopK(5, ranking='unknown')
@@ -1,3 +1,4 @@
+import zipfile
 import pytest
 import pandas as pd
 from unittest.mock import patch, MagicMock
@@ -7,7 +8,12 @@ from src.utils import (
     filter_transactions_by_date,
     calculate_cashback,
     mask_card_number,
-    detect_phone_numbers
+    detect_phone_numbers,
+    deduplicate_transactions,
+    load_transactions_many,
+    read_csv_fast,
+    read_xlsx_fast,
+    read_xlsx_streaming
 )
 
 
@@ -61,6 +67,22 @@ def test_filter_transactions_by_date():
     assert result['date'].max() <= end_date
 
 
+def test_filter_transactions_by_date_without_dates():
+    """Тест: без столбца даты фильтрация завершается ошибкой"""
+    with pytest.raises(KeyError):
+        filter_transactions_by_date(pd.DataFrame({'amount': [1.0]}), '2023-01-01', '2023-01-31')
+
+
+def test_filter_transactions_by_date_after_in_place_edit():
+    """Тест: изменение дат на месте учитывается при повторной фильтрации"""
+    df = pd.DataFrame({'date': pd.date_range('2023-01-01', periods=3), 'amount': [1.0, 2.0, 3.0]})
+    assert len(filter_transactions_by_date(df, '2023-01-01', '2023-01-31')) == 3
+
+    df.loc[0, 'date'] = pd.Timestamp('2023-03-01')
+
+    assert len(filter_transactions_by_date(df, '2023-01-01', '2023-01-31')) == 2
+
+
 def test_calculate_cashback():
     """Тест расчета кешбэка"""
     assert calculate_cashback(1000) == 10.0
@@ -123,3 +145,182 @@ def test_detect_phone_numbers():
     expected = ['+7 916 123-45-67']
     assert result == expected
 
+
+def test_deduplicate_transactions_across_files():
+    """Тест удаления повторов из пересекающихся выгрузок"""
+    row = {'date': datetime(2023, 1, 1, 12, 0), 'card_last_digits': '*1234', 'amount': -100.0,
+           'description': 'Кафе'}
+    df = pd.DataFrame([
+        {**row, 'source_file': 'jan.csv'},
+        {**row, 'source_file': 'jan.csv'},  # Две реальные одинаковые покупки
+        {**row, 'source_file': 'feb.csv'},
+        {**row, 'source_file': 'feb.csv'},
+        {**row, 'amount': -50.0, 'source_file': 'feb.csv'},
+    ])
+
+    result = deduplicate_transactions(df)
+
+    assert len(result) == 3
+    assert (result['amount'] == -100.0).sum() == 2
+
+
+def test_load_transactions_many(tmp_path):
+    """Тест загрузки директории с выгрузками"""
+    header = 'Дата операции,Номер карты,Сумма операции,Описание\n'
+    (tmp_path / 'jan.csv').write_text(
+        header + '02.01.2023 10:00:00,*1234,"-100,00",Кафе\n01.01.2023 09:00:00,*1234,"-50,00",Такси\n',
+        encoding='utf-8'
+    )
+    (tmp_path / 'overlap.csv').write_text(
+        header + '03.01.2023 11:00:00,*5678,"-10,00",Метро\n02.01.2023 10:00:00,*1234,"-100,00",Кафе\n',
+        encoding='utf-8'
+    )
+    (tmp_path / 'notes.txt').write_text('не выгрузка', encoding='utf-8')
+
+    result = load_transactions_many(str(tmp_path), max_workers=1)
+
+    assert len(result) == 3
+    assert result['date'].is_monotonic_increasing
+    assert set(result['source_file']) == {'jan.csv', 'overlap.csv'}
+
+
+def test_load_transactions_many_no_files(tmp_path):
+    """Тест ошибки при отсутствии выгрузок"""
+    with pytest.raises(FileNotFoundError):
+        load_transactions_many(str(tmp_path))
+
+
+def test_read_xlsx_streaming(tmp_path):
+    """Тест потокового чтения XLSX с переименованием и типизацией столбцов"""
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['Дата операции', 'Дата платежа', 'Сумма операции', 'Категория', 'MCC', 'Описание'])
+    sheet.append([datetime(2023, 1, 2, 10, 30, 15), '02.01.2023', -100.5, 'Кафе', 5814, 'Кофейня'])
+    sheet.append([datetime(2023, 1, 3, 9, 0), '03.01.2023', '-1 200,00', None, 4111, 'Метро'])
+    path = tmp_path / 'operations.xlsx'
+    workbook.save(path)
+
+    result = read_xlsx_streaming(str(path))
+
+    assert list(result.columns) == ['date', 'payment_date', 'amount', 'category', 'mcc', 'description']
+    assert result['date'].tolist() == [pd.Timestamp(2023, 1, 2, 10, 30, 15), pd.Timestamp(2023, 1, 3, 9, 0)]
+    assert result['payment_date'].tolist() == [pd.Timestamp(2023, 1, 2), pd.Timestamp(2023, 1, 3)]
+    assert result['amount'].tolist() == [-100.5, -1200.0]
+    assert result['mcc'].tolist() == [5814.0, 4111.0]
+    assert pd.isna(result['category'].iloc[1])
+
+
+def write_minimal_xlsx(path, rows):
+    """Записывает XLSX с inline-строками, логическими и ошибочными ячейками и ячейками без адреса"""
+    ns = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+    rel_ns = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+    package_ns = 'http://schemas.openxmlformats.org/package/2006/relationships'
+    content_ns = 'http://schemas.openxmlformats.org/package/2006/content-types'
+    cells = ''.join(
+        '<row>' + ''.join(
+            '<c/>' if value is None else
+            f'<c t="b"><v>{int(value)}</v></c>' if isinstance(value, bool) else
+            f'<c><v>{value}</v></c>' if isinstance(value, float) else
+            f'<c t="e"><v>{value}</v></c>' if value.startswith('#') else
+            f'<c t="inlineStr"><is><t>{value}</t></is></c>'
+            for value in row
+        ) + '</row>'
+        for row in rows
+    )
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('[Content_Types].xml', (
+            f'<Types xmlns="{content_ns}">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/></Types>'
+        ))
+        archive.writestr('_rels/.rels', (
+            f'<Relationships xmlns="{package_ns}"><Relationship Id="rId1" Target="xl/workbook.xml" '
+            f'Type="{rel_ns}/officeDocument"/></Relationships>'
+        ))
+        archive.writestr('xl/workbook.xml', f'<workbook xmlns="{ns}" xmlns:r="{rel_ns}"><sheets>'
+                                            '<sheet name="1" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        archive.writestr('xl/_rels/workbook.xml.rels', (
+            f'<Relationships xmlns="{package_ns}"><Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+            f'Type="{rel_ns}/worksheet"/></Relationships>'
+        ))
+        archive.writestr('xl/worksheets/sheet1.xml',
+                         f'<worksheet xmlns="{ns}"><sheetData>{cells}</sheetData></worksheet>')
+
+
+def test_read_xlsx_without_cell_references_and_mixed_dates(tmp_path):
+    """Тест: ячейки без адреса, логические и ошибочные ячейки, даты без секунд, без времени и числом Excel"""
+    path = tmp_path / 'operations.xlsx'
+    write_minimal_xlsx(path, [
+        ['Дата операции', 'Сумма операции', 'Категория', 'Возврат'],
+        ['02.01.2023 10:30:15', '-100,50', 'Кафе', False],
+        ['03.01.2023 09:00', -20.0, None, True],
+        ['04.01.2023', '#N/A', 'Такси', False],
+        [44931.5, -1.0, 'Метро', False],
+    ])
+
+    result = read_xlsx_streaming(str(path))
+
+    assert list(result.columns) == ['date', 'amount', 'category', 'Возврат']
+    assert result['date'].tolist() == [pd.Timestamp(2023, 1, 2, 10, 30, 15), pd.Timestamp(2023, 1, 3, 9, 0),
+                                       pd.Timestamp(2023, 1, 4), pd.Timestamp(2023, 1, 5, 12, 0)]
+    assert result['amount'].tolist()[:2] == [-100.5, -20.0] and pd.isna(result['amount'].iloc[2])
+    assert result['Возврат'].tolist() == [False, True, False, False]
+    assert pd.isna(result['category'].iloc[1])
+
+
+@patch('src.utils.CALAMINE_AVAILABLE', True)
+@patch('pandas.read_excel')
+def test_read_xlsx_fast_types_calamine_result(mock_read_excel):
+    """Тест: результат calamine типизируется так же, как потоковое чтение"""
+    mock_read_excel.return_value = pd.DataFrame({
+        'Дата операции': [datetime(2023, 1, 2, 10, 30, 15), '03.01.2023 09:00'],
+        'Дата платежа': ['02.01.2023', '03.01.2023'],
+        'Сумма операции': [-100.5, '-1 200,00'],
+        'Категория': ['Кафе', None],
+    })
+
+    result = read_xlsx_fast('operations.xlsx')
+
+    assert list(result.columns) == ['date', 'payment_date', 'amount', 'category']
+    assert result['date'].tolist() == [pd.Timestamp(2023, 1, 2, 10, 30, 15), pd.Timestamp(2023, 1, 3, 9, 0)]
+    assert result['payment_date'].tolist() == [pd.Timestamp(2023, 1, 2), pd.Timestamp(2023, 1, 3)]
+    assert result['amount'].tolist() == [-100.5, -1200.0]
+
+
+@pytest.mark.parametrize('amount', ['"-1 200,00"', '"-1200,00"'])
+def test_read_csv_fast(tmp_path, amount):
+    """Тест типизированного чтения CSV: явные форматы дат и все денежные столбцы"""
+    path = tmp_path / 'operations.csv'
+    path.write_text(
+        'Дата операции,Дата платежа,Статус,Сумма операции,Кэшбэк,Категория,MCC\n'
+        f'02.01.2023 10:30:15,02.01.2023,OK,{amount},,Кафе,5814\n'
+        '03.01.2023 09:00:00,03.01.2023,OK,"-100,50","1,00",,4111\n',
+        encoding='utf-8'
+    )
+
+    raw = read_csv_fast(str(path))
+    assert raw['Дата операции'].tolist() == [pd.Timestamp(2023, 1, 2, 10, 30, 15), pd.Timestamp(2023, 1, 3, 9, 0)]
+
+    result = load_transactions(str(path))
+    assert result['payment_date'].tolist() == [pd.Timestamp(2023, 1, 2), pd.Timestamp(2023, 1, 3)]
+    assert result['amount'].tolist() == [-1200.0, -100.5]
+    assert result['cashback'].dtype == 'float64'
+    assert result['mcc'].tolist() == [5814.0, 4111.0]
+    assert pd.isna(result['category'].iloc[1])
+
+    # Даты без секунд не совпадают с форматом выгрузки и разбираются повторно
+    path.write_text(
+        'Дата операции,Статус,Сумма операции\n'
+        f'02.02.2023 10:00,OK,{amount}\n'
+        '03.02.2023,OK,"-100,50"\n',
+        encoding='utf-8'
+    )
+    dates = read_csv_fast(str(path))['Дата операции']
+    assert dates.tolist() == [pd.Timestamp(2023, 2, 2, 10, 0), pd.Timestamp(2023, 2, 3)]
+    assert load_transactions(str(path), validate=True)['date'].notna().all()
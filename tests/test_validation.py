@@ -0,0 +1,83 @@
+import pytest
+import pandas as pd
+from src.utils import load_transactions
+from src.validation import DataQualityError, validate_transactions
+
+
+@pytest.fixture
+def transactions():
+    """Фикстура с ошибочной датой, повтором и неуспешной операцией"""
+    return pd.DataFrame({
+        'date': ['01.02.2023 10:00:00', '02.02.2023 11:30:00', 'вчера', '02.02.2023 11:30:00',
+                 '03.02.2023 09:15:00'] * 5,
+        'amount': [-100.0, -250.0, -50.0, -250.0, -999.0] * 5,
+        'status': ['OK', 'OK', 'OK', 'OK', 'FAILED'] * 5,
+        'category': ['Кафе'] * 25,
+    })
+
+
+def test_validate_quarantines_bad_rows(transactions):
+    """Тест: строки с ошибками уходят в карантин с причиной, отчет считает ошибки"""
+    clean, quarantined, report = validate_transactions(
+        transactions.head(5), max_invalid_share=0.5, exclude_statuses=['FAILED'], drop_duplicates=True,
+        date_format='%d.%m.%Y %H:%M:%S'
+    )
+
+    assert len(clean) == 2
+    assert pd.api.types.is_datetime64_any_dtype(clean['date'])
+    assert quarantined['quarantine_reason'].tolist() == ['invalid_date', 'duplicate', 'excluded_status']
+    assert report['date_failure_rate'] == 0.2
+    assert report['duplicates'] == 1
+    assert report['statuses'] == {'OK': 4, 'FAILED': 1}
+    assert report['dtype_issues'] == {'date': 'object'}
+
+
+def test_validate_rejects_bad_export(transactions):
+    """Тест: выгрузка без обязательных столбцов или с большой долей ошибок отклоняется"""
+    with pytest.raises(DataQualityError, match='amount'):
+        validate_transactions(transactions.drop(columns='amount'))
+
+    with pytest.raises(DataQualityError) as error:
+        validate_transactions(transactions, max_invalid_share=0.1)
+    assert error.value.report['date_failure_rate'] == 0.2
+
+
+def test_load_transactions_quarantine_file(tmp_path):
+    """Тест: load_transactions пишет карантин в отдельный файл и сохраняет отчет"""
+    csv_path = tmp_path / 'operations.csv'
+    pd.DataFrame({
+        'Дата операции': ['01.02.2023 10:00:00', '02.02.2023 11:30:00'] * 10,
+        'Статус': ['OK', 'FAILED'] * 10,
+        'Сумма операции': ['-100,5', '-20'] * 10,
+        'Категория': ['Кафе', 'Такси'] * 10,
+    }).to_csv(csv_path, index=False)
+    quarantine_path = tmp_path / 'quarantine.csv'
+
+    df = load_transactions(str(csv_path), exclude_statuses=['FAILED'], quarantine_path=str(quarantine_path))
+
+    assert len(df) == 10
+    assert (df['status'] == 'OK').all()
+    assert df.attrs['quality_report']['quarantine']['excluded_status'] == 10
+    assert len(pd.read_csv(quarantine_path)) == 10
+
+
+def test_load_transactions_keeps_rows_by_default(tmp_path):
+    """Тест: без проверки строки с ошибками остаются, выгрузка без суммы загружается"""
+    csv_path = tmp_path / 'operations.csv'
+    pd.DataFrame({
+        'Дата операции': ['01.02.2023 10:00:00', 'вчера', '03.02.2023 09:15:00'],
+        'Статус': ['OK', 'OK', 'FAILED'],
+        'Сумма операции': ['-100,5', '-20', 'много'],
+    }).to_csv(csv_path, index=False)
+
+    df = load_transactions(str(csv_path))
+    assert len(df) == 3
+    assert df['date'].isna().tolist() == [False, True, False]
+    assert df['amount'].isna().tolist() == [False, False, True]
+    assert 'quality_report' not in df.attrs
+
+    with pytest.raises(DataQualityError):
+        load_transactions(str(csv_path), validate=True)
+
+    pd.DataFrame({'Дата операции': ['01.02.2023 10:00:00']}).to_csv(csv_path, index=False)
+    assert load_transactions(str(csv_path)).columns.tolist() == ['date']
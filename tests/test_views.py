@@ -1,4 +1,9 @@
+import pytest
 from src.views import (
+    MarketData,
+    MarketDataProvider,
+    SnapshotProvider,
+    StubProvider,
     get_currency_rates_fallback,
     get_stock_prices_fallback,
 )
@@ -32,3 +37,64 @@ def test_get_stock_prices_fallback_returns_correct_data():
         assert 'price' in item
         assert item['stock'] in expected_stocks
         assert isinstance(item['price'], float)
+
+
+def test_circuit_breaker_fails_fast_and_probes():
+    """Тест: после порога ошибок API не вызывается, после паузы - пробный запрос"""
+    now = [0.0]
+    primary = StubProvider(fail=True)
+    market = MarketData(primary, failure_threshold=2, recovery_timeout=30)
+    market.breakers['currency_rates'].clock = lambda: now[0]
+
+    for _ in range(5):
+        assert market.currency_rates() == get_currency_rates_fallback()
+    assert primary.calls == 2
+    assert market.breakers['currency_rates'].state == 'open'
+
+    now[0] = 31.0
+    primary.fail = False
+    market.currency_rates()
+    assert primary.calls == 3
+    assert market.breakers['currency_rates'].state == 'closed'
+
+
+def test_snapshot_serves_last_good_quotes(tmp_path):
+    """Тест: при недоступности API отдаются последние успешные котировки с временем"""
+    snapshot = SnapshotProvider(str(tmp_path / 'market.json'))
+    primary = StubProvider(stock_prices=[{'stock': 'AAPL', 'price': 190.0}])
+    market = MarketData(primary, snapshot)
+
+    assert market.stock_prices() == [{'stock': 'AAPL', 'price': 190.0}]
+    primary.fail = True
+    stale = market.stock_prices()
+
+    assert stale[0]['price'] == 190.0
+    assert 'updated_at' in stale[0]
+    with pytest.raises(LookupError):
+        snapshot.currency_rates()
+
+
+def test_snapshot_skips_unchanged_writes(tmp_path):
+    """Тест: неизменившиеся котировки не переписывают снимок чаще интервала"""
+    now = [0.0]
+    snapshot = SnapshotProvider(str(tmp_path / 'market.json'), refresh_interval=60, clock=lambda: now[0])
+    quotes = [{'stock': 'AAPL', 'price': 190.0}]
+    snapshot.save('stock_prices', quotes)
+
+    # Подмена файла показывает, был ли он переписан
+    (tmp_path / 'market.json').write_text('{}', encoding='utf-8')
+    snapshot.save('stock_prices', list(quotes))
+    assert (tmp_path / 'market.json').read_text(encoding='utf-8') == '{}'
+
+    now[0] = 61.0
+    snapshot.save('stock_prices', list(quotes))
+    assert snapshot.stock_prices()[0]['price'] == 190.0
+
+    snapshot.save('stock_prices', [{'stock': 'AAPL', 'price': 191.0}])
+    assert snapshot.stock_prices()[0]['price'] == 191.0
+
+
+def test_provider_is_abstract():
+    """Тест: поставщик без методов котировок создать нельзя"""
+    with pytest.raises(TypeError):
+        MarketDataProvider()
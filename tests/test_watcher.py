@@ -0,0 +1,163 @@
+import json
+import os
+import pytest
+import pandas as pd
+
+from src.reports import spending_by_weekday
+from src.utils import load_transactions_many
+from src.watcher import ChangeQueue, FolderWatcher, IncrementalStore
+
+pytest.importorskip('pyarrow')
+
+MARKET = {'currency_rates': [], 'stock_prices': []}
+
+
+def write_export(path, rows):
+    """Записывает выгрузку в формате банка"""
+    pd.DataFrame({
+        'Дата операции': [row[0] for row in rows],
+        'Номер карты': ['*7197'] * len(rows),
+        'Статус': ['OK'] * len(rows),
+        'Сумма операции': [row[1] for row in rows],
+        'Категория': ['Супермаркеты'] * len(rows),
+        'Описание': [row[2] for row in rows],
+    }).to_csv(path, index=False)
+
+
+ROWS = [
+    ('03.01.2022 10:00:00', '-100,5', 'Магнит'),
+    ('10.01.2022 12:00:00', '-200', 'Магнит'),
+    ('10.01.2022 12:00:00', '-200', 'Магнит'),
+    ('05.02.2022 09:00:00', '-300', 'Дикси'),
+]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_change_queue_debounce_and_limit():
+    """Тест: события сливаются, файл выдается после паузы, не больше limit за раз"""
+    clock = FakeClock()
+    queue = ChangeQueue(debounce=3, clock=clock)
+    for name in ('a.csv', 'b.csv', 'a.csv', 'c.xlsx', 'notes.txt'):
+        queue.touch(name)
+        clock.now += 1
+
+    assert len(queue) == 3
+    assert queue.take(10) == [os.path.abspath('b.csv'), os.path.abspath('a.csv')]
+    clock.now += 5
+    assert queue.take(0) == []
+    assert queue.take(1, busy=[os.path.abspath('c.xlsx')]) == []
+    assert queue.take(1) == [os.path.abspath('c.xlsx')]
+
+
+@pytest.fixture
+def watcher(tmp_path):
+    """Фикстура: наблюдатель без пула процессов и задержки"""
+    (tmp_path / 'in').mkdir()
+    return FolderWatcher(str(tmp_path / 'in'), str(tmp_path / 'out'), max_workers=1, debounce=0,
+                         use_watchdog=False, market=MARKET,
+                         budgets=[{'category': 'Супермаркеты', 'limit': 500}])
+
+
+def step(watcher):
+    """Обрабатывает все изменения каталога (по одному файлу за шаг)"""
+    watcher.poller.scan()
+    total = {'processed': 0, 'added': 0}
+    while True:
+        result = watcher.run_once()
+        total['processed'] += result['processed']
+        total['added'] += result['added']
+        if not result['pending']:
+            return total
+
+
+def test_appended_export_adds_only_new_rows(watcher, tmp_path):
+    """Тест: дописанная выгрузка добавляет только новые операции и затронутые месяцы"""
+    export = tmp_path / 'in' / 'operations.csv'
+    write_export(export, ROWS[:3])
+    assert step(watcher)['added'] == 3
+
+    write_export(export, ROWS)
+    result = step(watcher)
+    assert result['added'] == 1
+    assert len(watcher.store.df) == 4
+    assert watcher.store.rollups.meta['rows'] == 4
+
+    out = tmp_path / 'out'
+    assert sorted(os.listdir(out / 'home')) == ['2022-01.ndjson', '2022-02.ndjson']
+    assert sorted(os.listdir(out / 'reports')) == ['2022-01', '2022-02']
+    payload = json.loads((out / 'home' / '2022-02.ndjson').read_text(encoding='utf-8'))
+    assert payload['date'] == '2022-02-05'
+    budgets = pd.read_csv(out / 'budgets.csv')
+    assert budgets['spent'].tolist() == [300.0]
+
+    # Без изменений файл повторно не разбирается
+    assert step(watcher)['processed'] == 0
+
+
+def test_overlapping_and_rewritten_exports(watcher, tmp_path):
+    """Тест: повторы из другой выгрузки отбрасываются, удаление строк ведет к пересчету"""
+    write_export(tmp_path / 'in' / 'january.csv', ROWS[:3])
+    write_export(tmp_path / 'in' / 'all.csv', ROWS)
+    step(watcher)
+    assert len(watcher.store.df) == 4
+
+    write_export(tmp_path / 'in' / 'all.csv', ROWS[3:])
+    step(watcher)
+    assert len(watcher.store.df) == 4
+    assert watcher.store.df['source_file'].value_counts().to_dict() == {'january.csv': 3, 'all.csv': 1}
+
+
+def test_state_survives_restart(watcher, tmp_path):
+    """Тест: после перезапуска обработанные файлы пропускаются, состояние восстанавливается"""
+    write_export(tmp_path / 'in' / 'operations.csv', ROWS)
+    step(watcher)
+
+    store = IncrementalStore(str(tmp_path / 'out' / 'state'))
+    assert len(store.df) == 4
+    assert store.is_current(str(tmp_path / 'in' / 'operations.csv'))
+    assert store.rollups.meta['rows'] == 4
+
+
+def test_rewrite_matches_full_reload(watcher, tmp_path):
+    """Тест: повтор, уже бывший в другой выгрузке, не теряет реальную покупку при дописывании"""
+    x, y = ROWS[1], ROWS[3]
+    write_export(tmp_path / 'in' / 'a.csv', [x])
+    write_export(tmp_path / 'in' / 'b.csv', [x, y])
+    step(watcher)
+    assert len(watcher.store.df) == 2
+
+    write_export(tmp_path / 'in' / 'b.csv', [x, y, x])
+    assert step(watcher)['added'] == 1
+    assert len(watcher.store.df) == len(load_transactions_many(str(tmp_path / 'in'), max_workers=1)) == 3
+
+    # Пропавшая из b.csv операция, которой нет в a.csv, удаляется; общая остается
+    write_export(tmp_path / 'in' / 'b.csv', [x])
+    step(watcher)
+    assert len(watcher.store.df) == len(load_transactions_many(str(tmp_path / 'in'), max_workers=1)) == 1
+    assert IncrementalStore(str(tmp_path / 'out' / 'state')).df['amount'].tolist() == [-200.0]
+
+
+def test_append_writes_only_new_rows(watcher, tmp_path):
+    """Тест: дописанные операции пишутся частью журнала, снимок набора данных не переписывается"""
+    export = tmp_path / 'in' / 'operations.csv'
+    write_export(export, ROWS[:2])
+    step(watcher)
+    write_export(export, ROWS)
+    step(watcher)
+
+    state = tmp_path / 'out' / 'state'
+    assert not (state / 'transactions.arrow').exists()
+    assert sorted(os.listdir(state / 'journal')) == ['000001.arrow', '000002.arrow']
+    assert len(IncrementalStore(str(state)).df) == 4
+
+    # Отчёт по данным в памяти совпадает с отчётом по выгрузке
+    published = pd.read_csv(tmp_path / 'out' / 'reports' / '2022-02' / 'weekly_spending.csv')
+    expected = spending_by_weekday(str(export), date='2022-02-05 23:59:59', skip_save=True)
+    pd.testing.assert_frame_equal(published, expected, check_dtype=False)